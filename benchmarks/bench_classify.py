@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+
+
+"""
+Micro benchmark of link classification. It compares classify_urls with the way
+links were classified before, by constructing Imgur objects and calling their
+methods, which matched uncompiled patterns and rebuilt the set of formats on
+every call. Example:
+
+python3 -m benchmarks.bench_classify --links 1000000 --unique 50000
+"""
+
+
+import re
+import random
+from timeit import default_timer
+from argparse import ArgumentParser
+from imgur.imgur import ImgurFileFormats
+from imgur.imgur import classify_url
+from imgur.imgur import classify_urls
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+TEMPLATES = [
+    'https://i.imgur.com/{}.jpg',
+    'https://i.imgur.com/{}.gifv',
+    'https://imgur.com/{}',
+    'https://imgur.com/a/{}',
+    'https://imgur.com/gallery/{}?grid',
+    'https://www.reddit.com/r/{}',
+]
+
+
+def legacy_formats():
+    formats = set()
+    for attribute in ImgurFileFormats.__dict__.keys():
+        if attribute[:2] != '__':
+            value = getattr(ImgurFileFormats, attribute)
+            if not callable(value):
+                formats.add(value)
+    return formats
+
+
+def legacy_classify(url):
+    """
+    Classification as it was done by Imgur methods before.
+    """
+    if not re.match('https?\\:\\/\\/(i\\.|www\\.)?imgur\\.com\\/', url):
+        return None
+    if '.gifv' in url:
+        url = re.match('https?\\:\\/\\/i\\.imgur\\.com\\/[a-zA-Z0-9]+\\.gif', url).group(0)
+    album = ('/a/' in url) or ('/gallery/' in url)
+    grid = url.endswith('?grid')
+    extension = None
+    for candidate in legacy_formats():
+        if candidate in url:
+            extension = candidate
+            break
+    return album, grid, extension
+
+
+def links(count, unique, seed=0):
+    generator = random.Random(seed)
+    hashes = ['{:07x}'.format(generator.getrandbits(28)) for _ in range(unique)]
+    return [
+        generator.choice(TEMPLATES).format(generator.choice(hashes))
+        for _ in range(count)
+    ]
+
+
+def measure(function):
+    start = default_timer()
+    function()
+    return default_timer() - start
+
+
+def parse_arguments():
+    parser = ArgumentParser(description='Link classification benchmark')
+    parser.add_argument('--links', type=int, default=200000)
+    parser.add_argument('--unique', type=int, default=20000,
+                        help='number of distinct hashes among the links')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    urls = links(args.links, args.unique)
+
+    previous = measure(lambda: [legacy_classify(url) for url in urls])
+    classify_url.cache_clear()
+    cold = measure(lambda: list(classify_urls(urls)))
+    warm = measure(lambda: list(classify_urls(urls)))
+
+    for name, elapsed in [('previous', previous), ('classify (cold cache)', cold),
+                          ('classify (warm cache)', warm)]:
+        print('{:<24} {:8.3f}s {:12.0f} links/s'.format(
+            name, elapsed, len(urls) / elapsed
+        ))
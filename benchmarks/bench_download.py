@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+
+
+"""
+End to end benchmark of the download path. It starts a local fake imgur server,
+resolves albums with Imgur, downloads them with Downloader, and reports images
+per second, MB per second, median and 99th percentile latency per image, and
+peak memory. Example:
+
+python3 -m benchmarks.bench_download --albums 4 --images 200 --size 100000 -w 8
+
+Use --json to print the results in a form which can be compared across releases.
+"""
+
+
+import os
+import json
+import resource
+import tempfile
+from time import perf_counter
+from argparse import ArgumentParser
+from benchmarks.fakeimgur import FakeImgur
+from imgur.imgur import Imgur
+from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from imgur.connection import ConnectionPool
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class TimedDownloader(Downloader):
+    """
+    Downloader which records how long each file took to download.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    def write_file_to_filesystem(self, url, filename, headers=None):
+        start = perf_counter()
+        try:
+            return super().write_file_to_filesystem(url, filename, headers)
+        finally:
+            elapsed = perf_counter() - start
+            with self.lock:
+                self.latencies.append(elapsed)
+
+
+def percentile(values, fraction):
+    """
+    Return the value below which the given fraction of values falls.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def directory_size(directory):
+    size = 0
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            size += os.path.getsize(os.path.join(root, filename))
+    return size
+
+
+def peak_rss():
+    """
+    Return peak resident set size of the process in megabytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run(albums, images, size, latency, error_rate, workers, rate):
+    """
+    Run the benchmark and return the results as a dictionary.
+    """
+    album_hashes = {'bench{}'.format(index): images for index in range(albums)}
+    with FakeImgur(album_hashes, size, latency, error_rate) as server, \
+            tempfile.TemporaryDirectory() as destination:
+        pool = ConnectionPool(size=workers, routes=server.routes())
+        limiter = RateLimiter(rate=rate, burst=workers)
+        resolution = 0.0
+        latencies = []
+        summary = {'downloaded': 0, 'skipped': 0, 'failed': 0}
+
+        start = perf_counter()
+        for album_hash in album_hashes:
+            resolved = perf_counter()
+            imgur = Imgur('https://imgur.com/a/{}'.format(album_hash), pool)
+            imgur.prepare_images()
+            imgur.numerate_images()
+            resolution += perf_counter() - resolved
+
+            album_directory = os.path.join(destination, album_hash)
+            os.mkdir(album_directory)
+            downloader = TimedDownloader(
+                imgur.images, album_directory, workers=workers,
+                rate_limiter=limiter, pool=pool
+            )
+            for outcome, count in downloader.download().items():
+                summary[outcome] += count
+            latencies.extend(downloader.latencies)
+        elapsed = perf_counter() - start
+        transferred = directory_size(destination)
+        pool.close()
+
+    return {
+        'albums': albums,
+        'images': albums * images,
+        'workers': workers,
+        'downloaded': summary['downloaded'],
+        'failed': summary['failed'],
+        'seconds': elapsed,
+        'resolution_seconds': resolution,
+        'images_per_second': summary['downloaded'] / elapsed,
+        'mb_per_second': transferred / elapsed / 1e6,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_rss_mb': peak_rss(),
+    }
+
+
+def parse_arguments():
+    """
+    Parse input arguments of the benchmark.
+    """
+    parser = ArgumentParser(description='Imgur downloader benchmark')
+
+    parser.add_argument('--albums', type=int, default=2, help='number of albums')
+    parser.add_argument('--images', type=int, default=100, help='images per album')
+    parser.add_argument('--size', type=int, default=100000, help='image size in bytes')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every image response')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='probability that an image request fails')
+    parser.add_argument('-w', '--workers', type=int, default=4)
+    parser.add_argument('-r', '--rate', type=float, default=100000,
+                        help='maximum number of requests per second')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    results = run(
+        args.albums, args.images, args.size, args.latency, args.error_rate,
+        args.workers, args.rate
+    )
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+    else:
+        print('Images: {downloaded}/{images} in {seconds:.2f}s '
+              '({failed} failed)'.format(**results))
+        print('Throughput: {images_per_second:.1f} images/s, '
+              '{mb_per_second:.2f} MB/s'.format(**results))
+        print('Latency per image: p50 {p50_ms:.2f} ms, '
+              'p99 {p99_ms:.2f} ms'.format(**results))
+        print('Album resolution: {resolution_seconds:.3f}s'.format(**results))
+        print('Peak RSS: {peak_rss_mb:.1f} MB'.format(**results))
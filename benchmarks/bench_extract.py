@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+
+
+"""
+Micro benchmark of album page parsing. It compares the incremental PageScanner
+with the previous implementation (lazy regex over the whole page, and
+deduplication with a list) on synthetic album pages. Example:
+
+python3 -m benchmarks.bench_extract --sizes 10 1000 50000
+
+The previous implementation is quadratic, so it is only measured up to
+--legacy-limit images.
+"""
+
+
+import re
+from timeit import default_timer
+from argparse import ArgumentParser
+from benchmarks.fakeimgur import album_page
+from imgur.scanner import PageScanner
+from imgur.scanner import CHUNK_SIZE
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+def legacy_extract_filenames(html):
+    """
+    Extraction as it was done before the page was scanned incrementally.
+    """
+    pattern = r'\{"hash":"([a-zA-Z0-9]+)".*?"ext":"([\.a-zA-Z0-9\?\#]+)".*?\}'
+    clean = []
+    for filename in re.findall(pattern, html):
+        if filename not in clean:
+            clean.append(filename)
+    return clean
+
+
+def scan_filenames(page):
+    """
+    Feed the page to the scanner in chunks, the way it arrives from network.
+    """
+    scanner = PageScanner()
+    filenames = []
+    for start in range(0, len(page), CHUNK_SIZE):
+        filenames.extend(scanner.feed(page[start:start + CHUNK_SIZE]))
+    return filenames
+
+
+def measure(function, html, repeat):
+    """
+    Return the best time of repeated calls, in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = default_timer()
+        function(html)
+        best = min(best, default_timer() - start)
+    return best
+
+
+def parse_arguments():
+    parser = ArgumentParser(description='Album page parsing benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 50000],
+                        help='number of images in synthetic albums')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-limit', type=int, default=10000,
+                        help='largest album measured with the previous parser')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    print('{:>8} {:>12} {:>12}'.format('images', 'scanner ms', 'previous ms'))
+    for size in args.sizes:
+        hashes = ['img{}'.format(index) for index in range(size)]
+        page = album_page('bench', hashes)
+        html = page.decode('utf-8')
+        scanned = measure(scan_filenames, page, args.repeat)
+        if size <= args.legacy_limit:
+            previous = '{:12.3f}'.format(
+                measure(legacy_extract_filenames, html, args.repeat) * 1000
+            )
+        else:
+            previous = '{:>12}'.format('skipped')
+        print('{:8d} {:12.3f} {}'.format(size, scanned * 1000, previous))
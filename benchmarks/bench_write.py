@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+
+"""
+Benchmark of writing response bodies into files. A large image is served by the
+local fake imgur server, and downloaded with the previous copy (shutil.copyfileobj
+with its default buffer) and with StreamWriter at several chunk sizes. Example:
+
+python3 -m benchmarks.bench_write --size 268435456 --chunk-sizes 65536 1048576 4194304
+
+It reports MB per second, and CPU seconds per GB used by the downloading thread
+(the fake server runs in other threads, and is not counted). Use --fsync-every to
+include batched syncs, and --json to store the results.
+"""
+
+
+import os
+import json
+import tempfile
+from time import perf_counter
+from time import thread_time
+from shutil import copyfileobj
+from argparse import ArgumentParser
+from benchmarks.fakeimgur import FakeImgur
+from imgur.writer import StreamWriter
+from imgur.connection import ConnectionPool
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+def previous_copy(response, f):
+    """
+    Copy the body the way it was done before StreamWriter.
+    """
+    copyfileobj(response, f)
+
+
+def measure(pool, url, path, copy, repeat):
+    """
+    Download the image repeatedly, and return the best wall time and the best
+    CPU time of the current thread, in seconds.
+    """
+    best_wall = best_cpu = float('inf')
+    for _ in range(repeat):
+        wall, cpu = perf_counter(), thread_time()
+        with pool.request(url) as response, open(path, 'wb') as f:
+            copy(response, f)
+        best_wall = min(best_wall, perf_counter() - wall)
+        best_cpu = min(best_cpu, thread_time() - cpu)
+        os.remove(path)
+    return best_wall, best_cpu
+
+
+def run(size, chunk_sizes, repeat=3, fsync_every=None):
+    """
+    Run the benchmark and return a list of results, one per copy method.
+    """
+    methods = [('copyfileobj', previous_copy)]
+    for chunk_size in chunk_sizes:
+        writer = StreamWriter(chunk_size, fsync_every)
+        methods.append((
+            'writer {}K'.format(chunk_size // 1024),
+            lambda response, f, writer=writer: writer.copy(
+                response, f, int(response.getheader('Content-Length'))
+            ),
+        ))
+
+    results = []
+    with FakeImgur({}, image_size=size) as server, \
+            tempfile.TemporaryDirectory() as destination:
+        pool = ConnectionPool(routes=server.routes())
+        url = 'https://i.imgur.com/large.gif'
+        path = os.path.join(destination, 'large.gif')
+        for name, copy in methods:
+            wall, cpu = measure(pool, url, path, copy, repeat)
+            results.append({
+                'method': name,
+                'size': size,
+                'seconds': wall,
+                'mb_per_second': size / wall / 1e6,
+                'cpu_seconds_per_gb': cpu / size * 1e9,
+            })
+        pool.close()
+    return results
+
+
+def parse_arguments():
+    """
+    Parse input arguments of the benchmark.
+    """
+    parser = ArgumentParser(description='File writing benchmark')
+
+    parser.add_argument('--size', type=int, default=128 * 1024 * 1024,
+                        help='image size in bytes')
+    parser.add_argument('--chunk-sizes', type=int, nargs='+',
+                        default=[64 * 1024, 1024 * 1024, 4 * 1024 * 1024],
+                        help='chunk sizes of StreamWriter in bytes')
+    parser.add_argument('--fsync-every', type=int,
+                        help='sync the file after this many bytes')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    results = run(args.size, args.chunk_sizes, args.repeat, args.fsync_every)
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+    else:
+        print('{:>14} {:>10} {:>14}'.format('method', 'MB/s', 'CPU s per GB'))
+        for result in results:
+            print('{method:>14} {mb_per_second:10.1f} {cpu_seconds_per_gb:14.3f}'.format(
+                **result
+            ))
@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+
+
+"""
+Local HTTP server which emulates imgur.com for benchmarks. It serves album pages
+with embedded album JSON, and image files of configurable size, with optional
+latency and error rate. Example:
+
+```python3
+with FakeImgur({'bench0': 100}, image_size=50000, latency=0.01) as server:
+    pool = ConnectionPool(routes=server.routes())
+    imgur = Imgur('https://imgur.com/a/bench0', pool)
+    imgur.prepare_images()
+```
+
+Album pages are available at /a/[album_hash] and /gallery/[album_hash], and
+images at /[image_hash].jpg. Images of an album are named [album_hash]i[index].
+"""
+
+
+import json
+import socket
+import random
+from time import sleep
+from threading import Lock
+from threading import Thread
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+def album_page(album_hash, image_hashes):
+    """
+    Return html of an album page, with the album JSON embedded the way imgur
+    embeds it.
+    """
+    images = [{
+        'hash': image_hash,
+        'title': '',
+        'description': None,
+        'width': 640,
+        'height': 480,
+        'size': 0,
+        'ext': '.jpg',
+        'animated': False,
+        'datetime': '2017-01-01 00:00:00',
+    } for image_hash in image_hashes]
+    album = {
+        'hash': album_hash,
+        'title': 'Benchmark album',
+        'album_images': {'count': len(images), 'images': images},
+    }
+    return ''.join([
+        '<!doctype html><html><head><title>imgur</title></head><body>',
+        '<div class="post-images"></div><script type="text/javascript">',
+        'window.runSlots = {item: ', json.dumps(album, separators=(',', ':')),
+        '};</script></body></html>',
+    ]).encode('utf-8')
+
+
+class FakeImgurHandler(BaseHTTPRequestHandler):
+    """
+    Serve album pages and images of the server that owns this handler.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        status, content_type, body = self.server.fake.respond(self.path)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeImgur(object):
+    """
+    Threaded fake imgur server bound to a random local port.
+    """
+
+    def __init__(self, albums, image_size=100000, latency=0.0, error_rate=0.0,
+                 seed=0):
+        """
+        Initiate FakeImgur. Albums map album hashes to the number of images.
+        Latency (in seconds) is added to every image response, and error_rate
+        is the probability that an image request fails with 500.
+        """
+        self.albums = {
+            album_hash: ['{}i{}'.format(album_hash, index) for index in range(count)]
+            for album_hash, count in albums.items()
+        }
+        self.image = random.Random(seed).randbytes(image_size)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = Lock()
+        self.pages = {}
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), FakeImgurHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.thread = Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return 'http://{}:{}'.format(host, port)
+
+    def routes(self):
+        """
+        Return routes for ConnectionPool, which send all imgur requests here.
+        """
+        base = self.base_url()
+        return {host: base for host in ['imgur.com', 'www.imgur.com', 'i.imgur.com']}
+
+    def respond(self, path):
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+        path = path.split('?')[0]
+        parts = path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] in ('a', 'gallery'):
+            return self.respond_album(parts[1])
+        if self.latency:
+            sleep(self.latency)
+        if failed:
+            return 500, 'text/plain', b''
+        return 200, 'image/jpeg', self.image
+
+    def respond_album(self, album_hash):
+        if album_hash not in self.albums:
+            return 404, 'text/plain', b''
+        with self.lock:
+            if album_hash not in self.pages:
+                self.pages[album_hash] = album_page(album_hash, self.albums[album_hash])
+            return 200, 'text/html', self.pages[album_hash]
@@ -14,12 +14,72 @@ of links that are allowed as input:
 How to use app? Here is an example:
 
 python3 crawlgur.py -v https://imgur.com/a/album_id /path/to/directory
+
+Use -w N (--workers N) to download N images at the same time, and -r R
+(--rate R) to send at most R requests per second. Many links can be downloaded
+at once from a file with one link per line (use - for stdin), each album into its
+own subdirectory:
+
+python3 crawlgur.py -i urls.txt /path/to/directory
+
+All albums and images of a user are downloaded the same way, from a link to the
+profile (https://username.imgur.com or https://imgur.com/user/username):
+
+python3 crawlgur.py https://username.imgur.com /path/to/directory
+
+Add --checksums to record SHA-256 of every file as it is downloaded, and check
+the files later with:
+
+python3 crawlgur.py --verify -w 8 /path/to/directory
+
+Use -P (--progress) to display a single live line with images and megabytes per
+second, the estimated time of arrival and the number of active transfers.
+
+Very large batches can be split between processes with -p N (--processes N), or
+between machines with --shard i/N, in which case the reports of all shards are
+combined with --merge N once they are finished:
+
+python3 crawlgur.py --shard 0/2 -i urls.txt /path/to/directory
+python3 crawlgur.py --shard 1/2 -i urls.txt /path/to/directory
+python3 crawlgur.py --merge 2 /path/to/directory
 """
 
 
+import os
+import sys
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
 from imgur.imgur import Imgur
+from imgur.batch import Batch
+from imgur.batch import read_urls
+from imgur.user import ImgurUser
+from imgur.user import user_name
+from imgur.pipeline import Pipeline
+from imgur.scheduler import Scheduler
+from imgur.shard import Shard
+from imgur.shard import ShardMerge
+from imgur.shard import ShardException
+from imgur.cache import AlbumCache
+from imgur.cache import default_cache_path
+from imgur.store import ObjectStore
+from imgur.journal import Journal
+from imgur.journal import JOURNAL_FILENAME
+from imgur.manifest import MANIFEST_FILENAME
 from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from imgur.ratelimit import MIN_RATE
+from imgur.retry import RetryPolicy
+from imgur.retry import FailureReport
+from imgur.retry import NETWORK_ERRORS
+from imgur.metrics import Metrics
+from imgur.metrics import JsonLinesExporter
+from imgur.metrics import PrometheusExporter
+from imgur.progress import Progress
+from imgur.writer import StreamWriter
+from imgur.checksum import verify
+from imgur.checksum import new_digest
+from imgur.checksum import ChecksumException
+from imgur.connection import ConnectionPool
 
 
 __author__ = 'petarGitNik'
@@ -39,20 +99,382 @@ def parse_arguments():
     parser.add_argument('-v', '--verbose',
                         help='display download progress and information',
                         action='store_true')
-    parser.add_argument('URL', help='source link')
+    parser.add_argument('-P', '--progress',
+                        help='display one live line with throughput and ETA, '
+                             'instead of a line per image',
+                        action='store_true')
+    parser.add_argument('-w', '--workers',
+                        help='number of images downloaded at the same time',
+                        type=int, default=1)
+    parser.add_argument('-r', '--rate',
+                        help='maximum number of requests per second',
+                        type=float, default=2.0)
+    parser.add_argument('-b', '--burst',
+                        help='number of requests allowed at once',
+                        type=int, default=1)
+    parser.add_argument('--retries',
+                        help='number of times a failed request is repeated',
+                        type=int, default=2)
+    parser.add_argument('--retry-budget',
+                        help='maximum number of retries in the whole run',
+                        type=int)
+    parser.add_argument('--failures',
+                        help='write images and albums which could not be '
+                             'downloaded into this JSON file')
+    parser.add_argument('--trace',
+                        help='append a JSON line with timings of every image and '
+                             'album to this file, - for stdout')
+    parser.add_argument('--metrics-port',
+                        help='serve Prometheus metrics at '
+                             'http://127.0.0.1:PORT/metrics during the run',
+                        type=int)
+    parser.add_argument('--metrics-file',
+                        help='write Prometheus metrics into this file at the end')
+    parser.add_argument('--pool-size',
+                        help='number of idle connections kept per host',
+                        type=int, default=4)
+    parser.add_argument('--idle-timeout',
+                        help='seconds after which idle connections are closed',
+                        type=float, default=30)
+    parser.add_argument('--chunk-size',
+                        help='size of the buffer used to write files, in KB',
+                        type=int, default=1024, metavar='KB')
+    parser.add_argument('--fsync-every',
+                        help='flush files to disk after every MB megabytes',
+                        type=int, metavar='MB')
+    parser.add_argument('--checksums',
+                        help='hash files while they are downloaded, and write '
+                             'their checksums into every album directory',
+                        action='store_true')
+    parser.add_argument('--fast-digest',
+                        help='record this digest next to SHA-256, and use it to '
+                             'verify, e.g. blake2b or xxh64 (with xxhash)',
+                        metavar='ALGORITHM')
+    parser.add_argument('--verify',
+                        help='check files of the directory against their '
+                             'checksums, with -w files at the same time',
+                        action='store_true')
+    parser.add_argument('--resume',
+                        help='continue interrupted downloads, skip finished ones',
+                        action='store_true')
+    parser.add_argument('--sync',
+                        help='skip files which did not change since the last sync',
+                        action='store_true')
+    parser.add_argument('--store',
+                        help='download each image once into this shared directory, '
+                             'and link it into the album directories')
+    parser.add_argument('--symlinks',
+                        help='use symbolic links instead of hard links to the store',
+                        action='store_true')
+    parser.add_argument('--no-cache',
+                        help='do not use the cache of resolved albums',
+                        action='store_true')
+    parser.add_argument('--refresh',
+                        help='resolve albums again, and update the cache',
+                        action='store_true')
+    parser.add_argument('--cache-ttl',
+                        help='seconds after which cached albums are revalidated',
+                        type=float, default=86400)
+    parser.add_argument('-i', '--input',
+                        help='file with one link per line, - for stdin')
+    parser.add_argument('-j', '--journal',
+                        help='remember progress of the batch in the destination '
+                             'directory, and continue from it in the next run',
+                        action='store_true')
+    parser.add_argument('-p', '--processes',
+                        help='split the batch between this many processes',
+                        type=int)
+    parser.add_argument('--shard',
+                        help='download only shard i of N shards of the batch, '
+                             'e.g. 0/4')
+    parser.add_argument('--merge',
+                        help='combine reports of N finished shards',
+                        type=int, metavar='N')
+    parser.add_argument('--schedule',
+                        help='order of images in batch mode: fair takes turns '
+                             'between albums, fifo downloads albums one by one',
+                        choices=['fair', 'fifo'], default='fair')
+    parser.add_argument('--priority',
+                        help='download the album before albums of lower '
+                             'priority (default 0), can be repeated',
+                        action='append', default=[], metavar='HASH=N')
+    parser.add_argument('--weight',
+                        help='share of workers of the album, relative to the '
+                             'default 1, can be repeated',
+                        action='append', default=[], metavar='HASH=N')
+    parser.add_argument('--host-limit',
+                        help='maximum number of images downloaded from one host '
+                             'at the same time',
+                        type=int)
+    parser.add_argument('--fanout',
+                        help='number of pages of a user profile fetched at the '
+                             'same time',
+                        type=int, default=4)
+    parser.add_argument('URL', help='source link', nargs='?')
     parser.add_argument('directory', help='destination directory')
 
     args = parser.parse_args()
+    if args.fast_digest is not None:
+        args.checksums = True
+        try:
+            new_digest(args.fast_digest)
+        except ChecksumException as e:
+            parser.error(str(e))
+    if args.verify:
+        if args.URL is not None or args.input is not None or args.merge is not None:
+            parser.error('--verify does not download any links')
+        if args.workers < 1:
+            parser.error('--workers needs a positive number')
+        return args
+    if args.merge is not None:
+        if args.URL is not None or args.input is not None:
+            parser.error('--merge does not download any links')
+        if args.merge < 1:
+            parser.error('--merge needs a positive number of shards')
+        return args
+    if (args.URL is None) == (args.input is None):
+        parser.error('either URL or --input has to be given')
+    batch = args.input is not None or user_name(args.URL) is not None
+    if not batch and (args.processes or args.shard or args.journal):
+        parser.error('--processes, --shard and --journal need --input or '
+                     'a user link')
+    if args.fanout < 1:
+        parser.error('--fanout needs a positive number')
+    if args.rate <= 0 or args.burst < 1:
+        parser.error('--rate and --burst need a positive number')
+    try:
+        args.priority = parse_album_values(args.priority, int)
+        args.weight = parse_album_values(args.weight, float)
+    except ValueError as e:
+        parser.error(str(e))
+    if any(weight <= 0 for weight in args.weight.values()):
+        parser.error('--weight needs a positive number')
+    if args.host_limit is not None and args.host_limit < 1:
+        parser.error('--host-limit needs a positive number')
+    if args.schedule == 'fifo' and (args.priority or args.weight or args.host_limit):
+        parser.error('--priority, --weight and --host-limit need --schedule fair')
+    if args.chunk_size < 1 or (args.fsync_every is not None and args.fsync_every < 1):
+        parser.error('--chunk-size and --fsync-every need a positive number')
+    if args.processes is not None and args.shard is not None:
+        parser.error('--processes and --shard cannot be used together')
+    if args.processes is not None and args.processes < 1:
+        parser.error('--processes needs a positive number')
+    if args.progress and args.verbose:
+        parser.error('--progress and --verbose cannot be used together')
+    if args.progress and args.processes:
+        parser.error('--progress cannot be used with --processes')
+    if args.processes and (args.metrics_port or args.metrics_file):
+        parser.error('--metrics-port and --metrics-file cannot be used with '
+                     '--processes, use --shard or --trace instead')
+    if args.retries < 0 or (args.retry_budget is not None and args.retry_budget < 0):
+        parser.error('--retries and --retry-budget cannot be negative')
+    if args.shard is not None:
+        try:
+            args.shard = Shard.parse(args.shard)
+        except ShardException as e:
+            parser.error(str(e))
 
-    return (args.verbose, args.URL, args.directory)
+    return args
 
 
-if __name__ == '__main__':
-    verbose, url, destination = parse_arguments()
+def parse_album_values(values, convert):
+    """
+    Return a dictionary of album hashes and numbers from HASH=N arguments.
+    """
+    albums = {}
+    for value in values:
+        album, _, number = value.partition('=')
+        try:
+            if not album:
+                raise ValueError
+            albums[album] = convert(number)
+        except ValueError:
+            raise ValueError('Invalid album value: {}, use HASH=N.'.format(value))
+    return albums
+
+
+def read_input(source):
+    """
+    Read links for the batch mode from a file, or from stdin if source is -.
+    """
+    if source == '-':
+        return read_urls(sys.stdin)
+    with open(source, 'r') as f:
+        return read_urls(f)
+
 
-    imgur = Imgur(url)
-    imgur.prepare_images()
-    imgur.numerate_images()
+def read_links(args):
+    """
+    Return links of the batch, read from --input, or discovered on the pages of
+    the user profile given as URL.
+    """
+    if args.input is not None:
+        return read_input(args.input)
+    pool = ConnectionPool(size=args.pool_size, idle_timeout=args.idle_timeout)
+    retry_policy = RetryPolicy(attempts=args.retries + 1)
+    user = ImgurUser(args.URL, pool, args.fanout, retry_policy)
+    try:
+        return user.discover()
+    except NETWORK_ERRORS as e:
+        print('Listing of {} failed after page {}: {}'.format(user.url, user.pages, e))
+        sys.exit(1)
+    finally:
+        pool.close()
+
+
+def download(args, urls=None, shard=None, rate=None):
+    """
+    Download the link, or the links of the batch, and return the batch (None
+    for a single link) and the summary. If the shard is given, only its links
+    are downloaded, and its report is written into the destination directory.
+    """
+    pool = ConnectionPool(size=args.pool_size, idle_timeout=args.idle_timeout)
+    cache = None
+    if not args.no_cache:
+        cache = AlbumCache(
+            default_cache_path(), ttl=args.cache_ttl, refresh=args.refresh
+        )
+
+    manifest_filename = MANIFEST_FILENAME
+    journal_filename = JOURNAL_FILENAME
+    if shard is not None:
+        manifest_filename = shard.manifest_filename()
+        journal_filename = shard.journal_filename()
+
+    budget = args.retry_budget
+    if budget is not None and args.processes:
+        budget = budget // args.processes
+    retry_policy = RetryPolicy(attempts=args.retries + 1, budget=budget)
+    failures = FailureReport()
+
+    metrics = Metrics()
+    trace = None
+    if args.trace == '-':
+        metrics.add_hook(JsonLinesExporter(sys.stdout))
+    elif args.trace is not None:
+        trace = open(args.trace, 'a')
+        metrics.add_hook(JsonLinesExporter(trace))
+    prometheus = None
+    if args.metrics_port is not None or args.metrics_file is not None:
+        prometheus = PrometheusExporter()
+        metrics.add_hook(prometheus)
+        if args.metrics_port is not None:
+            prometheus.serve(port=args.metrics_port)
+
+    journal = None
+    if args.journal:
+        journal = Journal(os.path.join(args.directory, journal_filename))
+
+    batch = None
+    if urls is None:
+        imgur = Imgur(args.URL, pool, cache, retry_policy, metrics)
+        imgur.prepare_images()
+        imgur.numerate_images()
+        if imgur.error is not None:
+            failures.add_album(imgur.url, imgur.error)
+        images = imgur.images
+    else:
+        if shard is not None:
+            urls = shard.select(urls)
+        batch = Batch(urls, pool, cache, journal, retry_policy, metrics)
+        if args.schedule == 'fair':
+            images = Scheduler(
+                batch.stream_images(), args.priority, args.weight, args.host_limit
+            )
+        else:
+            images = Pipeline(batch.stream_images())
+
+    store = None
+    if args.store is not None:
+        store = ObjectStore(args.store, args.symlinks)
+
+    progress = Progress() if args.progress else None
+    fsync_every = None
+    if args.fsync_every is not None:
+        fsync_every = args.fsync_every * 1024 * 1024
+    writer = StreamWriter(args.chunk_size * 1024, fsync_every)
+    checksums = None
+    if args.checksums:
+        checksums = ('sha256',)
+        if args.fast_digest is not None:
+            checksums += (args.fast_digest,)
+    rate = rate or args.rate
+    # The rate of a shard can be below the lowest rate the limiter slows down to
+    # by default, e.g. with many processes.
+    rate_limiter = RateLimiter(rate=rate, burst=args.burst, min_rate=min(MIN_RATE, rate))
+    downloader = Downloader(
+        images, args.directory, args.verbose, args.workers, rate_limiter,
+        pool, args.resume, args.sync, store, manifest_filename, journal,
+        retry_policy, failures, metrics, progress, writer, checksums
+    )
+    try:
+        summary = downloader.download()
+    finally:
+        if trace is not None:
+            trace.close()
+        if prometheus is not None:
+            if args.metrics_file is not None:
+                prometheus.write(args.metrics_file)
+            prometheus.close()
+
+    if batch is not None:
+        for url, error in batch.failed:
+            failures.add_album(url, error)
+    if shard is not None:
+        shard.write_report(args.directory, batch, summary, failures)
+    if args.failures is not None and not args.processes:
+        failures.write(args.failures)
+    return batch, summary
+
+
+def download_shard(args, urls, shard, rate):
+    """
+    Download a shard in a worker process. Only the summary is sent back, the
+    rest is in the report of the shard.
+    """
+    return download(args, urls, shard, rate)[1]
+
+
+def download_in_processes(args, urls):
+    """
+    Download every shard of the batch in its own process, and return the
+    merged reports. The rate limit is divided between the processes, so the
+    whole run still respects it.
+    """
+    count = args.processes
+    rate = args.rate / count
+    with ProcessPoolExecutor(max_workers=count) as executor:
+        futures = [
+            executor.submit(download_shard, args, urls, Shard(index, count), rate)
+            for index in range(count)
+        ]
+        for future in futures:
+            future.result()
+    merge = ShardMerge(args.directory, count)
+    merge.merge()
+    return merge
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
 
-    downloader = Downloader(imgur.images, destination, verbose)
-    downloader.download()
+    if args.verify:
+        report = verify(args.directory, args.workers)
+        print(report.format_summary())
+        sys.exit(0 if report.is_valid() else 1)
+    elif args.merge is not None:
+        merge = ShardMerge(args.directory, args.merge)
+        merge.merge()
+        if args.failures is not None:
+            merge.failures.write(args.failures)
+        print(merge.format_summary())
+    elif args.input is None and user_name(args.URL) is None:
+        download(args)
+    elif args.processes is not None:
+        merge = download_in_processes(args, read_links(args))
+        if args.failures is not None:
+            merge.failures.write(args.failures)
+        print(merge.format_summary())
+    else:
+        batch, summary = download(args, read_links(args), args.shard)
+        print(batch.format_summary(summary))
@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+
+
+"""
+Download many imgur links in a single run. Links are resolved one by one, and
+images of all albums are put into one deque, which is then downloaded by a single
+Downloader. Each album is saved into its own subdirectory, named after the album
+hash. Example:
+
+```python3
+with open('urls.txt') as f:
+    batch = Batch(read_urls(f))
+
+batch.prepare_images()
+downloader = Downloader(batch.images, '/home/user/Download')
+summary = downloader.download()
+print(batch.format_summary(summary))
+```
+
+Albums can also be resolved while the images of the previous ones are being
+downloaded, by streaming the images through a Pipeline:
+
+```python3
+pipeline = Pipeline(batch.stream_images())
+summary = Downloader(pipeline, '/home/user/Download').download()
+```
+
+With a Journal, resolved albums and finished images are remembered, and a
+repeated batch only downloads what is left.
+"""
+
+
+from collections import deque
+from imgur.imgur import Imgur
+from imgur.imgur import ImgurImage
+from imgur.imgur import ImgurException
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+def read_urls(lines):
+    """
+    Return a list of links from an iterable of lines, e.g. an open file or
+    sys.stdin. Empty lines and lines starting with # are ignored.
+    """
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+
+class Batch(object):
+    """
+    Resolve a list of imgur links into one deque of images.
+    """
+
+    def __init__(self, urls, pool=None, cache=None, journal=None,
+                 retry_policy=None, metrics=None):
+        """
+        Initiate Batch object. All albums are fetched through the same connection
+        pool, and share the same album cache, retry policy and metrics. If the
+        journal is given, albums are resolved only once, and images done in
+        previous runs are skipped.
+        """
+        self.urls = urls
+        self.pool = pool
+        self.cache = cache
+        self.journal = journal
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        self.images = deque()
+        self.albums = []
+        self.invalid = []
+        self.failed = []
+        self.finished = 0
+
+    def prepare_images(self):
+        """
+        Resolve all links, and put the images of all albums into the images
+        deque.
+        """
+        self.images.extend(self.stream_images())
+
+    def stream_images(self):
+        """
+        Generator which resolves links one by one, and yields the images of each
+        album as soon as the album is resolved. Invalid links are collected in
+        the invalid attribute, and albums which could not be loaded together
+        with their errors in the failed attribute, instead of stopping the
+        batch. Repeated albums are resolved once.
+        """
+        directories = set()
+        for url in self.urls:
+            try:
+                imgur = Imgur(
+                    url, self.pool, self.cache, self.retry_policy, self.metrics
+                )
+            except ImgurException:
+                self.invalid.append(url)
+                continue
+            directory = self.album_directory(imgur)
+            if directory in directories:
+                continue
+            directories.add(directory)
+            if self.journal is not None:
+                yield from self.stream_journaled_album(imgur, directory)
+            else:
+                yield from self.stream_album(imgur, directory)
+
+    def stream_album(self, imgur, directory):
+        """
+        Resolve a single album, and yield its numerated images, with filenames
+        put into the album subdirectory.
+        """
+        count = 0
+        for image in imgur.stream_images():
+            image.directory = directory
+            count += 1
+            yield image
+        if imgur.error is not None:
+            self.failed.append((imgur.url, imgur.error))
+            return
+        self.albums.append((imgur.url, directory, count))
+
+    def stream_journaled_album(self, imgur, directory):
+        """
+        Resolve the album unless it is in the journal already, and yield its
+        images which are not done yet.
+        """
+        count = self.journal.album_count(directory)
+        if count is None:
+            images = list(imgur.stream_images())
+            if imgur.error is not None:
+                self.failed.append((imgur.url, imgur.error))
+                return
+            for image in images:
+                image.directory = directory
+            self.journal.record_album(imgur.url, directory, images)
+            count = len(images)
+        unfinished = self.journal.unfinished_images(directory)
+        self.finished += count - len(unfinished)
+        self.albums.append((imgur.url, directory, count))
+        for row in unfinished:
+            yield self.journaled_image(row, directory)
+
+    def journaled_image(self, row, directory):
+        """
+        Return ImgurImage from a row of the journal.
+        """
+        image = ImgurImage(
+            row['url'], row['hash'], row['extension'], row['ordinal'],
+            row['digits'], directory
+        )
+        image.filename = row['filename']
+        return image
+
+    def album_directory(self, imgur):
+        """
+        Return the name of the album subdirectory.
+        """
+        return imgur.get_hash()
+
+    def empty_albums(self):
+        """
+        Return links which were resolved to zero images.
+        """
+        return [url for url, _, count in self.albums if count == 0]
+
+    def format_summary(self, summary):
+        """
+        Return aggregate summary of the batch, given the summary returned by
+        Downloader.download.
+        """
+        lines = [
+            'Albums: {}, empty: {}, invalid links: {}.'.format(
+                len(self.albums), len(self.empty_albums()), len(self.invalid)
+            ),
+            'Images: {downloaded} downloaded, {skipped} skipped, '
+            '{failed} failed.'.format(**summary),
+        ]
+        if self.finished:
+            lines.append('Images done in previous runs: {}.'.format(self.finished))
+        for url in self.empty_albums():
+            lines.append('No images found: {}'.format(url))
+        for url, error in self.failed:
+            lines.append('Could not load: {} ({})'.format(url, error))
+        for url in self.invalid:
+            lines.append('Invalid link: {}'.format(url))
+        return '\n'.join(lines)
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+
+
+"""
+On-disk cache of resolved albums. Album pages are large, and they do not change
+often, so the list of (hash, extension) tuples parsed from a page is stored in
+a SQLite database and reused. Example:
+
+```python3
+cache = AlbumCache('/home/user/.cache/crawlgur/albums.sqlite', ttl=3600)
+imgur = Imgur('http://imgur.com/gallery/vTTHZ', cache=cache)
+imgur.prepare_images()  # Fetched from imgur.com and stored
+imgur = Imgur('http://imgur.com/gallery/vTTHZ', cache=cache)
+imgur.prepare_images()  # Taken from the cache
+```
+
+Entries older than ttl seconds are revalidated with a conditional request, using
+the ETag and Last-Modified headers of the original response. When there are more
+than max_entries albums, the least recently used ones are evicted.
+"""
+
+
+import os
+import json
+import sqlite3
+from threading import Lock
+from time import time
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+def default_cache_path():
+    """
+    Return the path of the cache database in the user cache directory.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+    return os.path.join(cache_home, 'crawlgur', 'albums.sqlite')
+
+
+class AlbumCacheException(Exception):
+    """
+    Raise this exception if the cache is configured with invalid values.
+    """
+    pass
+
+
+class AlbumCache(object):
+    """
+    Thread safe SQLite cache of parsed albums, with expiration and LRU eviction.
+    """
+
+    def __init__(self, path, ttl=86400, max_entries=10000, refresh=False,
+                 clock=time):
+        """
+        Initiate AlbumCache. If refresh is set, entries are never taken from the
+        cache, but the new ones are still stored.
+        """
+        if ttl < 0 or max_entries < 1:
+            raise AlbumCacheException('Invalid album cache configuration.')
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.clock = clock
+        self.lock = Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS albums ('
+                'key TEXT PRIMARY KEY, filenames TEXT NOT NULL, '
+                'fetched REAL NOT NULL, accessed REAL NOT NULL, '
+                'etag TEXT, last_modified TEXT)'
+            )
+
+    def lookup(self, key):
+        """
+        Return the entry for the key, fresh or expired, as a dictionary with
+        filenames, fetched, etag and last_modified keys. Return None if there
+        is no entry, or if the cache is being refreshed.
+        """
+        if self.refresh:
+            return None
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                'SELECT filenames, fetched, etag, last_modified FROM albums '
+                'WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                'UPDATE albums SET accessed = ? WHERE key = ?', (self.clock(), key)
+            )
+        return {
+            'filenames': [tuple(filename) for filename in json.loads(row[0])],
+            'fetched': row[1],
+            'etag': row[2],
+            'last_modified': row[3],
+        }
+
+    def is_fresh(self, entry):
+        """
+        Check if the entry is younger than ttl.
+        """
+        return self.clock() - entry['fetched'] <= self.ttl
+
+    def conditional_headers(self, entry):
+        """
+        Return headers for revalidation of an expired entry.
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, key, filenames, headers=None):
+        """
+        Store the list of (hash, extension) tuples parsed from a page, together
+        with the validators from the response headers. An empty list is not
+        stored, since a page without images is more likely a transient failure
+        than an empty album, and it would be reused for the whole ttl.
+        """
+        if not filenames:
+            return
+        headers = headers or {}
+        now = self.clock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO albums VALUES (?, ?, ?, ?, ?, ?)',
+                (key, json.dumps(filenames), now, now,
+                 headers.get('ETag'), headers.get('Last-Modified'))
+            )
+            self.evict()
+
+    def touch(self, key):
+        """
+        Mark the entry as fetched now, after it was successfully revalidated.
+        """
+        now = self.clock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'UPDATE albums SET fetched = ?, accessed = ? WHERE key = ?',
+                (now, now, key)
+            )
+
+    def evict(self):
+        """
+        Remove the least recently used entries over max_entries. Must be called
+        with the lock held.
+        """
+        self.connection.execute(
+            'DELETE FROM albums WHERE key IN (SELECT key FROM albums '
+            'ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+        )
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM albums').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,261 @@
+#!/usr/bin/python3
+
+
+"""
+Checksums of downloaded files. Files are hashed while their bytes are written,
+so nothing is read back from the disk, and every album directory gets a checksum
+manifest with the imgur hash, size, digests and ETag of each file. Example:
+
+```python3
+downloader = Downloader(images, '/home/user/Download', checksums=('sha256', 'blake2b'))
+downloader.download()
+
+report = verify('/home/user/Download', workers=8)
+print(report.format_summary())
+```
+
+SHA-256 is always computed. A second, faster digest can be added, e.g. blake2b,
+or xxh64 and xxh3_64 if the xxhash package is installed, and it is then used by
+verify instead of SHA-256. Files are verified by a pool of threads, which hash on
+all cores at once, since hashlib releases the GIL while it hashes large buffers.
+"""
+
+
+import os
+import json
+import hashlib
+from threading import Lock
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+CHECKSUM_FILENAME = '.crawlgur-checksums.json'
+DEFAULT_ALGORITHMS = ('sha256',)
+XXHASH_ALGORITHMS = ('xxh64', 'xxh3_64', 'xxh3_128')
+READ_SIZE = 1024 * 1024
+
+# Checksum of the body of the image which is downloaded in the current thread
+# or task, set by the code which writes the body.
+current_checksum = ContextVar('current_checksum', default=None)
+
+
+class ChecksumException(Exception):
+    """
+    Raise this exception if the digest algorithm is not available, or if the
+    checksum manifest cannot be read.
+    """
+    pass
+
+
+def new_digest(algorithm):
+    """
+    Return a new hash object for the algorithm, from hashlib or from xxhash.
+    """
+    if algorithm in XXHASH_ALGORITHMS:
+        if xxhash is None:
+            raise ChecksumException('{} needs the xxhash package.'.format(algorithm))
+        return getattr(xxhash, algorithm)()
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise ChecksumException('Unknown digest algorithm: {}.'.format(algorithm))
+
+
+class Checksum(object):
+    """
+    Incremental digests and size of a stream of bytes.
+    """
+
+    def __init__(self, algorithms=DEFAULT_ALGORITHMS):
+        self.digests = {algorithm: new_digest(algorithm) for algorithm in algorithms}
+        self.size = 0
+
+    def update(self, chunk):
+        for digest in self.digests.values():
+            digest.update(chunk)
+        self.size += len(chunk)
+
+    def update_from_file(self, path, length=None):
+        """
+        Hash the first length bytes of the file, or the whole file, e.g. the part
+        of a resumed download which was written by a previous run.
+        """
+        buffer = memoryview(bytearray(READ_SIZE))
+        remaining = length
+        with open(path, 'rb', buffering=0) as f:
+            while remaining is None or remaining > 0:
+                size = f.readinto(buffer if remaining is None else buffer[:remaining])
+                if not size:
+                    break
+                self.update(buffer[:size])
+                if remaining is not None:
+                    remaining -= size
+
+    def hexdigests(self):
+        return {
+            algorithm: digest.hexdigest() for algorithm, digest in self.digests.items()
+        }
+
+
+class ChecksumManifest(object):
+    """
+    Thread safe checksums of the files of one album directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, CHECKSUM_FILENAME)
+        self.entries = {}
+        self.lock = Lock()
+
+    def load(self):
+        """
+        Read the manifest from the disk. Missing manifest is treated as empty.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ChecksumException('Cannot read checksums: {}'.format(e))
+        with self.lock:
+            self.entries = entries.get('files', {})
+
+    def save(self):
+        """
+        Write the manifest to the disk, through a temporary file.
+        """
+        with self.lock:
+            content = json.dumps({'files': self.entries}, indent=2, sort_keys=True)
+        temporary = ''.join([self.path, '.tmp'])
+        with open(temporary, 'w') as f:
+            f.write(content)
+        os.replace(temporary, self.path)
+
+    def record(self, filename, image_hash, checksum, etag=None):
+        """
+        Add or update the entry of the file, with the size and digests of the
+        checksum.
+        """
+        self.record_digests(
+            filename, image_hash, checksum.size, checksum.hexdigests(), etag
+        )
+
+    def record_digests(self, filename, image_hash, size, digests, etag=None):
+        """
+        Add or update the entry of the file, with the size and the hex digests
+        which are already known, e.g. of an object of the store.
+        """
+        entry = {'hash': image_hash, 'size': size, 'etag': etag}
+        entry.update(digests)
+        with self.lock:
+            self.entries[filename] = entry
+
+    def get(self, filename):
+        with self.lock:
+            return self.entries.get(filename)
+
+
+def verification_algorithm(entry):
+    """
+    Return the fastest algorithm recorded in the entry which can be computed.
+    """
+    for algorithm in sorted(entry):
+        if algorithm in XXHASH_ALGORITHMS and xxhash is not None:
+            return algorithm
+    if 'blake2b' in entry:
+        return 'blake2b'
+    return 'sha256'
+
+
+def verify_file(path, entry):
+    """
+    Return None if the file matches the entry, otherwise the reason why it does
+    not.
+    """
+    if not os.path.exists(path):
+        return 'missing'
+    if os.path.getsize(path) != entry['size']:
+        return 'size'
+    algorithm = verification_algorithm(entry)
+    checksum = Checksum([algorithm])
+    checksum.update_from_file(path)
+    if checksum.hexdigests()[algorithm] != entry[algorithm]:
+        return 'digest'
+    return None
+
+
+class VerifyReport(object):
+    """
+    Result of the verification of a directory.
+    """
+
+    def __init__(self):
+        self.verified = 0
+        self.missing = []
+        self.corrupt = []
+
+    def is_valid(self):
+        return not self.missing and not self.corrupt
+
+    def format_summary(self):
+        lines = ['Verified: {}, missing: {}, corrupt: {}.'.format(
+            self.verified, len(self.missing), len(self.corrupt)
+        )]
+        for path in self.missing:
+            lines.append('Missing: {}'.format(path))
+        for path in self.corrupt:
+            lines.append('Corrupt: {}'.format(path))
+        return '\n'.join(lines)
+
+
+def find_manifests(directory):
+    """
+    Return checksum manifests of the directory and all of its subdirectories.
+    """
+    manifests = []
+    for root, _, files in os.walk(directory):
+        if CHECKSUM_FILENAME in files:
+            manifest = ChecksumManifest(root)
+            manifest.load()
+            manifests.append(manifest)
+    return manifests
+
+
+def verify(directory, workers=4):
+    """
+    Check every file recorded in the checksum manifests of the directory and its
+    subdirectories, with workers files hashed at the same time, and return
+    VerifyReport.
+    """
+    files = []
+    for manifest in find_manifests(directory):
+        for filename, entry in sorted(manifest.entries.items()):
+            files.append((os.path.join(manifest.directory, filename), entry))
+
+    report = VerifyReport()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda item: verify_file(*item), files)
+        for (path, _), reason in zip(files, results):
+            relative = os.path.relpath(path, directory)
+            if reason is None:
+                report.verified += 1
+            elif reason == 'missing':
+                report.missing.append(relative)
+            else:
+                report.corrupt.append(relative)
+    return report
@@ -0,0 +1,308 @@
+#!/usr/bin/python3
+
+
+"""
+HTTP client that keeps persistent connections to imgur hosts. Both Imgur and
+Downloader send their requests through a ConnectionPool, so consecutive requests
+to i.imgur.com reuse the same TCP (and TLS) connection. Example:
+
+```python3
+pool = ConnectionPool(size=4, idle_timeout=30)
+
+with pool.request('https://i.imgur.com/jedEzFL.jpg') as response:
+    data = response.read()
+```
+
+Errors are reported the same way urllib.request.urlopen reports them, with
+HTTPError for 4xx and 5xx status codes, and URLError for connection problems.
+
+Requests for a host can be routed to another server, e.g. to a local fake imgur
+server in benchmarks:
+
+```python3
+pool = ConnectionPool(routes={'i.imgur.com': 'http://127.0.0.1:8000'})
+```
+"""
+
+
+import socket
+from io import BytesIO
+from threading import Lock
+from time import monotonic
+from http.client import HTTPConnection
+from http.client import HTTPSConnection
+from http.client import HTTPException
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+from urllib.error import HTTPError
+from urllib.error import URLError
+from imgur.metrics import record
+from imgur.metrics import annotate
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+USER_AGENT = 'crawlgur/0.2.0'
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class ConnectionPoolException(Exception):
+    """
+    Raise this exception if the pool is configured with invalid values.
+    """
+    pass
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """
+    HTTPConnection which records the time of the name resolution in the current
+    trace, separately from the time of the connect. The pool does not use
+    proxies, so the connection is never tunneled.
+    """
+
+    resolution_time = 0
+
+    def connect(self):
+        self.sock = self.create_connection()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def create_connection(self):
+        """
+        Resolve the host name and open the socket, like socket.create_connection
+        does. The whole address is used, so IPv6 flow info and scope id, e.g.
+        of link-local addresses, are kept.
+        """
+        start = monotonic()
+        addresses = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        self.resolution_time = monotonic() - start
+        record('dns', self.resolution_time)
+        error = OSError('No address found for {}.'.format(self.host))
+        for family, kind, protocol, _, address in addresses:
+            sock = socket.socket(family, kind, protocol)
+            try:
+                sock.settimeout(self.timeout)
+                if self.source_address:
+                    sock.bind(self.source_address)
+                sock.connect(address)
+                return sock
+            except OSError as e:
+                sock.close()
+                error = e
+        raise error
+
+
+class TimedHTTPSConnection(HTTPSConnection, TimedHTTPConnection):
+    """
+    HTTPSConnection which opens its socket through TimedHTTPConnection, and then
+    starts TLS on it.
+    """
+    pass
+
+
+class PooledResponse(object):
+    """
+    Wrapper around http.client.HTTPResponse which gives the connection back to
+    the pool once the response is closed.
+    """
+
+    def __init__(self, pool, key, connection, response, url):
+        self.pool = pool
+        self.key = key
+        self.connection = connection
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.code = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read(self, amount=None):
+        return self.response.read(amount)
+
+    def readinto(self, buffer):
+        return self.response.readinto(buffer)
+
+    def getheader(self, name, default=None):
+        return self.response.getheader(name, default)
+
+    def geturl(self):
+        return self.url
+
+    def close(self):
+        """
+        Release the connection. It is kept only if the body was read completely
+        and the server did not ask for the connection to be closed.
+        """
+        if self.connection is None:
+            return
+        reusable = self.response.isclosed() and not self.response.will_close
+        self.response.close()
+        self.pool.release(self.key, self.connection, reusable)
+        self.connection = None
+
+
+class ConnectionPool(object):
+    """
+    Thread safe pool of persistent HTTP(S) connections, grouped by host.
+    """
+
+    def __init__(self, size=4, idle_timeout=30, timeout=30, max_redirects=5,
+                 routes=None):
+        """
+        Initiate ConnectionPool. Size is the number of idle connections kept per
+        host, and connections idle for longer than idle_timeout seconds are
+        closed instead of being reused. Routes map host names to the base urls
+        of the servers which receive their requests.
+        """
+        if size < 1 or idle_timeout < 0:
+            raise ConnectionPoolException('Invalid connection pool configuration.')
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.routes = {}
+        for host, base in (routes or {}).items():
+            route = urlsplit(base)
+            self.routes[host] = (route.scheme, route.hostname, route.port)
+        self.idle = {}
+        self.lock = Lock()
+
+    def request(self, url, headers=None, method='GET'):
+        """
+        Send a request and return PooledResponse. Redirects are followed. Raise
+        HTTPError if the final status code is 4xx or 5xx.
+        """
+        for _ in range(self.max_redirects + 1):
+            response = self.send(url, headers or {}, method)
+            location = response.getheader('Location')
+            if response.status in REDIRECT_CODES and location:
+                self.discard_body(response)
+                url = urljoin(url, location)
+                continue
+            annotate('status', response.status)
+            if response.status >= 400:
+                body = self.discard_body(response)
+                raise HTTPError(
+                    url, response.status, response.reason, response.headers,
+                    BytesIO(body)
+                ) from None
+            return response
+        raise URLError('Too many redirects.')
+
+    def send(self, url, headers, method):
+        """
+        Send a single request. A reused connection could have been closed by the
+        server in the meantime, in which case the request is sent again over a
+        new connection.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise URLError('Unsupported url: {}'.format(url))
+        key = (parts.scheme, parts.hostname, parts.port)
+        key = self.routes.get(parts.hostname, key)
+        path = parts.path or '/'
+        if parts.query:
+            path = '?'.join([path, parts.query])
+        request_headers = {'User-Agent': USER_AGENT}
+        request_headers.update(headers)
+
+        connection, reused = self.acquire(key)
+        try:
+            try:
+                response = self.exchange(connection, method, path, request_headers)
+            except (HTTPException, ConnectionError):
+                connection.close()
+                if not reused:
+                    raise
+                connection = self.connect(key)
+                response = self.exchange(connection, method, path, request_headers)
+        except (HTTPException, OSError) as e:
+            connection.close()
+            raise URLError(e) from None
+        return PooledResponse(self, key, connection, response, url)
+
+    def exchange(self, connection, method, path, headers):
+        """
+        Open the connection if it is new, send the request, and read the status
+        line and the headers. Time spent on the handshake, and on waiting for
+        the response, is recorded in the current trace.
+        """
+        if connection.sock is None:
+            start = monotonic()
+            connection.connect()
+            record('connect', monotonic() - start - connection.resolution_time)
+        start = monotonic()
+        connection.request(method, path, headers=headers)
+        response = connection.getresponse()
+        record('ttfb', monotonic() - start)
+        return response
+
+    def acquire(self, key):
+        """
+        Return an idle connection for the host and True, or a new connection and
+        False if there is no idle connection.
+        """
+        now = monotonic()
+        with self.lock:
+            connections = self.idle.get(key, [])
+            while connections:
+                connection, released = connections.pop()
+                if now - released <= self.idle_timeout:
+                    return connection, True
+                connection.close()
+        return self.connect(key), False
+
+    def connect(self, key):
+        scheme, host, port = key
+        if scheme == 'https':
+            return TimedHTTPSConnection(host, port, timeout=self.timeout)
+        return TimedHTTPConnection(host, port, timeout=self.timeout)
+
+    def release(self, key, connection, reusable=True):
+        """
+        Put the connection back into the pool, or close it if it cannot be reused
+        or the pool for the host is full.
+        """
+        if reusable and connection.sock is not None:
+            with self.lock:
+                connections = self.idle.setdefault(key, [])
+                if len(connections) < self.size:
+                    connections.append((connection, monotonic()))
+                    return
+        connection.close()
+
+    def discard_body(self, response):
+        """
+        Read the rest of the response body, so that the connection can be reused.
+        """
+        try:
+            return response.read()
+        except (HTTPException, OSError):
+            return b''
+        finally:
+            response.close()
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+
+
+default_pool = ConnectionPool()
@@ -14,15 +14,48 @@ imgur.numerate_images()
 downloader = Downloader(imgur.images, '/home/user/Download')
 downloader.download()
 ```
+
+Downloader can also be used from asyncio code, in which case the workers are
+coroutines instead of threads:
+
+```python3
+async with AsyncSession() as session:
+    await imgur.aprepare_images(session)
+    imgur.numerate_images()
+    await Downloader(imgur.images, '/home/user/Download', workers=32).adownload(session)
+```
 """
 
 
 import os
-from urllib.request import urlopen
-from urllib.request import HTTPError
-from urllib.request import URLError
-from shutil import copyfileobj
-from time import sleep
+import re
+import asyncio
+from urllib.error import HTTPError
+from urllib.error import URLError
+from urllib.parse import urlsplit
+from time import monotonic
+from threading import Lock
+from threading import BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
+from imgur.ratelimit import RateLimiter
+from imgur.retry import RetryPolicy
+from imgur.retry import FailureReport
+from imgur.retry import NETWORK_ERRORS
+from imgur.connection import default_pool
+from imgur.metrics import record
+from imgur.metrics import annotate
+from imgur.metrics import default_metrics
+from imgur.manifest import Manifest
+from imgur.manifest import MANIFEST_FILENAME
+from imgur.store import ObjectStoreException
+from imgur.session import AsyncSession
+from imgur.writer import StreamWriter
+from imgur.scheduler import Scheduler
+from imgur.scheduler import SchedulerException
+from imgur.checksum import Checksum
+from imgur.checksum import ChecksumManifest
+from imgur.checksum import current_checksum
+from imgur.scanner import CHUNK_SIZE
 
 
 __author__ = 'petarGitNik'
@@ -41,47 +74,627 @@ class DownloaderException(Exception):
     pass
 
 
+class IncompleteDownloadException(DownloaderException):
+    """
+    Raise this exception if the connection was closed before the whole file was
+    received. Such download is worth another attempt.
+    """
+    transient = True
+
+
+class NotModifiedException(Exception):
+    """
+    Raise this exception if the server answered a conditional request with 304
+    Not Modified, so the existing file is kept. It is not an error.
+    """
+
+    def __init__(self, headers):
+        super().__init__('Not modified.')
+        self.headers = headers
+
+
+DOWNLOAD_ERRORS = NETWORK_ERRORS + (DownloaderException, ObjectStoreException)
+
+# Functions which are used relative to the destination directory. os.replace
+# is not listed in os.supports_dir_fd, but it supports dir_fd wherever os.rename
+# does.
+DIR_FD_FUNCTIONS = frozenset([os.open, os.stat, os.mkdir, os.unlink, os.rename])
+O_DIRECTORY = getattr(os, 'O_DIRECTORY', 0)
+
+
 class Downloader(object):
     """
     This class downloads files from provided source.
     """
 
-    def __init__(self, images, destination, verbose=False):
+    def __init__(self, images, destination, verbose=False, workers=1,
+                 rate_limiter=None, pool=None, resume=False, sync=False,
+                 store=None, manifest_filename=MANIFEST_FILENAME, journal=None,
+                 retry_policy=None, failures=None, metrics=None, progress=None,
+                 writer=None, checksums=None):
         """
-        Initiate Downloader object, with information about current and destination
-        directory.
+        Initiate Downloader object, with information about destination
+        directory. Number of workers determines how many images are downloaded
+        at the same time. All workers share the same rate limiter and connection
+        pool. In resume mode, interrupted downloads are continued from where
+        they stopped. In sync mode, files recorded in the manifest of the
+        destination directory are not downloaded again. If an object store is
+        given, images are downloaded into the store once, and linked into the
+        destination directory. Shards of a batch keep their manifests under
+        their own manifest filenames. If the journal is given, the state of
+        every image is recorded in it. Failed requests are repeated according
+        to the retry policy (without one, every image is attempted once), and
+        images which still fail are added to the failure report. Every image
+        is traced for the hooks of the metrics. If progress is given, it shows
+        the throughput of all workers together. Response bodies are written into
+        files by the given StreamWriter, or by one with the default chunk size.
+        If checksums names digest algorithms, e.g. ('sha256',), downloaded files
+        are hashed as they are written, and recorded in the checksum manifest of
+        their album directory.
         """
         self.images = images
         self.destination = self.is_valid_path(destination)
         self.verbose = verbose
-        self.current_directory = os.getcwd()
+        self.workers = self.is_valid_number_of_workers(workers)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.pool = pool or default_pool
+        self.resume = resume
+        self.manifest = None
+        if sync:
+            self.manifest = Manifest(self.destination, manifest_filename)
+        self.store = store
+        self.journal = journal
+        self.retry_policy = retry_policy or RetryPolicy(attempts=1)
+        self.failures = failures if failures is not None else FailureReport()
+        self.metrics = metrics or default_metrics
+        self.progress = progress
+        self.writer = writer or StreamWriter()
+        self.checksums = checksums
+        self.checksum_manifests = {}
+        self.root = os.path.abspath(self.destination)
+        self.directory_fd = None
+        self.written_directories = set()
+        self.currently_at = 0
+        self.total = 0
+        self.summary = {'downloaded': 0, 'skipped': 0, 'failed': 0}
+        self.lock = Lock()
 
     def download(self):
         """
-        Download the images.
+        Download the images. If there is more than one worker, images are
+        downloaded concurrently by a pool of threads. The current directory of
+        the process is not changed, so downloaders of different directories
+        can run at the same time. Return the summary with the number of
+        downloaded, skipped and failed images.
         """
-        os.chdir(self.destination)
+        if self.manifest is not None:
+            self.manifest.load()
+        self.open_destination()
 
-        currently_at = 1
-        total = len(self.images)
-        while self.images:
-            image = self.images.popleft()
+        self.currently_at = 0
+        self.total = len(self.images) if hasattr(self.images, '__len__') else None
+        if self.progress is not None:
+            self.progress.begin(self.total)
+        try:
+            if self.workers == 1:
+                for image in self.consume_images():
+                    self.download_image(image)
+            else:
+                self.download_concurrently()
+        finally:
+            self.close_destination()
+            if self.progress is not None:
+                self.progress.close()
+            if self.manifest is not None:
+                self.manifest.save()
+            if self.store is not None:
+                self.store.save()
+            self.save_checksums()
+        return self.summary
 
-            if self.verbose: self.display_status(image['url'], currently_at, total)
+    def consume_images(self):
+        """
+        Yield images to download. A deque is emptied as before, and any other
+        iterable, e.g. a Pipeline, is consumed as its images arrive.
+        """
+        if hasattr(self.images, 'popleft'):
+            while self.images:
+                yield self.images.popleft()
+        else:
+            yield from self.images
 
-            try:
-                self.write_file_to_filesystem(image['url'], image['filename'])
-            except HTTPError as e:
+    async def aconsume_images(self):
+        """
+        Asynchronous counterpart of consume_images. A deque or a list is consumed
+        directly. Any other source, e.g. a Pipeline or a Scheduler, can block
+        while it waits for its images, so it is consumed in the default executor
+        of the loop, which keeps running the downloads in the meantime.
+        """
+        if hasattr(self.images, 'popleft') or isinstance(self.images, (list, tuple)):
+            for image in self.consume_images():
+                yield image
+            return
+        loop = asyncio.get_running_loop()
+        images = iter(self.images)
+        while True:
+            image = await loop.run_in_executor(None, next, images, None)
+            if image is None:
+                return
+            yield image
+
+    def image_done(self, image):
+        """
+        Tell the source of the images that the image is finished, if it keeps
+        track of that, e.g. a Scheduler with a limit per host.
+        """
+        if hasattr(self.images, 'task_done'):
+            self.images.task_done(image)
+
+    def download_concurrently(self):
+        """
+        Submit images to a pool of threads. At most two images per worker wait
+        for a free worker, so that the images are not taken from the source
+        faster than they can be downloaded. An unexpected error, i.e. one which
+        is not counted as a failed image, stops the submission of images, and
+        is raised when the running downloads are finished, like with a single
+        worker.
+        """
+        pending = BoundedSemaphore(self.workers * 2)
+        errors = []
+        def finished(future):
+            if future.exception() is not None:
+                errors.append(future.exception())
+            pending.release()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for image in self.consume_images():
+                pending.acquire()
+                if errors:
+                    break
+                future = executor.submit(self.download_image, image)
+                future.add_done_callback(finished)
+        if errors:
+            raise errors[0]
+
+    def download_image(self, image):
+        """
+        Download a single image, and pass its trace to the metrics hooks.
+        """
+        if self.progress is not None:
+            self.progress.image_started()
+        token = current_checksum.set(None)
+        try:
+            with self.metrics.trace('image', url=image['url'], filename=image['filename']):
+                self.transfer_image(image)
+        finally:
+            current_checksum.reset(token)
+            self.image_done(image)
+
+    def transfer_image(self, image):
+        """
+        Download a single image. Errors are handled per image, so that one failed
+        download does not stop the others.
+        """
+        with self.lock:
+            self.currently_at += 1
+            currently_at = self.currently_at
+            if self.verbose: self.display_status(image['url'], currently_at, self.total)
+        if self.journal is not None:
+            self.journal.start(image['filename'])
+
+        if self.resume and self.file_exists(image['filename']):
+            if self.verbose:
+                print('Already downloaded:', image['filename'])
+            self.count('skipped', image)
+            return
+
+        headers = {}
+        if self.manifest is not None:
+            if self.manifest.is_current(image['filename']):
                 if self.verbose:
-                    print('Could not download, error status:', e.code)
-            except URLError as e:
+                    print('Up to date:', image['filename'])
+                self.count('skipped', image)
+                return
+            headers = self.manifest.conditional_headers(image['filename'])
+
+        self.make_parent_directory(image['filename'])
+        if self.store is not None:
+            stored = self.store.lookup(self.store_key(image['url']))
+            if stored is not None:
+                try:
+                    self.link_from_store(stored, image['filename'])
+                except ObjectStoreException as e:
+                    self.fail(image, e, 1)
+                    return
+                if self.manifest is not None:
+                    self.manifest.record(image['filename'], image['url'])
+                self.record_stored_checksum(image, stored)
                 if self.verbose:
-                    print('Something went wrong:', e.reason)
+                    print('Linked from the store:', image['filename'])
+                self.count('skipped', image)
+                return
+
+        attempt = 1
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response_headers = self.fetch_image(image, headers)
+                break
+            except NotModifiedException as e:
+                self.not_modified(image, e.headers)
+                return
+            except DOWNLOAD_ERRORS as e:
+                if not self.should_retry(e, attempt):
+                    self.fail(image, e, attempt)
+                    return
+            if self.verbose:
+                print('Retrying:', image['url'])
+            record('retries', 1)
+            self.retry_policy.pause(attempt)
+            attempt += 1
+
+        self.rate_limiter.success()
+        if self.manifest is not None:
+            self.manifest.record(image['filename'], image['url'], response_headers)
+        self.record_checksum(image, response_headers)
+        self.count('downloaded', image)
+
+    def fetch_image(self, image, headers):
+        """
+        Send a single request for the image, and write it into the filesystem,
+        or into the store. Return the response headers.
+        """
+        current_checksum.set(None)
+        if self.store is not None:
+            return self.write_file_to_store(image['url'], image['filename'])
+        return self.write_file_to_filesystem(image['url'], image['filename'], headers)
+
+    def not_modified(self, image, headers):
+        """
+        Count the image whose file is still current as skipped, and keep the
+        validators of the response in the manifest.
+        """
+        self.rate_limiter.success()
+        if self.manifest is not None:
+            self.manifest.record(image['filename'], image['url'], headers)
+        if self.verbose:
+            print('Not modified:', image['filename'])
+        self.count('skipped', image)
+
+    def should_retry(self, error, attempt):
+        """
+        Slow down if the server asked for it, and check if the failed attempt
+        should be repeated.
+        """
+        if isinstance(error, HTTPError):
+            self.rate_limiter.failure(error.code, error.headers)
+        return self.retry_policy.should_retry(error, attempt)
+
+    def fail(self, image, error, attempts):
+        """
+        Count the image as failed, and add it to the failure report.
+        """
+        self.count('failed', image)
+        annotate('error', str(error))
+        self.failures.add_image(
+            image, error, attempts, self.retry_policy.is_retryable(error)
+        )
+        if self.verbose:
+            if isinstance(error, HTTPError):
+                print('Could not download, error status:', error.code)
+            elif isinstance(error, URLError):
+                print('Something went wrong:', error.reason)
+            else:
+                print('Something went wrong:', error)
+
+    async def adownload(self, session=None):
+        """
+        Coroutine counterpart of download. Images are downloaded through the
+        given AsyncSession, or through a new one, which is closed afterwards,
+        and the number of workers limits how many are downloaded at the same
+        time. If the coroutine is cancelled, the downloads in progress are
+        cancelled too, and their unfinished files are removed. An unexpected
+        error is raised when the downloads in progress are finished. A Scheduler
+        with a limit per host can only be used with download.
+        """
+        if isinstance(self.images, Scheduler) and self.images.host_limit is not None:
+            raise SchedulerException('Host limit cannot be used with adownload.')
+        if session is None:
+            async with AsyncSession(limit=self.workers) as session:
+                return await self.adownload(session)
+
+        if self.manifest is not None:
+            self.manifest.load()
+        self.open_destination()
+        self.currently_at = 0
+        self.total = len(self.images) if hasattr(self.images, '__len__') else None
+        if self.progress is not None:
+            self.progress.begin(self.total)
+        workers = asyncio.Semaphore(self.workers)
+        tasks = set()
+        errors = []
+        def finished(task):
+            tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                errors.append(task.exception())
+            workers.release()
+        try:
+            async for image in self.aconsume_images():
+                await workers.acquire()
+                if errors:
+                    break
+                task = asyncio.ensure_future(self.adownload_image(session, image))
+                tasks.add(task)
+                task.add_done_callback(finished)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            if errors:
+                raise errors[0]
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self.close_destination()
+            if self.progress is not None:
+                self.progress.close()
+            if self.manifest is not None:
+                self.manifest.save()
+            if self.store is not None:
+                self.store.save()
+            self.save_checksums()
+        return self.summary
+
+    async def adownload_image(self, session, image):
+        """
+        Coroutine counterpart of download_image.
+        """
+        if self.progress is not None:
+            self.progress.image_started()
+        token = current_checksum.set(None)
+        try:
+            with self.metrics.trace('image', url=image['url'], filename=image['filename']):
+                await self.atransfer_image(session, image)
+        finally:
+            current_checksum.reset(token)
+            self.image_done(image)
+
+    async def atransfer_image(self, session, image):
+        """
+        Coroutine counterpart of transfer_image. Partial downloads are not
+        continued, but in resume mode finished files are still skipped.
+        """
+        with self.lock:
+            self.currently_at += 1
+            if self.verbose: self.display_status(image['url'], self.currently_at, self.total)
+        if self.journal is not None:
+            self.journal.start(image['filename'])
+
+        if self.resume and self.file_exists(image['filename']):
+            self.count('skipped', image)
+            return
+
+        headers = {}
+        if self.manifest is not None:
+            if self.manifest.is_current(image['filename']):
+                self.count('skipped', image)
+                return
+            headers = self.manifest.conditional_headers(image['filename'])
+
+        self.make_parent_directory(image['filename'])
+        if self.store is not None:
+            stored = self.store.lookup(self.store_key(image['url']))
+            if stored is not None:
+                try:
+                    self.link_from_store(stored, image['filename'])
+                except ObjectStoreException as e:
+                    self.fail(image, e, 1)
+                    return
+                if self.manifest is not None:
+                    self.manifest.record(image['filename'], image['url'])
+                self.record_stored_checksum(image, stored)
+                self.count('skipped', image)
+                return
+
+        attempt = 1
+        while True:
+            await self.rate_limiter.aacquire()
+            try:
+                response_headers = await self.afetch_image(session, image, headers)
+                break
+            except NotModifiedException as e:
+                self.not_modified(image, e.headers)
+                return
+            except DOWNLOAD_ERRORS as e:
+                if not self.should_retry(e, attempt):
+                    self.fail(image, e, attempt)
+                    return
+            record('retries', 1)
+            await self.retry_policy.apause(attempt)
+            attempt += 1
+
+        self.rate_limiter.success()
+        if self.manifest is not None:
+            self.manifest.record(image['filename'], image['url'], response_headers)
+        self.record_checksum(image, response_headers)
+        self.count('downloaded', image)
+
+    async def afetch_image(self, session, image, headers):
+        """
+        Coroutine counterpart of fetch_image.
+        """
+        current_checksum.set(None)
+        if self.store is None:
+            return await self.awrite_file_to_filesystem(
+                session, image['url'], image['filename'], headers
+            )
+        temporary = self.store.temporary_path()
+        try:
+            response_headers = await self.awrite_file_to_filesystem(
+                session, image['url'], temporary
+            )
+            stored = self.store.add(
+                self.store_key(image['url']), temporary, self.stored_digest()
+            )
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        self.link_from_store(stored, image['filename'])
+        return response_headers
+
+    async def awrite_file_to_filesystem(self, session, url, filename, headers=None):
+        """
+        Coroutine counterpart of write_file_to_filesystem. Partial downloads are
+        not continued, and a cancelled download does not leave a truncated file
+        behind. Return the response headers.
+        """
+        partial = self.partial_filename(filename)
+        async with await session.request(url, headers) as response:
+            if response.status == 304:
+                raise NotModifiedException(response.headers)
+            self.expect_body(response)
+            checksum = self.start_checksum()
+            start = monotonic()
+            try:
+                with self.open_file(partial, 'wb') as f:
+                    chunk = await response.read(CHUNK_SIZE)
+                    while chunk:
+                        f.write(chunk)
+                        if self.progress is not None:
+                            self.progress.advance(len(chunk))
+                        if checksum is not None:
+                            checksum.update(chunk)
+                        chunk = await response.read(CHUNK_SIZE)
+                    record('bytes', f.tell())
+            except BaseException:
+                self.remove_file(partial)
+                raise
+            finally:
+                record('transfer', monotonic() - start)
+        self.replace_file(partial, filename)
+        return response.headers
+
+    def count(self, outcome, image=None):
+        """
+        Increase the number of images with the given outcome in the summary, and
+        record the outcome of the image in the journal.
+        """
+        with self.lock:
+            self.summary[outcome] += 1
+        if self.progress is not None:
+            self.progress.image_finished(outcome)
+        annotate('outcome', outcome)
+        if self.journal is not None and image is not None:
+            self.journal.finish(image['filename'], outcome)
+
+    def open_destination(self):
+        """
+        Open the destination directory, so that files are opened, renamed and
+        removed relative to it (dir_fd), without changing the current directory
+        of the process. Where dir_fd is not supported, e.g. on Windows, absolute
+        paths are used instead.
+        """
+        self.written_directories = set()
+        if DIR_FD_FUNCTIONS <= os.supports_dir_fd:
+            self.directory_fd = os.open(self.root, os.O_RDONLY | O_DIRECTORY)
+
+    def close_destination(self):
+        """
+        Flush the entries of every directory which got new files to the disk,
+        once per run instead of once per file, and close the destination.
+        """
+        if self.directory_fd is None:
+            return
+        try:
+            for directory in sorted(self.written_directories):
+                descriptor = os.open(
+                    directory or '.', os.O_RDONLY | O_DIRECTORY,
+                    dir_fd=self.directory_fd
+                )
+                try:
+                    os.fsync(descriptor)
+                finally:
+                    os.close(descriptor)
+        finally:
+            os.close(self.directory_fd)
+            self.directory_fd = None
+
+    def file_path(self, filename):
+        """
+        Return the path of the file for the os functions, relative to the
+        destination directory if it is open, otherwise absolute.
+        """
+        if self.directory_fd is None:
+            return os.path.join(self.root, filename)
+        return filename
+
+    def opener(self, path, flags):
+        return os.open(path, flags, 0o666, dir_fd=self.directory_fd)
+
+    def open_file(self, filename, mode):
+        """
+        Open the file of the destination directory.
+        """
+        return open(self.file_path(filename), mode, opener=self.opener)
+
+    def file_exists(self, filename):
+        try:
+            os.stat(self.file_path(filename), dir_fd=self.directory_fd)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def file_size(self, filename):
+        return os.stat(self.file_path(filename), dir_fd=self.directory_fd).st_size
+
+    def remove_file(self, filename):
+        """
+        Remove the file if it exists.
+        """
+        try:
+            os.unlink(self.file_path(filename), dir_fd=self.directory_fd)
+        except FileNotFoundError:
+            pass
+
+    def replace_file(self, source, filename):
+        """
+        Atomically rename the source, e.g. a finished .part file, to the filename,
+        and remember the directory for the flush at the end of the run.
+        """
+        os.replace(
+            self.file_path(source), self.file_path(filename),
+            src_dir_fd=self.directory_fd, dst_dir_fd=self.directory_fd
+        )
+        self.written(filename)
 
-            currently_at += 1
-            sleep(2)
+    def written(self, filename):
+        if not os.path.isabs(filename):
+            with self.lock:
+                self.written_directories.add(os.path.dirname(filename))
+
+    def link_from_store(self, stored, filename):
+        """
+        Link the object of the store to the file of the destination directory.
+        """
+        self.store.link(stored, os.path.join(self.root, filename))
+        self.written(filename)
 
-        os.chdir(self.current_directory)
+    def make_parent_directory(self, filename):
+        """
+        Create the directory of the file, if filename contains one, e.g. an album
+        subdirectory in batch mode.
+        """
+        directory = os.path.dirname(filename)
+        if not directory or os.path.isabs(filename):
+            return
+        path = ''
+        for part in directory.split(os.sep):
+            path = os.path.join(path, part)
+            try:
+                os.mkdir(self.file_path(path), dir_fd=self.directory_fd)
+            except FileExistsError:
+                continue
+            self.written(path)
 
     def is_valid_path(self, path):
         """
@@ -92,6 +705,15 @@ class Downloader(object):
             return path
         raise DownloaderException('Destination directory does not exist.')
 
+    def is_valid_number_of_workers(self, workers):
+        """
+        Check if the number of workers is a positive integer. If not, raise
+        exception.
+        """
+        if isinstance(workers, int) and workers > 0:
+            return workers
+        raise DownloaderException('Number of workers must be a positive integer.')
+
     def display_status(self, url, currently_at, total):
         """
         Display the link of the image which is being downloaded, and download
@@ -99,13 +721,239 @@ class Downloader(object):
         """
         print(
             'Progress: {}/{}. Downloading: {}'.format(
-                currently_at, total, url
+                currently_at, '?' if total is None else total, url
+            )
+        )
+
+    def write_file_to_filesystem(self, url, filename, headers=None):
+        """
+        Download and write a file to a file system. Additional request headers
+        can be given, e.g. for a conditional request, in which case the file is
+        left untouched, and NotModifiedException is raised, if the server
+        responds with 304 Not Modified. The body
+        is written into filename.part, which is renamed to filename when it is
+        complete, so filename is never a truncated file. Return the response
+        headers.
+        """
+        if self.resume and not headers:
+            return self.resume_file_to_filesystem(url, filename)
+        partial = self.partial_filename(filename)
+        with self.pool.request(url, headers) as r:
+            if r.status == 304:
+                raise NotModifiedException(r.headers)
+            try:
+                with self.open_file(partial, 'wb') as f:
+                    self.copy_body(r, f)
+            except BaseException:
+                self.remove_file(partial)
+                raise
+        self.replace_file(partial, filename)
+        return r.headers
+
+    def copy_body(self, response, f):
+        """
+        Copy the response body into the file with the stream writer, and record
+        the time and the number of bytes in the current trace. Raise
+        IncompleteDownloadException if the body is shorter than its
+        Content-Length, since the response itself does not report it.
+        """
+        length = self.expect_body(response)
+        start = monotonic()
+        position = f.tell()
+        checksum = self.start_checksum()
+        if checksum is not None and position:
+            # Resumed download, the part written by a previous run is hashed
+            # from the disk.
+            checksum.update_from_file(os.path.join(self.root, f.name), position)
+        try:
+            written = self.writer.copy(response, f, length, self.progress, checksum)
+        finally:
+            record('transfer', monotonic() - start)
+            record('bytes', f.tell() - position)
+        if length is not None and written != length:
+            raise IncompleteDownloadException(
+                'Incomplete download of {}, got {} of {} bytes.'.format(
+                    response.geturl(), written, length
+                )
             )
+
+    def start_checksum(self):
+        """
+        Return a new Checksum for the body which is about to be written, and make
+        it the checksum of the current image. Return None without checksums,
+        unless the body goes into the object store, which needs its SHA-256.
+        """
+        if not self.checksums and self.store is None:
+            return None
+        algorithms = tuple(self.checksums or ())
+        if 'sha256' not in algorithms:
+            algorithms = ('sha256',) + algorithms
+        checksum = Checksum(algorithms)
+        current_checksum.set(checksum)
+        return checksum
+
+    def record_checksum(self, image, headers):
+        """
+        Record the checksum of the image which was just downloaded in the checksum
+        manifest of its directory. Nothing is recorded if the body was not
+        received.
+        """
+        checksum = current_checksum.get()
+        if checksum is None or not self.checksums:
+            return
+        self.record_digests(
+            image, checksum.size, checksum.hexdigests(), headers.get('ETag')
         )
 
-    def write_file_to_filesystem(self, url, filename):
+    def record_stored_checksum(self, image, stored):
+        """
+        Record the checksum of the image which was linked from the object store.
+        Objects are named after their SHA-256, so nothing is hashed, and the
+        fast digest is left out of the entry.
+        """
+        if not self.checksums:
+            return
+        digest = os.path.splitext(os.path.basename(stored))[0]
+        self.record_digests(image, os.path.getsize(stored), {'sha256': digest})
+
+    def record_digests(self, image, size, digests, etag=None):
+        directory, filename = os.path.split(image['filename'])
+        manifest = self.checksum_manifest(directory)
+        image_hash = self.store_key(image['url']).partition('.')[0]
+        manifest.record_digests(filename, image_hash, size, digests, etag)
+        if 'checksum' in image:
+            image['size'] = size
+            image['checksum'] = digests['sha256']
+
+    def checksum_manifest(self, directory):
+        """
+        Return the checksum manifest of the album directory, loaded from the disk
+        when it is used for the first time.
+        """
+        with self.lock:
+            manifest = self.checksum_manifests.get(directory)
+            if manifest is None:
+                manifest = ChecksumManifest(os.path.join(self.root, directory))
+                manifest.load()
+                self.checksum_manifests[directory] = manifest
+            return manifest
+
+    def save_checksums(self):
+        with self.lock:
+            manifests = list(self.checksum_manifests.values())
+        for manifest in manifests:
+            manifest.save()
+
+    def expect_body(self, response):
+        """
+        Return the Content-Length of the response, or None if it is unknown, and
+        add it to the expected bytes of the progress.
+        """
+        length = response.getheader('Content-Length')
+        if length is None or not length.isdigit():
+            return None
+        if self.progress is not None:
+            self.progress.expect(int(length))
+        return int(length)
+
+    def write_file_to_store(self, url, filename):
+        """
+        Download a file into the object store, and link it to the filename.
+        Return the response headers. The file is always downloaded whole into a
+        new temporary file of the store, even in resume mode, since the name of
+        the temporary file is different in every attempt.
+        """
+        temporary = self.store.temporary_path()
+        try:
+            with self.pool.request(url) as r:
+                with open(temporary, 'wb') as f:
+                    self.copy_body(r, f)
+            path = self.store.add(self.store_key(url), temporary, self.stored_digest())
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        self.link_from_store(path, filename)
+        return r.headers
+
+    def stored_digest(self):
+        """
+        Return SHA-256 of the body which was just written, computed while it was
+        streamed, so that the store does not read the file again.
+        """
+        return current_checksum.get().hexdigests()['sha256']
+
+    def store_key(self, url):
+        """
+        Return the imgur filename which identifies the image in the object store,
+        e.g. https://i.imgur.com/jedEzFL.jpg -> jedEzFL.jpg
+        """
+        return urlsplit(url).path.split('/')[-1]
+
+    def resume_file_to_filesystem(self, url, filename):
+        """
+        Download a file into filename.part, continuing from the bytes that are
+        already there if the server supports range requests. A partial response
+        which does not start at the end of the partial file removes it, and
+        raises IncompleteDownloadException, so that the next attempt fetches the
+        whole file. When the whole body is received, the file is renamed to
+        filename. Since the
+        rename is atomic, existing filename is always a complete file. Return
+        the response headers.
+        """
+        partial = self.partial_filename(filename)
+        offset = self.file_size(partial) if self.file_exists(partial) else 0
+        headers = {'Range': 'bytes={}-'.format(offset)} if offset else {}
+
+        try:
+            response = self.pool.request(url, headers)
+        except HTTPError as e:
+            if e.code == 416 and offset:
+                # The partial file is already complete, or it is longer than
+                # the file on the server, in which case it has to be fetched
+                # again.
+                if offset == self.total_length(e.headers):
+                    self.replace_file(partial, filename)
+                    return e.headers
+                self.remove_file(partial)
+                return self.resume_file_to_filesystem(url, filename)
+            raise
+
+        with response:
+            if response.status == 206 and self.range_start(response.headers) != offset:
+                # The range does not continue the partial file, so neither
+                # can be trusted. The next attempt fetches the whole file.
+                self.remove_file(partial)
+                raise IncompleteDownloadException(
+                    'Unexpected range of {}: {}'.format(
+                        filename, response.getheader('Content-Range')
+                    )
+                )
+            mode = 'ab' if response.status == 206 else 'wb'
+            with self.open_file(partial, mode) as f:
+                self.copy_body(response, f)
+
+        self.replace_file(partial, filename)
+        return response.headers
+
+    def partial_filename(self, filename):
+        """
+        Return the name of the file which holds an unfinished download.
+        """
+        return ''.join([filename, '.part'])
+
+    def range_start(self, headers):
+        """
+        Return the first byte position from Content-Range header, e.g.
+        'bytes 100-199/200' -> 100. Return None if the header is missing.
+        """
+        content_range = headers.get('Content-Range', '')
+        match = re.match(r'bytes (\d+)-\d+/(\d+|\*)', content_range)
+        return int(match.group(1)) if match else None
+
+    def total_length(self, headers):
         """
-        Download and write a file to a file system.
+        Return the complete length of the file from Content-Range header, e.g.
+        'bytes */200' -> 200. Return None if it is unknown.
         """
-        with urlopen(url) as r, open(filename, 'wb') as f:
-            copyfileobj(r, f)
+        match = re.search(r'/(\d+)$', headers.get('Content-Range', ''))
+        return int(match.group(1)) if match else None
@@ -2,13 +2,24 @@
 
 
 """
-This module contains classes for parsing the imgur.com site. It consists of three
+This module contains classes for parsing the imgur.com site. It consists of four
 classes:
 
 ~ ImgurException
 ~ ImgurFileFormats
+~ ImgurImage
 ~ Imgur
 
+Links are classified by classify_url, which parses a link once into an immutable
+ImgurUrl record, and remembers the result. Many links, e.g. from logs, can be
+classified at once:
+
+```python3
+for record in classify_urls(links):
+    if record is not None and record.kind == 'album':
+        print(record.hash, record.grid)
+```
+
 Imgur is the main class and it obtains list of direct image urls that could be
 used to download images. Example usage:
 
@@ -18,11 +29,13 @@ imgur.prepare_images()
 images = imgur.images
 ```
 
-imgur.images is a deque of two keyed dictionaries. Example usage:
+imgur.images is a deque of ImgurImage records, which can be used as two keyed
+dictionaries. Example usage:
 
 ```python3
 for image in images:
     print(image['url'], image['filename'])
+    print(image.hash, image.extension)
 ```
 
 If images need to be downloaded in order they appear in an album, their filenames
@@ -39,11 +52,20 @@ images = imgur.images
 """
 
 
+import os
 import re
+import sys
+from functools import lru_cache
 from collections import deque
-from urllib.request import urlopen
+from collections import namedtuple
 from urllib.error import HTTPError
 from urllib.error import URLError
+from imgur.connection import default_pool
+from imgur.scanner import PageScanner
+from imgur.scanner import CHUNK_SIZE
+from imgur.session import AsyncSession
+from imgur.retry import NETWORK_ERRORS
+from imgur.metrics import default_metrics
 
 
 __author__ = 'petarGitNik'
@@ -54,6 +76,11 @@ __email__ = 'petargitnik@gmail.com'
 __status__ = 'Production'
 
 
+URL_PATTERN = re.compile(r'https?\:\/\/(?:i\.|www\.)?imgur\.com\/([^?#]*)')
+GIFV_PATTERN = re.compile(r'https?\:\/\/i\.imgur\.com\/[a-zA-Z0-9]+\.gif')
+IMAGE_URL = 'https://i.imgur.com/'
+
+
 class ImgurException(Exception):
     """
     This exception is raised if supplied link is invalid.
@@ -83,18 +110,168 @@ class ImgurFileFormats(object):
     #MP4 = '.mp4'
 
     @classmethod
+    @lru_cache(maxsize=None)
     def formats(cls):
         """
         Return a set consisting of all class attributes. Class attributes must
-        not be callable.
+        not be callable. The set is computed once.
         """
         formats = set()
-        for attribute in ImgurFileFormats.__dict__.keys():
+        for attribute in cls.__dict__.keys():
             if attribute[:2] != '__':
-                value = getattr(ImgurFileFormats, attribute)
+                value = getattr(cls, attribute)
                 if not callable(value):
                     formats.add(value)
-        return formats
+        return frozenset(formats)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def pattern(cls):
+        """
+        Return compiled pattern which finds any of the extensions. Longer
+        extensions are tried first, so that .apng is not found as .png.
+        """
+        extensions = sorted(cls.formats(), key=len, reverse=True)
+        return re.compile('|'.join(re.escape(extension) for extension in extensions))
+
+
+ImgurUrl = namedtuple('ImgurUrl', ['kind', 'hash', 'extension', 'grid', 'gifv'])
+
+
+@lru_cache(maxsize=65536)
+def classify_url(url):
+    """
+    Parse the link into ImgurUrl record, or return None if the link does not
+    point to imgur. Kind is either 'album' or 'image', and extension is None if
+    the link does not contain one. Example:
+
+    http://imgur.com/a/vTTHZ?grid   ->  ImgurUrl('album', 'vTTHZ', None, True, False)
+    """
+    match = URL_PATTERN.match(url)
+    if match is None:
+        return None
+    kind = 'album' if ('/a/' in url) or ('/gallery/' in url) else 'image'
+    path = match.group(1).rstrip('/')
+    extension = ImgurFileFormats.pattern().search(url)
+    return ImgurUrl(
+        kind,
+        path.rpartition('/')[2].partition('.')[0],
+        extension.group(0) if extension else None,
+        url.endswith('?grid'),
+        '.gifv' in url,
+    )
+
+
+def classify_urls(urls):
+    """
+    Generator which classifies many links, yielding ImgurUrl records, or None
+    for the links which do not point to imgur.
+    """
+    return map(classify_url, urls)
+
+
+class ImgurImage(object):
+    """
+    Compact record of a single image. Filename is derived from the hash, the
+    extension, the ordinal number in the album, and the album directory when it
+    is requested. For compatibility with dictionaries, the fields can also be
+    accessed as image['url'] or image['filename']. The url is derived from the
+    hash and the extension, and stored only when it differs, e.g. for links
+    ending with ?1.
+    """
+    __slots__ = ('hash', 'extension', 'ordinal', 'digits', 'directory', 'size',
+                 'checksum', 'explicit_url', 'explicit_filename')
+
+    def __init__(self, url, hash, extension, ordinal=None, digits=1,
+                 directory=None, size=None, checksum=None):
+        self.hash = hash
+        self.extension = sys.intern(extension)
+        self.explicit_url = None
+        self.url = url
+        self.ordinal = ordinal
+        self.digits = digits
+        self.directory = directory
+        self.size = size
+        self.checksum = checksum
+        self.explicit_filename = None
+
+    @property
+    def url(self):
+        """
+        Return the url, e.g. https://i.imgur.com/jedEzFL.jpg.
+        """
+        if self.explicit_url is not None:
+            return self.explicit_url
+        return ''.join([IMAGE_URL, self.hash, self.extension])
+
+    @url.setter
+    def url(self, url):
+        if url == ''.join([IMAGE_URL, self.hash, self.extension]):
+            url = None
+        self.explicit_url = url
+
+    @property
+    def filename(self):
+        """
+        Return the filename, e.g. 01-jedEzFL.jpg, or album/01-jedEzFL.jpg.
+        """
+        if self.explicit_filename is not None:
+            return self.explicit_filename
+        filename = ''.join([self.hash, self.extension])
+        if self.ordinal is not None:
+            filename = '{0:0{1}d}-{2}'.format(self.ordinal, self.digits, filename)
+        if self.directory:
+            filename = os.path.join(self.directory, filename)
+        return filename
+
+    @filename.setter
+    def filename(self, filename):
+        self.explicit_filename = filename
+
+    def numerate(self, ordinal, digits):
+        """
+        Set the ordinal number of the image, padded to the number of digits.
+        """
+        self.ordinal = ordinal
+        self.digits = digits
+
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.keys():
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.keys() else default
+
+    def keys(self):
+        return ('url', 'filename', 'hash', 'extension', 'ordinal', 'digits',
+                'directory', 'size', 'checksum')
+
+    def as_dict(self):
+        """
+        Return the image as a two keyed dictionary.
+        """
+        return {'url' : self.url, 'filename' : self.filename}
+
+    def __eq__(self, other):
+        if isinstance(other, ImgurImage):
+            other = other.as_dict()
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ImgurImage({!r}, {!r})'.format(self.url, self.filename)
 
 
 class Imgur(object):
@@ -103,30 +280,40 @@ class Imgur(object):
     imgur link.
     """
 
-    def __init__(self, url):
+    def __init__(self, url, pool=None, cache=None, retry_policy=None,
+                 metrics=None):
         """
-        Initiate Imgur object.
+        Initiate Imgur object. Pages are fetched through the given connection
+        pool, or through the default pool shared with Downloader. If the album
+        cache is given, parsed pages are stored in it and reused. If the retry
+        policy is given, pages which failed to load are requested again. The
+        resolution of the album is traced for the hooks of the metrics.
         """
         self.url = self.sanitize(url)
         self.images = deque()
+        self.pool = pool or default_pool
+        self.cache = cache
+        self.retry_policy = retry_policy
+        self.metrics = metrics or default_metrics
+        self.error = None
 
     def sanitize(self, url):
         """
         Check if the supplied link is valid. If not, raise ImgurException. This
         method checks only if the domain is valid.
         """
-        if re.match('https?\:\/\/(i\.|www\.)?imgur\.com\/', url):
-            if self.is_it_gifv(url):
-                return self.sanitize_gifv(url)
-            return url
-        raise ImgurException('Invalid link.')
+        record = classify_url(url)
+        if record is None:
+            raise ImgurException('Invalid link.')
+        if record.gifv:
+            return self.sanitize_gifv(url)
+        return url
 
     def sanitize_gifv(self, url):
         """
         Remove 'v' from .gifv
         """
-        pattern = 'https?\:\/\/i\.imgur\.com\/[a-zA-Z0-9]+\.gif'
-        return re.match(pattern, url).group(0)
+        return GIFV_PATTERN.match(url).group(0)
 
     def is_it_gifv(self, url):
         """
@@ -154,7 +341,7 @@ class Imgur(object):
         http(s)://imgur.com/a/[album_hash]
         http(s)://imgur.com/gallery/[album_hash]
         """
-        return ('/a/' in self.url) or ('/gallery/' in self.url)
+        return classify_url(self.url).kind == 'album'
 
     def is_it_grid(self):
         """
@@ -162,7 +349,16 @@ class Imgur(object):
 
         http(s)://imgur.com/a/[album_hash]?grid
         """
-        return self.url.endswith('?grid')
+        return classify_url(self.url).grid
+
+    def get_hash(self):
+        """
+        Get the hash of an image or an album from the url. Examples:
+
+        http(s)://imgur.com/a/[album_hash]?grid     ->  [album_hash]
+        http(s)://i.imgur.com/[image_hash].jpg      ->  [image_hash]
+        """
+        return classify_url(self.url).hash
 
     def change_gallery(self):
         """
@@ -186,6 +382,25 @@ class Imgur(object):
         Parses HTML from the provided url to obtain link(s) to image(s). Raises
         exception if the link already ends with an extension.
         """
+        with self.metrics.trace('album', url=self.url) as trace:
+            self.resolve_images()
+            self.annotate_trace(trace)
+
+    def annotate_trace(self, trace):
+        """
+        Add the number of images, and the error if there was one, to the trace
+        of the album.
+        """
+        if trace is None:
+            return
+        trace['images'] = len(self.images)
+        if self.error is not None:
+            trace['error'] = str(self.error)
+
+    def resolve_images(self):
+        """
+        Find the images of the link, without tracing.
+        """
         if self.is_it_image():
             if self.contains_extension(self.url):
                 self.images.append(
@@ -199,24 +414,182 @@ class Imgur(object):
         self.parse_and_prepare_images(grid)
         return
 
+    async def aprepare_images(self, session=None):
+        """
+        Coroutine counterpart of prepare_images. Pages are fetched through the
+        given AsyncSession, or through a new one, which is closed afterwards.
+        """
+        with self.metrics.trace('album', url=self.url) as trace:
+            await self.aresolve_images(session)
+            self.annotate_trace(trace)
+
+    async def aresolve_images(self, session=None):
+        """
+        Coroutine counterpart of resolve_images.
+        """
+        if self.is_it_image() and self.contains_extension(self.url):
+            self.images.append(
+                self.pack_image(self.url, self.get_image_filename(self.url))
+            )
+            return
+        url = self.url if self.is_it_image() else self.turn_into_grid()
+        if session is not None:
+            await self.aparse_and_prepare_images(url, session)
+            return
+        async with AsyncSession() as session:
+            await self.aparse_and_prepare_images(url, session)
+
+    async def aparse_and_prepare_images(self, url, session):
+        """
+        Coroutine counterpart of parse_and_prepare_images.
+        """
+        attempt = 1
+        found = len(self.images)
+        while True:
+            try:
+                async for filename in self.ascan_filenames(url, session):
+                    image_url = self.build_image_url_list([filename])[0]
+                    self.images.append(
+                        self.pack_image(image_url, self.get_image_filename(image_url))
+                    )
+                self.error = None
+                return
+            except NETWORK_ERRORS as e:
+                if not self.should_retry(e, attempt, found):
+                    break
+            await self.retry_policy.apause(attempt)
+            attempt += 1
+        self.report_error()
+
+    async def ascan_filenames(self, url, session):
+        """
+        Asynchronous generator counterpart of scan_filenames.
+        """
+        key = self.cache_key()
+        entry = self.cache.lookup(key) if self.cache is not None else None
+        headers = {}
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                for filename in entry['filenames']:
+                    yield filename
+                return
+            headers = self.cache.conditional_headers(entry)
+
+        filenames = []
+        scanner = PageScanner()
+        async with await session.request(url, headers) as response:
+            if response.status == 304 and entry is not None:
+                self.cache.touch(key)
+                for filename in entry['filenames']:
+                    yield filename
+                return
+            chunk = await response.read(CHUNK_SIZE)
+            while chunk:
+                for filename in scanner.feed(chunk):
+                    if self.cache is not None:
+                        filenames.append(filename)
+                    yield filename
+                chunk = await response.read(CHUNK_SIZE)
+        if self.cache is not None:
+            self.cache.store(key, filenames, response.headers)
+
     def parse_and_prepare_images(self, url):
         """
-        Obtain and parse html, and append image dictionaries to image deque.
+        Obtain and parse html, and append image dictionaries to image deque. If
+        the page cannot be loaded, the error is kept in the error attribute.
         """
-        pattern = '\{"hash":"([a-zA-Z0-9]+)".*?"ext":"([\.a-zA-Z0-9\?\#]+)".*?\}'
-        try:
-            html = urlopen(url).read().decode('utf-8')
-            filenames_with_duplicates = re.findall(pattern, html)
-            filenames_clean = self.remove_duplicates(filenames_with_duplicates)
-            urls = self.build_image_url_list(filenames_clean)
-            for url in urls:
-                self.images.append(
-                    self.pack_image(url, self.get_image_filename(url))
-                )
-        except HTTPError as e:
-            print(e.status)
-        except URLError as e:
-            print(e.reason)
+        attempt = 1
+        found = len(self.images)
+        while True:
+            try:
+                for image in self.scan_images(url):
+                    self.images.append(image)
+                self.error = None
+                return
+            except NETWORK_ERRORS as e:
+                if not self.should_retry(e, attempt, found):
+                    break
+            self.retry_policy.pause(attempt)
+            attempt += 1
+        self.report_error()
+
+    def should_retry(self, error, attempt, found):
+        """
+        Remember the error, and check if the page should be requested again. The
+        images found by the failed attempt are removed, so that a page which
+        cannot be loaded leaves no partial album behind.
+        """
+        self.error = error
+        while len(self.images) > found:
+            self.images.pop()
+        if self.retry_policy is None:
+            return False
+        return self.retry_policy.should_retry(error, attempt)
+
+    def report_error(self):
+        if isinstance(self.error, HTTPError):
+            print(self.error.status)
+        elif isinstance(self.error, URLError):
+            print(self.error.reason)
+        else:
+            print(self.error)
+
+    def scan_images(self, url):
+        """
+        Generator which yields image dictionaries as soon as they are found on
+        the page, while the rest of the page is still being downloaded.
+        """
+        for filename in self.scan_filenames(url):
+            image_url = self.build_image_url_list([filename])[0]
+            yield self.pack_image(image_url, self.get_image_filename(image_url))
+
+    def scan_filenames(self, url):
+        """
+        Generator which yields unique (hash, extension) tuples of the images on
+        the page. The page is scanned in chunks, as it arrives. If there is an
+        album cache, fresh entries are used without any request, and expired
+        ones are revalidated with a conditional request. Raise URLError if the
+        connection is closed before the whole page is received.
+        """
+        key = self.cache_key()
+        entry = self.cache.lookup(key) if self.cache is not None else None
+        headers = {}
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                yield from entry['filenames']
+                return
+            headers = self.cache.conditional_headers(entry)
+
+        filenames = []
+        scanner = PageScanner()
+        with self.pool.request(url, headers) as response:
+            if response.status == 304 and entry is not None:
+                self.cache.touch(key)
+                yield from entry['filenames']
+                return
+            received = 0
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                received += len(chunk)
+                for filename in scanner.feed(chunk):
+                    if self.cache is not None:
+                        filenames.append(filename)
+                    yield filename
+            length = response.getheader('Content-Length')
+            if length is not None and length.isdigit() and received != int(length):
+                raise URLError('Incomplete page, got {} of {} bytes.'.format(
+                    received, length
+                ))
+        if self.cache is not None:
+            self.cache.store(key, filenames, response.headers)
+
+    def cache_key(self):
+        """
+        Return the key of the album cache entry, e.g. a/vTTHZ for albums, and
+        jedEzFL for single images.
+        """
+        if self.is_it_album():
+            return '/'.join(['a', self.get_hash()])
+        return self.get_hash()
 
     def build_image_url_list(self, filenames):
         """
@@ -227,29 +600,23 @@ class Imgur(object):
         """
         urls = []
         for filename, extension in filenames:
-            urls.append(''.join(['https://i.imgur.com/', filename, extension]))
+            urls.append(''.join([IMAGE_URL, filename, extension]))
         return urls
 
     def remove_duplicates(self, filenames):
         """
         Remove duplicates from a list of tuples containing filenames with
-        extensions.
+        extensions, keeping the order in which they first appear.
         """
-        clean = []
-        for filename in filenames:
-            if filename not in clean:
-                clean.append(filename)
-        return clean
+        return list(dict.fromkeys(filenames))
 
     def contains_extension(self, url):
         """
         Check if the image url contains extension. If there is an extension it
         is returned. Otherwise, None is returned.
         """
-        for extension in ImgurFileFormats.formats():
-            if extension in url:
-                return extension
-        return None
+        match = ImgurFileFormats.pattern().search(url)
+        return match.group(0) if match else None
 
     def get_image_filename(self, url):
         """
@@ -259,15 +626,25 @@ class Imgur(object):
         https://i.imgur.com/jedEzFL.jpg?1   ->  jedEzFL.jpg
         """
         candidate = url.split('/')[-1]
-        extension = self.contains_extension(url)
-        pattern = ''.join(['.+\\', extension])
-        return re.match(pattern, candidate).group(0)
+        extension = self.contains_extension(candidate)
+        return candidate[:candidate.rfind(extension) + len(extension)]
 
     def pack_image(self, url, filename):
         """
-        Returns a dictionary with image url and corresponding filename.
+        Returns ImgurImage with image url and corresponding filename.
+        """
+        hash, _, extension = filename.partition('.')
+        return ImgurImage(url, hash, ''.join(['.', extension]))
+
+    def stream_images(self):
+        """
+        Generator which prepares and numerates the images, and then yields them
+        one by one, removing them from the images deque.
         """
-        return {'url' : url, 'filename' : filename}
+        self.prepare_images()
+        self.numerate_images()
+        while self.images:
+            yield self.images.popleft()
 
     def number_of_images(self):
         """
@@ -282,6 +659,9 @@ class Imgur(object):
         total = self.digits_in_a_number(len(self.images))
         ordinal = '{0:0%dd}' % total
         for index, image in enumerate(self.images, start=1):
+            if isinstance(image, ImgurImage):
+                image.numerate(index, total)
+                continue
             image['filename'] = ''.join([
                     ordinal.format(index), '-', image['filename']
                 ])
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+
+
+"""
+Journal of a batch job. Resolved albums and the state of every image are kept
+in a SQLite database in the destination directory, so that a run which crashed,
+or was interrupted, continues where it stopped. Example:
+
+```python3
+journal = Journal(os.path.join('/home/user/Download', JOURNAL_FILENAME))
+batch = Batch(urls, journal=journal)
+downloader = Downloader(Pipeline(batch.stream_images()), '/home/user/Download',
+                        journal=journal)
+downloader.download()
+```
+
+Albums found in the journal are not resolved again, and only the images which
+are not done yet are downloaded. Every image is in one of these states:
+
+~ pending: not downloaded yet
+~ active: download started; after a crash, such image is downloaded again
+~ done: downloaded, or skipped because it already exists
+~ failed: the last attempt failed; it is attempted again in the next run
+"""
+
+
+import sqlite3
+from threading import Lock
+from time import time
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+JOURNAL_FILENAME = '.crawlgur-journal.sqlite'
+
+OUTCOME_STATES = {'downloaded': 'done', 'skipped': 'done', 'failed': 'failed'}
+
+
+class JournalException(Exception):
+    """
+    Raise this exception if the journal cannot be opened.
+    """
+    pass
+
+
+class Journal(object):
+    """
+    Thread safe SQLite journal of albums and images of a batch.
+    """
+
+    def __init__(self, path, clock=time):
+        """
+        Initiate Journal, creating the database if it does not exist.
+        """
+        self.path = path
+        self.clock = clock
+        self.lock = Lock()
+        try:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            # Every state change is committed on its own. With the write ahead
+            # log, such commits survive a crash of the process without waiting
+            # for the disk.
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            with self.connection:
+                self.connection.execute(
+                    'CREATE TABLE IF NOT EXISTS albums ('
+                    'directory TEXT PRIMARY KEY, url TEXT NOT NULL, '
+                    'count INTEGER NOT NULL, resolved REAL NOT NULL)'
+                )
+                self.connection.execute(
+                    'CREATE TABLE IF NOT EXISTS images ('
+                    'filename TEXT PRIMARY KEY, album TEXT NOT NULL, '
+                    'position INTEGER NOT NULL, url TEXT NOT NULL, '
+                    'hash TEXT, extension TEXT, ordinal INTEGER, digits INTEGER, '
+                    "state TEXT NOT NULL DEFAULT 'pending', "
+                    'attempts INTEGER NOT NULL DEFAULT 0, updated REAL)'
+                )
+                self.connection.execute(
+                    'CREATE INDEX IF NOT EXISTS images_album '
+                    'ON images (album, position)'
+                )
+        except sqlite3.DatabaseError as e:
+            raise JournalException('Cannot open journal: {}'.format(e))
+
+    def album_count(self, directory):
+        """
+        Return the number of images of a resolved album, or None if the album
+        was not resolved yet.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT count FROM albums WHERE directory = ?', (directory,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def record_album(self, url, directory, images):
+        """
+        Record the resolved album and its images in one transaction. Images which
+        are already in the journal keep their state.
+        """
+        rows = [
+            (image['filename'], directory, position, image['url'],
+             image.get('hash'), image.get('extension'), image.get('ordinal'),
+             image.get('digits'))
+            for position, image in enumerate(images)
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO images (filename, album, position, url, '
+                'hash, extension, ordinal, digits) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self.connection.execute(
+                'INSERT OR REPLACE INTO albums VALUES (?, ?, ?, ?)',
+                (directory, url, len(rows), self.clock())
+            )
+
+    def unfinished_images(self, directory):
+        """
+        Return images of the album which are not done, in the album order, as
+        dictionaries with the columns of the journal.
+        """
+        with self.lock:
+            cursor = self.connection.execute(
+                'SELECT filename, url, hash, extension, ordinal, digits, '
+                'state, attempts FROM images '
+                "WHERE album = ? AND state != 'done' ORDER BY position",
+                (directory,)
+            )
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def start(self, filename):
+        """
+        Mark the image as being downloaded, and count the attempt.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE images SET state = 'active', attempts = attempts + 1, "
+                'updated = ? WHERE filename = ?', (self.clock(), filename)
+            )
+
+    def finish(self, filename, outcome):
+        """
+        Record the outcome of the download, as counted in the summary of
+        Downloader.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                'UPDATE images SET state = ?, updated = ? WHERE filename = ?',
+                (OUTCOME_STATES[outcome], self.clock(), filename)
+            )
+
+    def get(self, filename):
+        """
+        Return the state and the number of attempts of the image, or None if it
+        is not in the journal.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT state, attempts FROM images WHERE filename = ?', (filename,)
+            ).fetchone()
+        return None if row is None else {'state': row[0], 'attempts': row[1]}
+
+    def states(self):
+        """
+        Return the number of images in each state.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT state, COUNT(*) FROM images GROUP BY state'
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
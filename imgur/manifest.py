@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+
+
+"""
+Manifest of downloaded files. It is stored as a JSON file in the destination
+directory, and it is used to skip files which did not change since the previous
+run. Example:
+
+```python3
+manifest = Manifest('/home/user/Download')
+manifest.load()
+
+if not manifest.is_current('1-jedEzFL.jpg'):
+    headers = manifest.conditional_headers('1-jedEzFL.jpg')
+    ...
+    manifest.record('1-jedEzFL.jpg', url, response.headers)
+
+manifest.save()
+```
+
+Each entry holds url of the image, size of the file, and ETag and Last-Modified
+validators returned by the server.
+"""
+
+
+import os
+import json
+from threading import Lock
+from email.utils import formatdate
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+MANIFEST_FILENAME = '.crawlgur-manifest.json'
+
+
+class ManifestException(Exception):
+    """
+    Raise this exception if the manifest file cannot be read.
+    """
+    pass
+
+
+class Manifest(object):
+    """
+    Thread safe record of files downloaded into a directory.
+    """
+
+    def __init__(self, directory, filename=MANIFEST_FILENAME):
+        """
+        Initiate Manifest for the given directory. Shards of a batch which
+        download into the same directory use their own manifest filenames.
+        """
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, filename)
+        self.entries = {}
+        self.lock = Lock()
+
+    def load(self):
+        """
+        Read the manifest from the disk. Missing manifest is treated as empty.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ManifestException('Cannot read manifest: {}'.format(e))
+        with self.lock:
+            self.entries = entries.get('files', {})
+
+    def save(self):
+        """
+        Write the manifest to the disk. It is written into a temporary file first,
+        so that an interrupted run does not leave a broken manifest.
+        """
+        with self.lock:
+            content = json.dumps({'files': self.entries}, indent=2, sort_keys=True)
+        temporary = ''.join([self.path, '.tmp'])
+        with open(temporary, 'w') as f:
+            f.write(content)
+        os.replace(temporary, self.path)
+
+    def get(self, filename):
+        with self.lock:
+            return self.entries.get(filename)
+
+    def file_path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def is_current(self, filename):
+        """
+        Check if the file exists and has the size recorded in the manifest. Image
+        behind an imgur hash does not change, so such file does not have to be
+        checked with the server.
+        """
+        entry = self.get(filename)
+        path = self.file_path(filename)
+        if entry is None or not os.path.exists(path):
+            return False
+        return os.path.getsize(path) == entry.get('size')
+
+    def conditional_headers(self, filename):
+        """
+        Return headers for a conditional request of a file which already exists.
+        Validators from the manifest are used if there are any, otherwise the
+        modification time of the file is sent. If the size of the file does not
+        match its entry, the file is damaged, and it is requested without
+        conditions, since the server would answer that its copy did not change.
+        """
+        path = self.file_path(filename)
+        if not os.path.exists(path):
+            return {}
+        entry = self.get(filename) or {}
+        if entry and os.path.getsize(path) != entry.get('size'):
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        else:
+            headers['If-Modified-Since'] = formatdate(
+                os.path.getmtime(path), usegmt=True
+            )
+        return headers
+
+    def record(self, filename, url, headers=None):
+        """
+        Add or update the entry of a file which is present in the directory.
+        Validators which are missing from the headers (e.g. in 304 response) are
+        kept from the previous entry.
+        """
+        headers = headers or {}
+        size = os.path.getsize(self.file_path(filename))
+        with self.lock:
+            previous = self.entries.get(filename, {})
+            self.entries[filename] = {
+                'url': url,
+                'size': size,
+                'etag': headers.get('ETag') or previous.get('etag'),
+                'last_modified': (headers.get('Last-Modified') or
+                                  previous.get('last_modified')),
+            }
@@ -0,0 +1,284 @@
+#!/usr/bin/python3
+
+
+"""
+Instrumentation of the download path. Every image download and every album
+resolution is traced, and finished traces are passed to hooks as dictionaries.
+Example:
+
+```python3
+prometheus = PrometheusExporter()
+prometheus.serve(port=9100)  # http://127.0.0.1:9100/metrics
+
+with open('trace.jsonl', 'w') as f:
+    metrics = Metrics([JsonLinesExporter(f), prometheus])
+    imgur = Imgur('http://imgur.com/gallery/vTTHZ', metrics=metrics)
+    imgur.prepare_images()
+    imgur.numerate_images()
+    Downloader(imgur.images, '/home/user/Download', metrics=metrics).download()
+```
+
+Image traces contain url, filename, status, outcome, bytes, retries, and the time
+in seconds spent on each phase of the requests: dns (name resolution), connect
+(TCP and TLS handshake), ttfb (from the request until the response headers) and
+transfer (the body). Album traces contain url, the number of images, and the
+resolution time. Any callable which takes a dictionary can be used as a hook.
+
+Code in the download path adds to the trace of the image, or the album, which
+is being processed in the current thread or task with record and annotate, so
+that the trace does not have to be passed around.
+"""
+
+
+import os
+import json
+from time import time
+from time import monotonic
+from threading import Lock
+from threading import Thread
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+PHASES = ('dns', 'connect', 'ttfb', 'transfer')
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+current_trace = ContextVar('current_trace', default=None)
+
+
+def record(name, value):
+    """
+    Add the value to the named counter of the current trace, e.g. time spent on
+    a phase, which can happen more than once because of redirects or retries.
+    """
+    trace = current_trace.get()
+    if trace is not None:
+        trace[name] = trace.get(name, 0) + value
+
+
+def annotate(name, value):
+    """
+    Set the named field of the current trace.
+    """
+    trace = current_trace.get()
+    if trace is not None:
+        trace[name] = value
+
+
+class Metrics(object):
+    """
+    Thread safe list of hooks which receive finished traces.
+    """
+
+    def __init__(self, hooks=None, clock=monotonic):
+        self.hooks = list(hooks or [])
+        self.clock = clock
+        self.lock = Lock()
+
+    def add_hook(self, hook):
+        with self.lock:
+            self.hooks.append(hook)
+
+    @contextmanager
+    def trace(self, kind, **fields):
+        """
+        Trace the code inside the with block. The trace is a dictionary, which
+        is passed to the hooks when the block ends, even if it raised. Without
+        hooks, nothing is traced.
+        """
+        if not self.hooks:
+            yield None
+            return
+        trace = {'kind': kind, 'started': time()}
+        trace.update(fields)
+        token = current_trace.set(trace)
+        start = self.clock()
+        try:
+            yield trace
+        finally:
+            trace['duration'] = self.clock() - start
+            current_trace.reset(token)
+            self.emit(trace)
+
+    def emit(self, trace):
+        with self.lock:
+            hooks = list(self.hooks)
+        for hook in hooks:
+            hook(trace)
+
+
+default_metrics = Metrics()
+
+
+class JsonLinesExporter(object):
+    """
+    Hook which writes every trace as one line of JSON.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = Lock()
+
+    def __call__(self, trace):
+        line = json.dumps(trace, sort_keys=True)
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+class Histogram(object):
+    """
+    Cumulative histogram in the Prometheus format.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def render(self, name):
+        lines = []
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append('{}_bucket{{le="{}"}} {}'.format(name, bound, count))
+        lines.append('{}_bucket{{le="+Inf"}} {}'.format(name, self.count))
+        lines.append('{}_sum {}'.format(name, self.sum))
+        lines.append('{}_count {}'.format(name, self.count))
+        return lines
+
+
+class PrometheusExporter(object):
+    """
+    Hook which aggregates traces into counters and histograms, and renders them
+    in the Prometheus text format.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.images = {}
+        self.albums = {}
+        self.bytes = 0
+        self.retries = 0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.image_duration = Histogram(buckets)
+        self.album_duration = Histogram(buckets)
+        self.lock = Lock()
+        self.server = None
+
+    def __call__(self, trace):
+        with self.lock:
+            if trace['kind'] == 'image':
+                outcome = trace.get('outcome', 'failed')
+                self.images[outcome] = self.images.get(outcome, 0) + 1
+                self.bytes += trace.get('bytes', 0)
+                self.retries += trace.get('retries', 0)
+                for phase in PHASES:
+                    self.phases[phase] += trace.get(phase, 0)
+                self.image_duration.observe(trace['duration'])
+            elif trace['kind'] == 'album':
+                outcome = 'failed' if trace.get('error') else 'resolved'
+                self.albums[outcome] = self.albums.get(outcome, 0) + 1
+                self.album_duration.observe(trace['duration'])
+
+    def render(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            lines = [
+                '# HELP crawlgur_images_total Images by outcome.',
+                '# TYPE crawlgur_images_total counter',
+            ]
+            for outcome, count in sorted(self.images.items()):
+                lines.append('crawlgur_images_total{{outcome="{}"}} {}'.format(outcome, count))
+            lines.extend([
+                '# HELP crawlgur_bytes_total Bytes of downloaded images.',
+                '# TYPE crawlgur_bytes_total counter',
+                'crawlgur_bytes_total {}'.format(self.bytes),
+                '# HELP crawlgur_retries_total Repeated requests for images.',
+                '# TYPE crawlgur_retries_total counter',
+                'crawlgur_retries_total {}'.format(self.retries),
+                '# HELP crawlgur_image_phase_seconds_total Time spent on each '
+                'phase of image requests.',
+                '# TYPE crawlgur_image_phase_seconds_total counter',
+            ])
+            for phase in PHASES:
+                lines.append('crawlgur_image_phase_seconds_total{{phase="{}"}} {}'.format(
+                    phase, self.phases[phase]
+                ))
+            lines.extend([
+                '# HELP crawlgur_image_duration_seconds Time to download an image.',
+                '# TYPE crawlgur_image_duration_seconds histogram',
+            ])
+            lines.extend(self.image_duration.render('crawlgur_image_duration_seconds'))
+            lines.extend([
+                '# HELP crawlgur_albums_total Albums by outcome.',
+                '# TYPE crawlgur_albums_total counter',
+            ])
+            for outcome, count in sorted(self.albums.items()):
+                lines.append('crawlgur_albums_total{{outcome="{}"}} {}'.format(outcome, count))
+            lines.extend([
+                '# HELP crawlgur_album_resolution_seconds Time to resolve an album.',
+                '# TYPE crawlgur_album_resolution_seconds histogram',
+            ])
+            lines.extend(self.album_duration.render('crawlgur_album_resolution_seconds'))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Write the metrics into a file, e.g. for the textfile collector of the
+        node exporter.
+        """
+        temporary = ''.join([path, '.tmp'])
+        with open(temporary, 'w') as f:
+            f.write(self.render())
+        os.replace(temporary, path)
+
+    def serve(self, host='127.0.0.1', port=0):
+        """
+        Serve the metrics over HTTP at /metrics from a background thread, and
+        return the address of the server.
+        """
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, args=(0.5,), daemon=True).start()
+        return self.server.server_address
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
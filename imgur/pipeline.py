@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+
+
+"""
+Producer/consumer pipeline between link resolution and downloading. Pipeline runs
+a generator of images in a background thread, and Downloader consumes the images
+as soon as they are produced. Example:
+
+```python3
+batch = Batch(urls)
+pipeline = Pipeline(batch.stream_images(), maxsize=100)
+
+downloader = Downloader(pipeline, '/home/user/Download', workers=4)
+downloader.download()
+```
+
+The queue between the producer and the consumers is bounded, so the producer
+waits when the downloads fall behind, and the memory does not grow with the
+number of queued albums.
+"""
+
+
+from queue import Queue
+from threading import Thread
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class PipelineException(Exception):
+    """
+    Raise this exception if the pipeline is configured with invalid values.
+    """
+    pass
+
+
+class Pipeline(object):
+    """
+    Iterable over images produced by a generator running in a separate thread.
+    """
+
+    END = object()
+
+    def __init__(self, source, maxsize=100):
+        """
+        Initiate Pipeline. Source is an iterable of images, and maxsize is the
+        number of images which can wait in the queue.
+        """
+        if maxsize < 1:
+            raise PipelineException('Size of the queue must be positive.')
+        self.source = source
+        self.queue = Queue(maxsize)
+        self.error = None
+        self.thread = None
+
+    def __iter__(self):
+        """
+        Start the producer, and yield images until the source is exhausted. If
+        the source raised an exception, it is raised again in the consumer.
+        """
+        if self.thread is None:
+            self.thread = Thread(target=self.produce, daemon=True)
+            self.thread.start()
+        while True:
+            image = self.queue.get()
+            if image is self.END:
+                break
+            yield image
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def produce(self):
+        try:
+            for image in self.source:
+                self.queue.put(image)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.queue.put(self.END)
@@ -0,0 +1,231 @@
+#!/usr/bin/python3
+
+
+"""
+Live progress of a download, aggregated across all workers. Example:
+
+```python3
+progress = Progress()
+downloader = Downloader(images, '/home/user/Download', workers=8,
+                        progress=progress)
+downloader.download()
+```
+
+On a terminal, a single status line is redrawn in place:
+
+[ 120/500]  24%  8.3 img/s  2.1 MB/s  45.2/188.4 MB  ETA 0:00:46  active 8
+
+The line is redrawn at most every interval seconds, by the worker which
+reports progress after the interval passed, so the display does not need its own
+thread, and it costs nothing between redraws. When the output is not
+a terminal, e.g. a log file, a summary line is printed every summary_interval
+seconds instead.
+
+Total bytes are known only for the images whose download started (from the
+Content-Length header), so the rest is estimated from their average size.
+"""
+
+
+import sys
+from time import monotonic
+from threading import Lock
+from collections import deque
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+RATE_WINDOW = 10.0
+
+
+def format_bytes(size):
+    """
+    Return the size in megabytes, e.g. 45.2 MB.
+    """
+    return '{:.1f} MB'.format(size / 1000000)
+
+
+def format_duration(seconds):
+    """
+    Return the duration as H:MM:SS, or ? if it is unknown.
+    """
+    if seconds is None:
+        return '?'
+    seconds = int(round(seconds))
+    return '{}:{:02d}:{:02d}'.format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class ProgressException(Exception):
+    """
+    Raise this exception if the progress display is configured with invalid
+    values.
+    """
+    pass
+
+
+class Progress(object):
+    """
+    Thread safe progress display with throughput and estimated time of arrival.
+    """
+
+    def __init__(self, stream=None, interval=0.2, summary_interval=10.0,
+                 tty=None, clock=monotonic):
+        """
+        Initiate Progress. The status line is redrawn at most every interval
+        seconds on a terminal, and printed every summary_interval seconds
+        otherwise. Set tty to override the detection of a terminal.
+        """
+        if interval <= 0 or summary_interval <= 0:
+            raise ProgressException('Invalid progress configuration.')
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty() if tty is None else tty
+        self.interval = interval if self.tty else summary_interval
+        self.clock = clock
+        self.lock = Lock()
+        self.begin()
+
+    def begin(self, total=None):
+        """
+        Reset the counters before a download of total images, or of an unknown
+        number of images if total is None.
+        """
+        with self.lock:
+            self.total = total
+            self.started = 0
+            self.done = 0
+            self.failed = 0
+            self.bytes_done = 0
+            self.bytes_expected = 0
+            self.sized = 0
+            self.start = self.clock()
+            self.drawn = self.start
+            self.samples = deque([(self.start, 0, 0)])
+            self.width = 0
+
+    def image_started(self):
+        """
+        Count an image whose download started.
+        """
+        with self.lock:
+            self.started += 1
+        self.refresh()
+
+    def image_finished(self, outcome):
+        """
+        Count an image which was downloaded, skipped or failed.
+        """
+        with self.lock:
+            self.done += 1
+            if outcome == 'failed':
+                self.failed += 1
+        self.refresh()
+
+    def expect(self, size):
+        """
+        Add the Content-Length of a response to the expected number of bytes.
+        """
+        with self.lock:
+            self.bytes_expected += size
+            self.sized += 1
+
+    def advance(self, size):
+        """
+        Add the number of bytes which were just received.
+        """
+        with self.lock:
+            self.bytes_done += size
+        self.refresh()
+
+    def refresh(self, force=False):
+        """
+        Redraw the status if the interval has passed since the last redraw.
+        """
+        now = self.clock()
+        with self.lock:
+            if not force and now - self.drawn < self.interval:
+                return
+            self.drawn = now
+            line = self.status_line(now)
+            if self.tty:
+                padding = ' ' * max(self.width - len(line), 0)
+                self.width = len(line)
+                self.stream.write('\r' + line + padding)
+            else:
+                self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def rates(self, now):
+        """
+        Return images and bytes per second over the last RATE_WINDOW seconds.
+        Must be called with the lock held.
+        """
+        self.samples.append((now, self.done, self.bytes_done))
+        while len(self.samples) > 2 and now - self.samples[1][0] > RATE_WINDOW:
+            self.samples.popleft()
+        then, done, bytes_done = self.samples[0]
+        elapsed = now - then
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (self.done - done) / elapsed, (self.bytes_done - bytes_done) / elapsed
+
+    def expected_bytes(self):
+        """
+        Return the expected size of the whole download, or None if it cannot be
+        estimated yet. Must be called with the lock held.
+        """
+        if self.total is None or not self.sized:
+            return None
+        average = self.bytes_expected / self.sized
+        return self.bytes_expected + average * max(self.total - self.sized, 0)
+
+    def eta(self, image_rate, byte_rate, expected):
+        """
+        Return the estimated number of seconds until the end, or None. Must be
+        called with the lock held.
+        """
+        if expected is not None and byte_rate > 0:
+            return max(expected - self.bytes_done, 0) / byte_rate
+        if self.total is not None and image_rate > 0:
+            return max(self.total - self.done, 0) / image_rate
+        return None
+
+    def status_line(self, now):
+        """
+        Return the status line. Must be called with the lock held.
+        """
+        image_rate, byte_rate = self.rates(now)
+        expected = self.expected_bytes()
+        if self.total is None:
+            position = '[{}/?]'.format(self.done)
+            percent = ''
+        else:
+            position = '[{:>{}}/{}]'.format(self.done, len(str(self.total)), self.total)
+            percent = '{:3.0f}%  '.format(100.0 * self.done / self.total if self.total else 100)
+        size = format_bytes(self.bytes_done)
+        if expected is not None:
+            size = '{:.1f}/{}'.format(self.bytes_done / 1000000, format_bytes(expected))
+        parts = [
+            position + '  ' + percent + '{:.1f} img/s'.format(image_rate),
+            '{}/s'.format(format_bytes(byte_rate)),
+            size,
+            'ETA {}'.format(format_duration(self.eta(image_rate, byte_rate, expected))),
+            'active {}'.format(self.started - self.done),
+        ]
+        if self.failed:
+            parts.append('failed {}'.format(self.failed))
+        return '  '.join(parts)
+
+    def close(self):
+        """
+        Draw the final status, and end the line on a terminal.
+        """
+        self.refresh(force=True)
+        if self.tty:
+            with self.lock:
+                self.stream.write('\n')
+                self.stream.flush()
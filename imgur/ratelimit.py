@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+
+
+"""
+Rate limiting for requests sent to imgur. A single RateLimiter is shared by all
+download workers, so the limit applies to the whole run and not to each worker.
+Example:
+
+```python3
+limiter = RateLimiter(rate=4, burst=2)
+
+limiter.acquire()  # Blocks until a request is allowed
+try:
+    fetch(url)
+    limiter.success()
+except HTTPError as e:
+    limiter.failure(e.code, e.headers)
+```
+
+RateLimiter is a token bucket whose refill rate adapts to the server (AIMD).
+Every throttling response (429 or 5xx) halves the current rate, and every
+successful request adds a small amount back, up to the configured rate. A
+Retry-After header pauses all requests until the given moment.
+"""
+
+
+import asyncio
+from threading import Lock
+from time import monotonic
+from time import sleep
+from time import time
+from email.utils import parsedate_to_datetime
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class RateLimiterException(Exception):
+    """
+    Raise this exception if the rate limiter is configured with invalid values.
+    """
+    pass
+
+
+MIN_RATE = 0.1
+
+
+class RateLimiter(object):
+    """
+    Thread safe token bucket with additive increase, multiplicative decrease of
+    its refill rate.
+    """
+
+    def __init__(self, rate=2.0, burst=1, min_rate=MIN_RATE, increase=0.1,
+                 decrease=0.5, clock=monotonic, wait=sleep):
+        """
+        Initiate RateLimiter. Rate is the maximum number of requests per second,
+        and burst is the number of requests that can be sent at once after
+        a period of inactivity.
+        """
+        if rate <= 0 or burst < 1 or min_rate <= 0 or min_rate > rate:
+            raise RateLimiterException('Invalid rate limiter configuration.')
+        if not 0 < decrease < 1 or increase < 0:
+            raise RateLimiterException('Invalid rate limiter configuration.')
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.clock = clock
+        self.wait = wait
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.lock = Lock()
+
+    def acquire(self):
+        """
+        Block until a request may be sent, and take one token from the bucket.
+        """
+        delay = self.reserve()
+        while delay:
+            self.wait(delay)
+            delay = self.reserve()
+
+    async def aacquire(self):
+        """
+        Coroutine counterpart of acquire, which waits without blocking the event
+        loop.
+        """
+        delay = self.reserve()
+        while delay:
+            await asyncio.sleep(delay)
+            delay = self.reserve()
+
+    def reserve(self):
+        """
+        Take one token from the bucket and return 0 if a request may be sent now.
+        Otherwise, return the number of seconds to wait before trying again.
+        """
+        with self.lock:
+            now = self.clock()
+            self.refill(now)
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def refill(self, now):
+        """
+        Add tokens earned since the last update. Must be called with the lock
+        held.
+        """
+        elapsed = max(now - self.updated, 0)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def success(self):
+        """
+        Additively increase the rate after a successful request.
+        """
+        with self.lock:
+            self.refill(self.clock())
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self, retry_after=None):
+        """
+        Multiplicatively decrease the rate after the server signalled that it is
+        overloaded. If retry_after (in seconds) is given, no request is allowed
+        until it passes.
+        """
+        with self.lock:
+            now = self.clock()
+            self.refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            if retry_after is not None:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def failure(self, status, headers=None):
+        """
+        Inspect failed response and slow down if the status code indicates
+        throttling. Return True if the rate was decreased.
+        """
+        if not self.is_throttling(status):
+            return False
+        retry_after = None
+        if headers is not None:
+            retry_after = self.parse_retry_after(headers.get('Retry-After'))
+        self.throttled(retry_after)
+        return True
+
+    def is_throttling(self, status):
+        """
+        Check if the status code means that the server wants us to slow down.
+        """
+        return status == 429 or 500 <= status < 600
+
+    def parse_retry_after(self, value):
+        """
+        Return number of seconds from Retry-After header value. Header can
+        contain either number of seconds or HTTP date. Return None if the value
+        is missing or invalid.
+        """
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+        if moment is None:
+            return None
+        return max(moment.timestamp() - time(), 0.0)
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+
+
+"""
+Retries of failed requests. RetryPolicy decides which errors are worth another
+attempt, and how long to wait before it, and FailureReport collects the errors
+which were not fixed by retrying. Example:
+
+```python3
+policy = RetryPolicy(attempts=5, budget=1000)
+report = FailureReport()
+downloader = Downloader(images, '/home/user/Download', retry_policy=policy,
+                        failures=report)
+downloader.download()
+report.write('/home/user/Download/failures.json')
+```
+
+Delays grow exponentially with the number of the attempt, and a random part of
+the delay is used (full jitter), so that workers which failed at the same time
+do not retry at the same time. The budget limits the number of retries in the
+whole run, so a server which is down does not make the run retry every image.
+"""
+
+
+import os
+import json
+import random
+import asyncio
+from time import sleep
+from threading import Lock
+from http.client import HTTPException
+from urllib.error import HTTPError
+from urllib.error import URLError
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+RETRYABLE_STATUSES = frozenset([408, 425, 429, 500, 502, 503, 504])
+
+# Errors of the connection itself, e.g. a reset connection, a timeout, or
+# a response which ended too soon.
+NETWORK_ERRORS = (URLError, HTTPException, ConnectionError, TimeoutError)
+
+
+class RetryPolicyException(Exception):
+    """
+    Raise this exception if the retry policy is configured with invalid values.
+    """
+    pass
+
+
+class RetryPolicy(object):
+    """
+    Thread safe policy of retries with exponential backoff, jitter and a retry
+    budget shared by all workers.
+    """
+
+    def __init__(self, attempts=3, backoff=0.5, max_backoff=30.0, budget=None,
+                 retryable=RETRYABLE_STATUSES, random=random.random, wait=sleep):
+        """
+        Initiate RetryPolicy. Attempts is the maximum number of attempts per
+        request, including the first one, so 1 disables retries. Backoff is the
+        maximum delay before the first retry, doubled for every next one up to
+        max_backoff. Budget is the number of retries allowed in the whole run,
+        or None for no limit. Retryable is the set of HTTP status codes which
+        are retried.
+        """
+        if attempts < 1 or backoff < 0 or max_backoff < backoff:
+            raise RetryPolicyException('Invalid retry policy configuration.')
+        if budget is not None and budget < 0:
+            raise RetryPolicyException('Invalid retry policy configuration.')
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.retryable = frozenset(retryable)
+        self.random = random
+        self.wait = wait
+        self.retries = 0
+        self.lock = Lock()
+
+    def is_retryable(self, error):
+        """
+        Check if the error is transient. HTTP errors are retried only for the
+        retryable status codes, while network errors are always retried. Other
+        exceptions can mark themselves as transient with a transient attribute.
+        """
+        if isinstance(error, HTTPError):
+            return error.code in self.retryable
+        if isinstance(error, NETWORK_ERRORS):
+            return True
+        return getattr(error, 'transient', False)
+
+    def should_retry(self, error, attempt):
+        """
+        Check if the request which failed with the error in the given attempt
+        (counted from 1) should be sent again. A retry which is allowed is taken
+        from the budget.
+        """
+        if attempt >= self.attempts or not self.is_retryable(error):
+            return False
+        with self.lock:
+            if self.budget is not None and self.retries >= self.budget:
+                return False
+            self.retries += 1
+        return True
+
+    def delay(self, attempt):
+        """
+        Return a random number of seconds to wait after the given attempt, up to
+        the exponential backoff for it.
+        """
+        backoff = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return self.random() * backoff
+
+    def pause(self, attempt):
+        self.wait(self.delay(attempt))
+
+    async def apause(self, attempt):
+        await asyncio.sleep(self.delay(attempt))
+
+
+class FailureReport(object):
+    """
+    Thread safe, machine readable list of images and albums which could not be
+    downloaded.
+    """
+
+    def __init__(self):
+        self.images = []
+        self.albums = []
+        self.lock = Lock()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.images) + len(self.albums)
+
+    def describe(self, error):
+        """
+        Return the status code, if there is one, and the message of the error.
+        """
+        if isinstance(error, HTTPError):
+            return error.code, 'HTTP Error {}: {}'.format(error.code, error.reason)
+        if isinstance(error, URLError):
+            return None, str(error.reason)
+        return None, str(error) or type(error).__name__
+
+    def add_image(self, image, error, attempts, retryable=False):
+        status, message = self.describe(error)
+        with self.lock:
+            self.images.append({
+                'url': image['url'],
+                'filename': image['filename'],
+                'status': status,
+                'error': message,
+                'attempts': attempts,
+                'retryable': retryable,
+            })
+
+    def add_album(self, url, error):
+        status, message = self.describe(error)
+        with self.lock:
+            self.albums.append({'url': url, 'status': status, 'error': message})
+
+    def as_dict(self):
+        with self.lock:
+            return {'images': list(self.images), 'albums': list(self.albums)}
+
+    def write(self, path):
+        """
+        Write the report as JSON, through a temporary file.
+        """
+        content = json.dumps(self.as_dict(), indent=2)
+        temporary = ''.join([path, '.tmp'])
+        with open(temporary, 'w') as f:
+            f.write(content)
+        os.replace(temporary, path)
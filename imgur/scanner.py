@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+
+"""
+Incremental scanner of imgur pages. The page is fed to PageScanner in chunks of
+bytes as they arrive from the network, and image objects are reported as soon
+as they are complete. Example:
+
+```python3
+scanner = PageScanner()
+with pool.request(url) as response:
+    for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+        for filename, extension in scanner.feed(chunk):
+            print(filename, extension)
+```
+
+The page is never decoded, and only the unfinished tail of the data is kept
+between chunks, so the memory does not depend on the size of the page.
+"""
+
+
+import re
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+CHUNK_SIZE = 64 * 1024
+MAX_OBJECT_SIZE = 1024 * 1024
+OBJECT_START = b'{"hash":"'
+
+# Image objects do not contain nested objects, so the match stops at the first
+# brace which is not inside a string. Pages with many objects without extension
+# are still scanned in linear time.
+IMAGE_PATTERN = re.compile(
+    rb'\{"hash":"([a-zA-Z0-9]+)"'
+    rb'(?:[^{}"]|"(?:[^"\\]|\\.)*")*?'
+    rb'"ext":"([\.a-zA-Z0-9\?\#]+)"'
+)
+
+
+class PageScanner(object):
+    """
+    Find unique (hash, extension) tuples of image objects in a page fed in
+    chunks.
+    """
+
+    def __init__(self):
+        self.buffer = b''
+        self.seen = set()
+
+    def feed(self, chunk):
+        """
+        Scan the next chunk of the page, and return list of images which were
+        completed by it, in order, without the ones found before.
+        """
+        data = self.buffer + chunk
+        found = []
+        end = 0
+        for match in IMAGE_PATTERN.finditer(data):
+            end = match.end()
+            filename = (match.group(1).decode('ascii'), match.group(2).decode('ascii'))
+            if filename not in self.seen:
+                self.seen.add(filename)
+                found.append(filename)
+        self.buffer = self.unfinished_tail(data, end)
+        return found
+
+    def unfinished_tail(self, data, end):
+        """
+        Return the part of data after the last match which could be the start of
+        an image object completed by the following chunks. Objects longer than
+        MAX_OBJECT_SIZE are dropped.
+        """
+        start = data.rfind(OBJECT_START, end)
+        if start == -1:
+            # The chunk could end with a part of the object start.
+            start = max(end, len(data) - len(OBJECT_START) + 1)
+        if len(data) - start > MAX_OBJECT_SIZE:
+            return b''
+        return data[start:]
@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+
+
+"""
+Fair scheduling of images across the albums of a batch. Like Pipeline, Scheduler
+resolves albums in a background thread, but instead of one FIFO queue it keeps
+a queue per album, and hands out images from the albums in turns. Example:
+
+```python3
+batch = Batch(urls)
+scheduler = Scheduler(batch.stream_images(), priorities={'vTTHZ': 1},
+                      host_limit=8)
+
+downloader = Downloader(scheduler, '/home/user/Download', workers=16)
+downloader.download()
+```
+
+A large album therefore does not hold back the small albums listed after it:
+they are resolved while the large one is downloaded, and get their share of
+the workers as soon as they arrive. Albums of a higher priority are served
+first. Albums of the same priority share the workers in proportion to their
+weights (weighted fair queuing, with the default weight of 1 it is round-robin).
+
+With host_limit, at most that many images per host are handed out and not yet
+finished. Downloader reports finished images through task_done. The limit is
+meant for the threads of Downloader.download, and Downloader.adownload rejects
+a Scheduler with host_limit.
+
+Albums are identified by their directory, which is the album hash in batch
+mode.
+"""
+
+
+import os
+from collections import deque
+from threading import Thread
+from threading import Condition
+from urllib.parse import urlsplit
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class SchedulerException(Exception):
+    """
+    Raise this exception if the scheduler is configured with invalid values.
+    """
+    pass
+
+
+class AlbumQueue(object):
+    """
+    Images of one album which wait to be downloaded.
+    """
+
+    def __init__(self, key, priority, weight, start):
+        self.key = key
+        self.priority = priority
+        self.weight = weight
+        # Virtual time of the album, which grows by 1 / weight with every image
+        # handed out. The album with the lowest one is served next.
+        self.time = start
+        self.images = deque()
+
+
+class Scheduler(object):
+    """
+    Iterable over images of many albums, interleaved by priority and weight.
+    """
+
+    def __init__(self, source, priorities=None, weights=None, host_limit=None,
+                 max_albums=64):
+        """
+        Initiate Scheduler. Source is an iterable of images, e.g. from
+        Batch.stream_images. Priorities and weights map album directories to
+        numbers; albums which are not listed have priority 0 and weight 1.
+        Host limit is the number of unfinished images per host, or None for no
+        limit. At most max_albums albums with waiting images are held, after
+        which the resolution of further albums waits.
+        """
+        if host_limit is not None and host_limit < 1:
+            raise SchedulerException('Host limit must be positive.')
+        if max_albums < 1:
+            raise SchedulerException('Number of albums must be positive.')
+        weights = weights or {}
+        if any(weight <= 0 for weight in weights.values()):
+            raise SchedulerException('Weights must be positive.')
+        self.source = source
+        self.priorities = priorities or {}
+        self.weights = weights
+        self.host_limit = host_limit
+        self.max_albums = max_albums
+        self.queues = {}
+        self.active = {}
+        self.time = 0.0
+        self.finished = False
+        self.error = None
+        self.condition = Condition()
+        self.thread = None
+
+    def __iter__(self):
+        """
+        Start the producer, and yield images until the source is exhausted and
+        every queue is empty. If the source raised an exception, it is raised
+        again in the consumer.
+        """
+        if self.thread is None:
+            self.thread = Thread(target=self.produce, daemon=True)
+            self.thread.start()
+        while True:
+            with self.condition:
+                image = self.next_image()
+                while image is None and not (self.finished and not self.queues):
+                    self.condition.wait()
+                    image = self.next_image()
+            if image is None:
+                break
+            yield image
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def produce(self):
+        try:
+            for image in self.source:
+                self.put(image)
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.condition:
+                self.finished = True
+                self.condition.notify_all()
+
+    def put(self, image):
+        """
+        Add the image to the queue of its album. A new album waits while
+        max_albums albums have images waiting.
+        """
+        key = self.album_key(image)
+        with self.condition:
+            queue = self.queues.get(key)
+            if queue is None:
+                while len(self.queues) >= self.max_albums:
+                    self.condition.wait()
+                # A new album starts at the current virtual time, so it does
+                # not get a burst of images for the time it was not there.
+                queue = AlbumQueue(
+                    key, self.priorities.get(key, 0), self.weights.get(key, 1),
+                    self.time
+                )
+                self.queues[key] = queue
+            queue.images.append(image)
+            self.condition.notify_all()
+
+    def next_image(self):
+        """
+        Take the next image from the album of the highest priority and the lowest
+        virtual time, skipping albums whose next image is on a host at its limit.
+        Return None if there is no such image. Must be called with the condition
+        held.
+        """
+        best = None
+        for queue in self.queues.values():
+            if not self.has_capacity(queue.images[0]):
+                continue
+            if best is None or (-queue.priority, queue.time) < (-best.priority, best.time):
+                best = queue
+        if best is None:
+            return None
+        image = best.images.popleft()
+        self.time = best.time
+        best.time += 1.0 / best.weight
+        if not best.images:
+            del self.queues[best.key]
+            self.condition.notify_all()
+        if self.host_limit is not None:
+            host = self.host(image)
+            self.active[host] = self.active.get(host, 0) + 1
+        return image
+
+    def task_done(self, image):
+        """
+        Mark the image as finished, which frees a place for its host.
+        """
+        if self.host_limit is None:
+            return
+        with self.condition:
+            host = self.host(image)
+            self.active[host] -= 1
+            if not self.active[host]:
+                del self.active[host]
+            self.condition.notify_all()
+
+    def has_capacity(self, image):
+        if self.host_limit is None:
+            return True
+        return self.active.get(self.host(image), 0) < self.host_limit
+
+    def host(self, image):
+        return urlsplit(image['url']).hostname
+
+    def album_key(self, image):
+        """
+        Return the album of the image, which is its directory.
+        """
+        return os.path.dirname(image['filename'])
@@ -0,0 +1,395 @@
+#!/usr/bin/python3
+
+
+"""
+Asyncio HTTP client used by the coroutine API of Imgur and Downloader. It keeps
+persistent connections per host, like ConnectionPool, and limits the number of
+requests in progress with a semaphore. Example:
+
+```python3
+async def main():
+    async with AsyncSession(limit=32) as session:
+        imgur = Imgur('http://imgur.com/gallery/vTTHZ')
+        await imgur.aprepare_images(session)
+        imgur.numerate_images()
+        await Downloader(imgur.images, '/home/user/Download').adownload(session)
+
+asyncio.run(main())
+```
+
+Errors are reported with HTTPError and URLError, the same way ConnectionPool
+reports them. Cancelled requests close their connections. Like http.client, the
+session rejects status, header and chunk size lines longer than MAX_LINE_SIZE.
+"""
+
+
+import io
+import ssl
+import asyncio
+from time import monotonic
+from http.client import parse_headers
+from http.client import HTTPException
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+from urllib.error import HTTPError
+from urllib.error import URLError
+from imgur.connection import USER_AGENT
+from imgur.connection import REDIRECT_CODES
+from imgur.metrics import record
+from imgur.metrics import annotate
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+MAX_HEADERS = 100
+MAX_LINE_SIZE = 64 * 1024
+
+
+class AsyncSessionException(Exception):
+    """
+    Raise this exception if the session is configured with invalid values.
+    """
+    pass
+
+
+def parse_number(value, base, name):
+    """
+    Return the non-negative number from the header or the chunk size line, or
+    raise HTTPException if it is not valid.
+    """
+    try:
+        number = int(value.strip(), base)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise HTTPException('Invalid {}: {!r}'.format(name, value[:32]))
+    return number
+
+
+class AsyncResponse(object):
+    """
+    Response whose body is read with coroutines. The connection is given back
+    to the session once the response is closed.
+    """
+
+    def __init__(self, session, key, connection, status, reason, headers, url,
+                 method):
+        self.session = session
+        self.key = key
+        self.connection = connection
+        self.status = status
+        self.code = status
+        self.reason = reason
+        self.headers = headers
+        self.url = url
+        self.chunked = 'chunked' in headers.get('Transfer-Encoding', '').lower()
+        self.chunk_left = 0
+        self.remaining = None
+        self.complete = False
+        self.keep_alive = headers.get('Connection', '').lower() != 'close'
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            self.complete = True
+        elif not self.chunked:
+            length = headers.get('Content-Length')
+            if length is not None:
+                self.remaining = parse_number(length, 10, 'content length')
+                self.complete = self.remaining == 0
+            else:
+                self.keep_alive = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def geturl(self):
+        return self.url
+
+    async def read(self, amount=-1):
+        """
+        Read at most amount bytes of the body, or the whole body if amount is
+        negative or None. Return b'' when the body is finished.
+        """
+        if amount is None or amount < 0:
+            parts = []
+            while True:
+                part = await self.read(64 * 1024)
+                if not part:
+                    return b''.join(parts)
+                parts.append(part)
+        if self.complete or amount == 0:
+            return b''
+        try:
+            if self.chunked:
+                return await self.read_chunk(amount)
+            return await self.read_plain(amount)
+        except (OSError, HTTPException, asyncio.IncompleteReadError,
+                asyncio.TimeoutError) as e:
+            self.keep_alive = False
+            raise URLError(e) from None
+
+    async def read_plain(self, amount):
+        reader = self.connection[0]
+        if self.remaining is not None:
+            amount = min(amount, self.remaining)
+        data = await self.session.timed(reader.read(amount))
+        if self.remaining is None:
+            if not data:
+                self.complete = True
+            return data
+        if not data:
+            raise URLError('Incomplete read.')
+        self.remaining -= len(data)
+        self.complete = self.remaining == 0
+        return data
+
+    async def read_chunk(self, amount):
+        reader = self.connection[0]
+        if self.chunk_left == 0:
+            line = await self.session.read_line(reader)
+            self.chunk_left = parse_number(line.split(b';')[0], 16, 'chunk size')
+            if self.chunk_left == 0:
+                trailer = None
+                while trailer not in (b'\r\n', b'\n', b''):
+                    trailer = await self.session.read_line(reader)
+                self.complete = True
+                return b''
+        data = await self.session.timed(reader.read(min(amount, self.chunk_left)))
+        if not data:
+            raise URLError('Incomplete read.')
+        self.chunk_left -= len(data)
+        if self.chunk_left == 0:
+            await self.session.timed(reader.readexactly(2))
+        return data
+
+    def close(self):
+        """
+        Release the connection. It is kept only if the body was read completely
+        and the server did not ask for the connection to be closed.
+        """
+        if self.connection is None:
+            return
+        reusable = self.complete and self.keep_alive
+        self.session.release(self.key, self.connection, reusable)
+        self.connection = None
+
+
+class AsyncSession(object):
+    """
+    Pool of persistent asyncio connections, grouped by host, with a limit on
+    the number of requests in progress.
+    """
+
+    def __init__(self, limit=16, size=4, idle_timeout=30, timeout=30,
+                 max_redirects=5, routes=None):
+        """
+        Initiate AsyncSession. Limit is the number of requests which can wait
+        for the response headers at the same time, and size is the number of
+        idle connections kept per host. Routes map host names to base urls, like
+        in ConnectionPool.
+        """
+        if limit < 1 or size < 1 or idle_timeout < 0:
+            raise AsyncSessionException('Invalid session configuration.')
+        self.limit = limit
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.routes = {}
+        for host, base in (routes or {}).items():
+            route = urlsplit(base)
+            self.routes[host] = (route.scheme, route.hostname, route.port)
+        self.idle = {}
+        self.semaphore = None
+        self.ssl_context = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def timed(self, coroutine):
+        return asyncio.wait_for(coroutine, self.timeout)
+
+    async def read_line(self, reader):
+        """
+        Read a line of the status, the headers or the chunk sizes. The reader
+        raises ValueError for a line longer than its limit, which is
+        MAX_LINE_SIZE.
+        """
+        try:
+            return await self.timed(reader.readline())
+        except ValueError:
+            raise HTTPException('Line longer than {} bytes.'.format(MAX_LINE_SIZE)) from None
+
+    async def request(self, url, headers=None, method='GET'):
+        """
+        Send a request and return AsyncResponse. Redirects are followed. Raise
+        HTTPError if the final status code is 4xx or 5xx.
+        """
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.limit)
+        async with self.semaphore:
+            for _ in range(self.max_redirects + 1):
+                response = await self.send(url, headers or {}, method)
+                location = response.getheader('Location')
+                if response.status in REDIRECT_CODES and location:
+                    await self.discard_body(response)
+                    url = urljoin(url, location)
+                    continue
+                annotate('status', response.status)
+                if response.status >= 400:
+                    body = await self.discard_body(response)
+                    raise HTTPError(
+                        url, response.status, response.reason, response.headers,
+                        io.BytesIO(body)
+                    ) from None
+                return response
+            raise URLError('Too many redirects.')
+
+    async def send(self, url, headers, method):
+        """
+        Send a single request. A reused connection could have been closed by the
+        server in the meantime, in which case the request is sent again over a
+        new connection.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise URLError('Unsupported url: {}'.format(url))
+        key = (parts.scheme, parts.hostname, parts.port)
+        key = self.routes.get(parts.hostname, key)
+        path = parts.path or '/'
+        if parts.query:
+            path = '?'.join([path, parts.query])
+        request_headers = {
+            'Host': parts.netloc,
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'identity',
+        }
+        request_headers.update(headers)
+        lines = ['{} {} HTTP/1.1'.format(method, path)]
+        lines.extend('{}: {}'.format(name, value) for name, value in request_headers.items())
+        message = '\r\n'.join(lines + ['', '']).encode('latin-1')
+
+        connection, reused = await self.acquire(key)
+        try:
+            try:
+                return await self.exchange(key, connection, message, url, method)
+            except (ConnectionError, asyncio.IncompleteReadError, HTTPException):
+                self.release(key, connection, False)
+                if not reused:
+                    raise
+                connection = await self.connect(key)
+                return await self.exchange(key, connection, message, url, method)
+        except (HTTPException, OSError, asyncio.IncompleteReadError,
+                asyncio.TimeoutError) as e:
+            self.release(key, connection, False)
+            raise URLError(e) from None
+        except BaseException:
+            self.release(key, connection, False)
+            raise
+
+    async def exchange(self, key, connection, message, url, method):
+        """
+        Write the request, and read the status line and the headers.
+        """
+        reader, writer = connection
+        start = monotonic()
+        writer.write(message)
+        await self.timed(writer.drain())
+        status_line = await self.read_line(reader)
+        if not status_line:
+            raise ConnectionResetError('Connection closed by the server.')
+        status_line = status_line.decode('latin-1').rstrip('\r\n')
+        version, status, reason = (status_line.split(' ', 2) + [''])[:3]
+        if not version.startswith('HTTP/'):
+            raise HTTPException('Invalid status line: {!r}'.format(status_line))
+        block = []
+        for _ in range(MAX_HEADERS + 1):
+            line = await self.read_line(reader)
+            block.append(line)
+            if line in (b'\r\n', b'\n', b''):
+                break
+        else:
+            raise HTTPException('Too many headers.')
+        headers = parse_headers(io.BytesIO(b''.join(block)))
+        record('ttfb', monotonic() - start)
+        return AsyncResponse(
+            self, key, connection, parse_number(status, 10, 'status'), reason,
+            headers, url, method
+        )
+
+    async def acquire(self, key):
+        """
+        Return an idle connection for the host and True, or a new connection and
+        False if there is no idle connection.
+        """
+        now = monotonic()
+        connections = self.idle.get(key, [])
+        while connections:
+            connection, released = connections.pop()
+            if now - released <= self.idle_timeout and not connection[0].at_eof():
+                return connection, True
+            connection[1].close()
+        return await self.connect(key), False
+
+    async def connect(self, key):
+        scheme, host, port = key
+        context = None
+        if scheme == 'https':
+            if self.ssl_context is None:
+                self.ssl_context = ssl.create_default_context()
+            context = self.ssl_context
+        port = port or (443 if scheme == 'https' else 80)
+        # Name resolution happens inside open_connection, so it is recorded as
+        # a part of the connect phase.
+        start = monotonic()
+        connection = await self.timed(asyncio.open_connection(
+            host, port, ssl=context, server_hostname=host if context else None,
+            limit=MAX_LINE_SIZE
+        ))
+        record('connect', monotonic() - start)
+        return connection
+
+    def release(self, key, connection, reusable=True):
+        """
+        Put the connection back into the pool, or close it if it cannot be reused
+        or the pool for the host is full.
+        """
+        if reusable:
+            connections = self.idle.setdefault(key, [])
+            if len(connections) < self.size:
+                connections.append((connection, monotonic()))
+                return
+        connection[1].close()
+
+    async def discard_body(self, response):
+        """
+        Read the rest of the response body, so that the connection can be reused.
+        """
+        try:
+            return await response.read()
+        except URLError:
+            return b''
+        finally:
+            response.close()
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection[1].close()
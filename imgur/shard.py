@@ -0,0 +1,222 @@
+#!/usr/bin/python3
+
+
+"""
+Split a large batch into shards which are downloaded by separate processes, or
+by separate machines. Every link is assigned to a shard by the hash of its album,
+so all shards agree on the assignment without talking to each other, and an
+album listed many times is downloaded by one shard only. Example:
+
+```python3
+shard = Shard.parse('2/8')
+batch = Batch(shard.select(urls))
+summary = Downloader(Pipeline(batch.stream_images()), directory).download()
+shard.write_report(directory, batch, summary)
+```
+
+Each shard writes its report (and its manifest and journal, if they are used)
+into the destination directory. When all shards are finished, the reports are merged:
+
+```python3
+merge = ShardMerge(directory, 8)
+merge.merge()
+print(merge.format_summary())
+```
+"""
+
+
+import os
+import json
+import hashlib
+from imgur.imgur import Imgur
+from imgur.imgur import ImgurException
+from imgur.batch import Batch
+from imgur.retry import FailureReport
+from imgur.manifest import Manifest
+from imgur.manifest import ManifestException
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+REPORT_FILENAME = '.crawlgur-shard-{}-of-{}.json'
+MANIFEST_FILENAME = '.crawlgur-manifest-{}-of-{}.json'
+JOURNAL_FILENAME = '.crawlgur-journal-{}-of-{}.sqlite'
+
+
+class ShardException(Exception):
+    """
+    Raise this exception if the shard is invalid, or if its report cannot be
+    read.
+    """
+    pass
+
+
+class Shard(object):
+    """
+    One of count shards of a batch, numbered from 0.
+    """
+
+    def __init__(self, index, count):
+        if count < 1 or not 0 <= index < count:
+            raise ShardException('Invalid shard: {}/{}.'.format(index, count))
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Return Shard from the i/N notation, e.g. 0/4 for the first of four
+        shards.
+        """
+        try:
+            index, count = value.split('/')
+            return cls(int(index), int(count))
+        except ValueError:
+            raise ShardException('Invalid shard: {}.'.format(value))
+
+    def __repr__(self):
+        return '{}/{}'.format(self.index, self.count)
+
+    def key(self, url):
+        """
+        Return the key which decides the shard of the link. Links of the same
+        album have the same key, and invalid links are keyed by themselves.
+        """
+        try:
+            return Imgur(url).get_hash()
+        except ImgurException:
+            return url
+
+    def shard_of(self, url):
+        # Built-in hash is randomized per process, so a digest is used to keep
+        # the assignment the same on every machine.
+        digest = hashlib.sha1(self.key(url).encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') % self.count
+
+    def contains(self, url):
+        return self.shard_of(url) == self.index
+
+    def select(self, urls):
+        """
+        Return links which belong to this shard, in their original order.
+        """
+        return [url for url in urls if self.contains(url)]
+
+    def report_filename(self):
+        return REPORT_FILENAME.format(self.index, self.count)
+
+    def manifest_filename(self):
+        return MANIFEST_FILENAME.format(self.index, self.count)
+
+    def journal_filename(self):
+        return JOURNAL_FILENAME.format(self.index, self.count)
+
+    def write_report(self, directory, batch, summary, failures=None):
+        """
+        Write the albums, invalid links, the download summary and the failure
+        report of the shard into its report, through a temporary file.
+        """
+        path = os.path.join(directory, self.report_filename())
+        content = json.dumps({
+            'shard': [self.index, self.count],
+            'summary': summary,
+            'albums': batch.albums,
+            'invalid': batch.invalid,
+            'failed': [(url, str(error)) for url, error in batch.failed],
+            'finished': batch.finished,
+            'failures': failures.as_dict() if failures is not None else None,
+        }, indent=2)
+        temporary = ''.join([path, '.tmp'])
+        with open(temporary, 'w') as f:
+            f.write(content)
+        os.replace(temporary, path)
+
+
+class ShardMerge(object):
+    """
+    Combine the reports and manifests of all shards of a batch.
+    """
+
+    def __init__(self, directory, count):
+        """
+        Initiate ShardMerge for count shards which downloaded into the
+        directory.
+        """
+        self.directory = directory
+        self.shards = [Shard(index, count) for index in range(count)]
+        self.batch = Batch([])
+        self.summary = {'downloaded': 0, 'skipped': 0, 'failed': 0}
+        self.failures = FailureReport()
+        self.missing = []
+
+    def merge(self):
+        """
+        Read reports of all shards, and add up their summaries. Shards without
+        a report are collected in the missing attribute. Shard manifests are
+        merged into the manifest of the directory, so that a later run without
+        shards skips the same files. Return the combined summary.
+        """
+        for shard in self.shards:
+            report = self.read_report(shard)
+            if report is None:
+                self.missing.append(shard)
+                continue
+            self.batch.albums.extend(tuple(album) for album in report['albums'])
+            self.batch.invalid.extend(report['invalid'])
+            self.batch.failed.extend(tuple(album) for album in report.get('failed', []))
+            self.batch.finished += report.get('finished', 0)
+            failures = report.get('failures') or {}
+            self.failures.images.extend(failures.get('images', []))
+            self.failures.albums.extend(failures.get('albums', []))
+            for outcome in self.summary:
+                self.summary[outcome] += report['summary'].get(outcome, 0)
+        self.merge_manifests()
+        return self.summary
+
+    def read_report(self, shard):
+        path = os.path.join(self.directory, shard.report_filename())
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise ShardException('Cannot read report of shard {}: {}'.format(shard, e))
+
+    def merge_manifests(self):
+        """
+        Merge manifests of the shards into the manifest of the directory. Nothing
+        is written if no shard ran in sync mode.
+        """
+        manifest = Manifest(self.directory)
+        merged = False
+        for shard in self.shards:
+            part = Manifest(self.directory, shard.manifest_filename())
+            if not os.path.exists(part.path):
+                continue
+            if not merged:
+                manifest.load()
+                merged = True
+            try:
+                part.load()
+            except ManifestException as e:
+                raise ShardException('Cannot read manifest of shard {}: {}'.format(shard, e))
+            manifest.entries.update(part.entries)
+        if merged:
+            manifest.save()
+
+    def format_summary(self):
+        """
+        Return aggregate summary of all shards, in the format of the batch
+        summary.
+        """
+        lines = [self.batch.format_summary(self.summary)]
+        for shard in self.missing:
+            lines.append('Missing report of shard {}.'.format(shard))
+        return '\n'.join(lines)
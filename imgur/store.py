@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+
+
+"""
+Content addressed store shared by many albums. Every image is downloaded once
+into the store, and album directories only contain links to it. Example:
+
+```python3
+store = ObjectStore('/home/user/Download/.objects')
+downloader = Downloader(images, '/home/user/Download/album', store=store)
+downloader.download()
+```
+
+Objects are named after SHA-256 of their content, e.g.
+objects/3a/3a7bd3e2360a3d29eea436fcfb7e44c735d117c42d1c1835420b6b9942dd4f1b.jpg,
+so identical files uploaded under different imgur hashes are stored only once.
+The index maps imgur filenames (hash and extension) to the digests, so images
+which are already in the store are linked without any request.
+"""
+
+
+import os
+import json
+import hashlib
+import tempfile
+from threading import Lock
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+INDEX_FILENAME = 'index.json'
+
+
+class ObjectStoreException(Exception):
+    """
+    Raise this exception if the index of the store cannot be read, or if a file
+    cannot be linked.
+    """
+    pass
+
+
+class ObjectStore(object):
+    """
+    Thread safe store of files addressed by SHA-256 of their content.
+    """
+
+    def __init__(self, directory, symlinks=False):
+        """
+        Initiate ObjectStore in the given directory. Album files are hard links
+        to the objects, or symbolic links if symlinks is set.
+        """
+        self.directory = os.path.abspath(directory)
+        self.symlinks = symlinks
+        self.index_path = os.path.join(self.directory, INDEX_FILENAME)
+        self.index = {}
+        self.lock = Lock()
+        os.makedirs(os.path.join(self.directory, 'tmp'), exist_ok=True)
+        self.load()
+
+    def load(self):
+        """
+        Read the index from the disk. Missing index is treated as empty.
+        """
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ObjectStoreException('Cannot read index: {}'.format(e))
+        with self.lock:
+            index.update(self.index)
+            self.index = index
+
+    def save(self):
+        """
+        Write the index to the disk, through a temporary file. Entries written
+        in the meantime by other processes sharing the store are kept.
+        """
+        try:
+            self.load()
+        except ObjectStoreException:
+            pass
+        with self.lock:
+            content = json.dumps(self.index, indent=2, sort_keys=True)
+        temporary = ''.join([self.index_path, '.tmp'])
+        with open(temporary, 'w') as f:
+            f.write(content)
+        os.replace(temporary, self.index_path)
+
+    def object_path(self, digest, extension):
+        return os.path.join(
+            self.directory, 'objects', digest[:2], ''.join([digest, extension])
+        )
+
+    def lookup(self, key):
+        """
+        Return the path of the object for the imgur filename, e.g. jedEzFL.jpg,
+        or None if it is not in the store.
+        """
+        with self.lock:
+            digest = self.index.get(key)
+        if digest is None:
+            return None
+        path = self.object_path(digest, os.path.splitext(key)[1])
+        return path if os.path.exists(path) else None
+
+    def temporary_path(self):
+        """
+        Return the path of a new empty file, into which an image is downloaded
+        before it is added to the store.
+        """
+        descriptor, path = tempfile.mkstemp(dir=os.path.join(self.directory, 'tmp'))
+        os.close(descriptor)
+        return path
+
+    def add(self, key, path, digest=None):
+        """
+        Move the downloaded file into the store, and return the object path. If
+        an object with the same content already exists, the file is removed.
+        """
+        if digest is None:
+            digest = self.file_digest(path)
+        destination = self.object_path(digest, os.path.splitext(key)[1])
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.exists(destination):
+            os.remove(path)
+        else:
+            os.replace(path, destination)
+        with self.lock:
+            self.index[key] = digest
+        return destination
+
+    def file_digest(self, path):
+        """
+        Return SHA-256 hex digest of the file.
+        """
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def link(self, path, filename):
+        """
+        Link the object to the filename, replacing the file if it exists. If hard
+        link cannot be created, e.g. across file systems, symbolic link is used.
+        """
+        if os.path.lexists(filename):
+            os.remove(filename)
+        try:
+            if self.symlinks:
+                os.symlink(path, filename)
+            else:
+                try:
+                    os.link(path, filename)
+                except OSError:
+                    os.symlink(path, filename)
+        except OSError as e:
+            raise ObjectStoreException('Cannot link {}: {}'.format(filename, e))
@@ -0,0 +1,204 @@
+#!/usr/bin/python3
+
+
+"""
+Discover albums and images of an imgur user, e.g. https://username.imgur.com.
+The profile is listed over numbered pages, which are fetched by a few threads at
+the same time, and the links found on them are downloaded as a batch. Example:
+
+```python3
+user = ImgurUser('https://username.imgur.com')
+batch = Batch(user.discover())
+summary = Downloader(Pipeline(batch.stream_images()), '/home/user/Download').download()
+```
+
+The number of pages is not known in advance, so pages are requested ahead of
+the one which is being read, at most fanout of them at once. The listing ends
+with the first page which is missing, or which has no new links, and pages after
+it are not requested any more. A page before the end which cannot be loaded
+stops the listing with its error, while errors of the pages requested past the
+end are ignored.
+"""
+
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from imgur.connection import default_pool
+from imgur.retry import NETWORK_ERRORS
+from imgur.metrics import annotate
+from imgur.metrics import default_metrics
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+USER_PATTERN = re.compile(
+    r'https?\:\/\/(?:(?!(?:i|www|m|api)\.)([a-zA-Z0-9_-]+)\.imgur\.com\/?'
+    r'|(?:www\.)?imgur\.com\/user\/([a-zA-Z0-9_-]+)\/?)'
+    r'(?:[?#].*)?$'
+)
+USER_PAGE = 'https://{}.imgur.com/page/{}'
+LINK_PATTERN = re.compile(
+    r'href=["\'](?:https?\:)?\/\/(?:www\.|i\.)?imgur\.com\/'
+    r'(?:(a|gallery)\/)?([a-zA-Z0-9]+)(\.[a-zA-Z0-9]+)?["\'?#]'
+)
+
+
+def user_name(url):
+    """
+    Return the name of the user from a link to the profile, or None if the link
+    does not point to a profile. Examples:
+
+    https://username.imgur.com          ->  username
+    https://imgur.com/user/username     ->  username
+    """
+    match = USER_PATTERN.match(url)
+    if match is None:
+        return None
+    return match.group(1) or match.group(2)
+
+
+class ImgurUserException(Exception):
+    """
+    Raise this exception if the link does not point to a user profile.
+    """
+    pass
+
+
+class ImgurUser(object):
+    """
+    Collect links to all albums and images of an imgur user.
+    """
+
+    def __init__(self, url, pool=None, fanout=4, retry_policy=None,
+                 metrics=None):
+        """
+        Initiate ImgurUser. Pages are fetched through the given connection pool,
+        at most fanout pages at the same time. If the retry policy is given,
+        pages which failed to load are requested again. Every page is traced for
+        the hooks of the metrics.
+        """
+        self.name = user_name(url)
+        if self.name is None:
+            raise ImgurUserException('Invalid user link.')
+        if not isinstance(fanout, int) or fanout < 1:
+            raise ImgurUserException('Fanout must be a positive integer.')
+        self.url = url
+        self.pool = pool or default_pool
+        self.fanout = fanout
+        self.retry_policy = retry_policy
+        self.metrics = metrics or default_metrics
+        self.pages = 0
+        self.error = None
+
+    def page_url(self, page):
+        return USER_PAGE.format(self.name, page)
+
+    def discover(self):
+        """
+        Return links to all albums of the user, followed by the images which are
+        not in any album, in the order they appear on the pages. Raise the error
+        of a page which cannot be loaded.
+        """
+        albums, images = [], []
+        for links in self.stream_pages():
+            for link in links:
+                if '/a/' in link:
+                    albums.append(link)
+                else:
+                    images.append(link)
+        return albums + images
+
+    def stream_pages(self):
+        """
+        Generator which yields lists of new links from every page, in the order
+        of the pages. While a page is read, the next fanout - 1 pages are
+        already being fetched. If a page cannot be loaded, the error is kept in
+        the error attribute, and raised. Pages fetched ahead are read only until
+        the end of the listing, so their errors past the end are ignored.
+        """
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.fanout) as executor:
+            pending = {}
+            for page in range(1, self.fanout + 1):
+                pending[page] = executor.submit(self.fetch_page, page)
+            page = 1
+            try:
+                while True:
+                    try:
+                        links = pending.pop(page).result()
+                    except NETWORK_ERRORS as e:
+                        self.error = e
+                        raise
+                    if links is None:
+                        return
+                    links = [link for link in links if link not in seen]
+                    if not links:
+                        return
+                    seen.update(links)
+                    self.pages = page
+                    yield links
+                    pending[page + self.fanout] = executor.submit(
+                        self.fetch_page, page + self.fanout
+                    )
+                    page += 1
+            finally:
+                for future in pending.values():
+                    future.cancel()
+
+    def fetch_page(self, page):
+        """
+        Return the links found on the page, or None if the page does not exist.
+        Raise the error if the page cannot be loaded.
+        """
+        url = self.page_url(page)
+        with self.metrics.trace('page', url=url) as trace:
+            links = self.load_page(url)
+            if trace is not None and links is not None:
+                trace['links'] = len(links)
+        return links
+
+    def load_page(self, url):
+        attempt = 1
+        while True:
+            try:
+                with self.pool.request(url) as response:
+                    return self.extract_links(response.read().decode('utf-8', 'replace'))
+            except HTTPError as e:
+                if e.code == 404:
+                    return None
+                error = e
+            except NETWORK_ERRORS as e:
+                error = e
+            if self.retry_policy is None or not self.retry_policy.should_retry(error, attempt):
+                annotate('error', str(error))
+                raise error
+            self.retry_policy.pause(attempt)
+            attempt += 1
+
+    def extract_links(self, html):
+        """
+        Return unique links to the albums and the images on the page, in the
+        order they appear. Only links (href attributes) are used, so thumbnails
+        of album covers are not mistaken for separate images. Gallery links are
+        turned into album links. Examples:
+
+        href="https://imgur.com/gallery/vTTHZ"  ->  https://imgur.com/a/vTTHZ
+        href="//i.imgur.com/jedEzFL.jpg"        ->  https://i.imgur.com/jedEzFL.jpg
+        href="https://imgur.com/jedEzFL"        ->  https://imgur.com/jedEzFL
+        """
+        links = []
+        for album, hash, extension in LINK_PATTERN.findall(html):
+            if album:
+                links.append('https://imgur.com/a/{}'.format(hash))
+            elif extension:
+                links.append('https://i.imgur.com/{}{}'.format(hash, extension))
+            else:
+                links.append('https://imgur.com/{}'.format(hash))
+        return list(dict.fromkeys(links))
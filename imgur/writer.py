@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+
+
+"""
+Copy response bodies into files with few system calls. Example:
+
+```python3
+writer = StreamWriter(chunk_size=4 * 1024 * 1024, fsync_every=64 * 1024 * 1024)
+downloader = Downloader(images, '/home/user/Download', writer=writer)
+downloader.download()
+```
+
+The body is read straight into a buffer which is allocated once per thread and
+reused for every file (readinto), so no new bytes object is created per chunk,
+and large chunks mean few reads and writes even for files of hundreds of
+megabytes. When the length of the body is known, the file is allocated on disk
+before the first write (posix_fallocate), which keeps it in one piece, and
+fails early if the disk is full.
+
+By default, data is left to the operating system to write out. With fsync_every,
+the file is synced after every fsync_every bytes and at the end, so that a crash
+loses at most that much, without paying for a sync on every write.
+"""
+
+
+import os
+import errno
+import threading
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+WRITE_CHUNK_SIZE = 1024 * 1024
+UNSUPPORTED_ERRORS = frozenset([errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS])
+
+
+class StreamWriterException(Exception):
+    """
+    Raise this exception if the writer is configured with invalid values.
+    """
+    pass
+
+
+class StreamWriter(object):
+    """
+    Thread safe copier of response bodies into files.
+    """
+
+    def __init__(self, chunk_size=WRITE_CHUNK_SIZE, fsync_every=None,
+                 preallocate=True):
+        """
+        Initiate StreamWriter. Chunk size is the size of the buffer of every
+        thread, and the most that is read and written at once. If fsync_every is
+        given, files are synced after every fsync_every bytes. If preallocate
+        is true, files are allocated up front from the length of the body.
+        """
+        if chunk_size < 1 or (fsync_every is not None and fsync_every < 1):
+            raise StreamWriterException('Invalid stream writer configuration.')
+        self.chunk_size = chunk_size
+        self.fsync_every = fsync_every
+        self.preallocate = preallocate and hasattr(os, 'posix_fallocate')
+        self.local = threading.local()
+
+    def buffer(self):
+        """
+        Return the buffer of the current thread, as a memoryview.
+        """
+        view = getattr(self.local, 'view', None)
+        if view is None:
+            view = self.local.view = memoryview(bytearray(self.chunk_size))
+        return view
+
+    def copy(self, response, f, length=None, progress=None, checksum=None):
+        """
+        Copy the response into the file, from its current position, and return
+        the number of bytes written. Length is the expected size of the body, if
+        it is known. Every chunk is reported to the progress, and added to the
+        checksum, if they are given.
+        """
+        start = f.tell()
+        allocated = self.allocate(f, start, length)
+        written = 0
+        unsynced = 0
+        try:
+            if hasattr(response, 'readinto'):
+                view = self.buffer()
+                chunks = (view[:size] for size in iter(lambda: response.readinto(view), 0))
+            else:
+                chunks = iter(lambda: response.read(self.chunk_size), b'')
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+                if progress is not None:
+                    progress.advance(len(chunk))
+                if checksum is not None:
+                    checksum.update(chunk)
+                if self.fsync_every is not None:
+                    unsynced += len(chunk)
+                    if unsynced >= self.fsync_every:
+                        self.sync(f)
+                        unsynced = 0
+        finally:
+            if allocated and written != length:
+                # The body was cut short, or was longer than announced, so
+                # the space allocated for it does not match the data.
+                f.flush()
+                f.truncate(start + written)
+        if unsynced:
+            self.sync(f)
+        return written
+
+    def allocate(self, f, start, length):
+        """
+        Allocate length bytes of the file after start, and return True if the
+        file was allocated. Files opened for appending are not allocated,
+        because their writes always go to the end of the file, which would be
+        after the allocated space.
+        """
+        if not self.preallocate or not length or 'a' in getattr(f, 'mode', 'a'):
+            return False
+        try:
+            os.posix_fallocate(f.fileno(), start, length)
+        except OSError as e:
+            # Not every file system supports allocation, in which case the file
+            # simply grows as it is written. A full disk is still an error.
+            if e.errno in UNSUPPORTED_ERRORS:
+                return False
+            raise
+        return True
+
+    def sync(self, f):
+        f.flush()
+        os.fsync(f.fileno())
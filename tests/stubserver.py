@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+
+"""
+Local HTTP server used by tests instead of imgur.com. Responses are scripted per
+path, and every request is recorded. Example:
+
+```python3
+with StubServer() as server:
+    server.script('/a.jpg', [(429, {'Retry-After': '0'}, b''), (200, {}, b'a')])
+    urlopen(server.url('/a.jpg'))
+```
+
+Scripted responses are served in order, and the last one is repeated. Instead of
+a tuple, a response can be a function which receives the request handler and
+returns the tuple.
+"""
+
+
+from threading import Lock
+from threading import Thread
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serve scripted responses of the server that owns this handler.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status, headers, body = self.server.stub.respond(self)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if 'Content-Length' not in headers:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(object):
+    """
+    Threaded HTTP server bound to a random local port.
+    """
+
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.scripts = {}
+        self.requests = []
+        self.connections = set()
+        self.lock = Lock()
+        self.thread = Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, path):
+        host, port = self.httpd.server_address
+        return 'http://{}:{}{}'.format(host, port, path)
+
+    def script(self, path, responses):
+        """
+        Set the list of (status, headers, body) tuples served for the path.
+        """
+        with self.lock:
+            self.scripts[path] = list(responses)
+
+    def respond(self, handler):
+        with self.lock:
+            self.requests.append((handler.path, dict(handler.headers)))
+            self.connections.add(handler.client_address)
+            responses = self.scripts.get(handler.path)
+            if not responses:
+                return 404, {}, b''
+            response = responses.pop(0) if len(responses) > 1 else responses[0]
+        if callable(response):
+            return response(handler)
+        return response
+
+    def headers(self, path):
+        """
+        Return headers of all requests sent to the path.
+        """
+        with self.lock:
+            return [headers for requested, headers in self.requests
+                    if requested == path]
+
+    def hits(self, path):
+        with self.lock:
+            return sum(1 for requested, _ in self.requests if requested == path)
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+
+import io
+import pytest
+from imgur.batch import Batch
+from imgur.batch import read_urls
+from imgur.retry import RetryPolicy
+from imgur.connection import ConnectionPool
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+@pytest.fixture
+def batch():
+    return Batch([
+        'http://i.imgur.com/jedEzFL.jpg',
+        'https://www.reddit.com',
+        'http://i.imgur.com/lciC5G8.jpg',
+        'http://i.imgur.com/jedEzFL.jpg',
+    ])
+
+def test_read_urls():
+    """
+    Test if empty lines and comments are skipped.
+    """
+    lines = io.StringIO('http://imgur.com/a/vTTHZ\n\n# comment\n  http://imgur.com/jedEzFL  \n')
+    assert read_urls(lines) == ['http://imgur.com/a/vTTHZ', 'http://imgur.com/jedEzFL']
+
+def test_prepare_images(batch):
+    """
+    Test if the images of all links are put into album subdirectories, and if
+    invalid and repeated links are skipped.
+    """
+    batch.prepare_images()
+    assert [image['filename'] for image in batch.images] == [
+        'jedEzFL/1-jedEzFL.jpg', 'lciC5G8/1-lciC5G8.jpg',
+    ]
+    assert batch.invalid == ['https://www.reddit.com']
+
+def test_format_summary(batch):
+    """
+    Test if the summary contains totals and invalid links.
+    """
+    batch.prepare_images()
+    summary = batch.format_summary({'downloaded': 1, 'skipped': 0, 'failed': 1})
+    assert 'Albums: 2, empty: 0, invalid links: 1.' in summary
+    assert 'Images: 1 downloaded, 0 skipped, 1 failed.' in summary
+    assert 'Invalid link: https://www.reddit.com' in summary
+
+def test_failed_album_yields_no_images():
+    """
+    Test if an album whose page failed after the last retry yields none of the
+    images found before the failure, and is reported as failed.
+    """
+    page = b'{"hash":"jedEzFL","ext":".jpg"},{"hash":"lciC5G8","ext":".png"}'
+    truncated = (200, {'Content-Length': str(len(page) + 100), 'Connection': 'close'}, page)
+    with StubServer() as server:
+        server.script('/a/abcde?grid', [truncated, truncated])
+        pool = ConnectionPool(routes={'imgur.com': server.url('')})
+        batch = Batch(
+            ['https://imgur.com/a/abcde'], pool,
+            retry_policy=RetryPolicy(attempts=2, backoff=0)
+        )
+        assert list(batch.stream_images()) == []
+    assert [url for url, _ in batch.failed] == ['https://imgur.com/a/abcde']
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+
+
+import pytest
+from benchmarks.bench_download import run
+from benchmarks.bench_download import percentile
+from benchmarks.bench_write import run as run_write
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+def test_percentile():
+    """
+    Test if percentiles are picked from sorted values.
+    """
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 0.5) == 3
+    assert percentile(values, 0.99) == 5
+    assert percentile([], 0.5) == 0.0
+
+def test_benchmark_downloads_fake_albums():
+    """
+    Test if the benchmark resolves and downloads all images from the fake
+    imgur server.
+    """
+    results = run(albums=2, images=5, size=1000, latency=0.0, error_rate=0.0,
+                  workers=2, rate=1000)
+    assert results['downloaded'] == 10
+    assert results['failed'] == 0
+    assert results['mb_per_second'] > 0
+
+def test_write_benchmark():
+    """
+    Test if the write benchmark measures the previous copy and every chunk size.
+    """
+    results = run_write(size=100000, chunk_sizes=[4096, 65536], repeat=1)
+    assert [result['method'] for result in results] == [
+        'copyfileobj', 'writer 4K', 'writer 64K'
+    ]
+    assert all(result['cpu_seconds_per_gb'] >= 0 for result in results)
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+
+
+import pytest
+from imgur.imgur import Imgur
+from imgur.cache import AlbumCache
+from imgur.cache import AlbumCacheException
+from imgur.connection import ConnectionPool
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+ALBUM = b'{"hash":"jedEzFL","title":"","ext":".jpg"},{"hash":"lciC5G8","ext":".png"}'
+FILENAMES = [('jedEzFL', '.jpg'), ('lciC5G8', '.png')]
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def cache(tmpdir, clock):
+    return AlbumCache(str(tmpdir.join('cache', 'albums.sqlite')), ttl=60, clock=clock)
+
+def test_invalid_configuration(tmpdir):
+    """
+    Test if the cache raises exception for invalid size.
+    """
+    with pytest.raises(AlbumCacheException):
+        AlbumCache(str(tmpdir.join('albums.sqlite')), max_entries=0)
+
+def test_store_and_lookup(cache, clock):
+    """
+    Test if the stored entry is returned with validators, and expires.
+    """
+    assert cache.lookup('a/vTTHZ') == None
+    cache.store('a/vTTHZ', FILENAMES, {'ETag': '"abc"'})
+    entry = cache.lookup('a/vTTHZ')
+    assert entry['filenames'] == FILENAMES
+    assert cache.is_fresh(entry) == True
+    assert cache.conditional_headers(entry) == {'If-None-Match': '"abc"'}
+    clock.now += 61
+    assert cache.is_fresh(entry) == False
+
+def test_empty_album_is_not_stored(cache):
+    """
+    Test if a page without images is not cached.
+    """
+    cache.store('a/vTTHZ', [], {'ETag': '"abc"'})
+    assert cache.lookup('a/vTTHZ') == None
+    assert len(cache) == 0
+
+def test_least_recently_used_is_evicted(tmpdir, clock):
+    """
+    Test if the cache keeps at most max_entries recently used entries.
+    """
+    cache = AlbumCache(str(tmpdir.join('albums.sqlite')), max_entries=2, clock=clock)
+    cache.store('a/1', FILENAMES)
+    clock.now += 1
+    cache.store('a/2', FILENAMES)
+    clock.now += 1
+    cache.lookup('a/1')
+    clock.now += 1
+    cache.store('a/3', FILENAMES)
+    assert len(cache) == 2
+    assert cache.lookup('a/2') == None
+    assert cache.lookup('a/1') is not None
+
+def test_refresh_skips_lookup(tmpdir):
+    """
+    Test if the refreshing cache does not return entries.
+    """
+    path = str(tmpdir.join('albums.sqlite'))
+    AlbumCache(path).store('a/vTTHZ', FILENAMES)
+    assert AlbumCache(path, refresh=True).lookup('a/vTTHZ') == None
+    assert AlbumCache(path).lookup('a/vTTHZ') is not None
+
+def test_imgur_uses_cache(cache, clock):
+    """
+    Test if the album is fetched once, then taken from the cache, and then
+    revalidated with a conditional request when it expires.
+    """
+    with StubServer() as server:
+        server.script('/a/vTTHZ', [(200, {'ETag': '"abc"'}, ALBUM), (304, {}, b'')])
+        pool = ConnectionPool()
+        for _ in range(2):
+            imgur = Imgur('http://imgur.com/a/vTTHZ', pool, cache)
+            imgur.parse_and_prepare_images(server.url('/a/vTTHZ'))
+            assert imgur.number_of_images() == 2
+        assert server.hits('/a/vTTHZ') == 1
+
+        clock.now += 61
+        imgur = Imgur('http://imgur.com/a/vTTHZ', pool, cache)
+        imgur.parse_and_prepare_images(server.url('/a/vTTHZ'))
+        assert imgur.number_of_images() == 2
+        assert server.headers('/a/vTTHZ')[1]['If-None-Match'] == '"abc"'
+        assert cache.is_fresh(cache.lookup('a/vTTHZ')) == True
+
+def test_incomplete_page_is_not_cached(cache):
+    """
+    Test if a page whose connection was closed early is an error, and is not
+    cached.
+    """
+    truncated = (200, {'Content-Length': str(len(ALBUM) + 5000), 'Connection': 'close'}, ALBUM)
+    with StubServer() as server:
+        server.script('/a/vTTHZ', [truncated])
+        imgur = Imgur('http://imgur.com/a/vTTHZ', ConnectionPool(), cache)
+        imgur.parse_and_prepare_images(server.url('/a/vTTHZ'))
+    assert imgur.error is not None
+    assert cache.lookup('a/vTTHZ') == None
@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+
+
+import asyncio
+import hashlib
+import pytest
+from collections import deque
+from imgur.imgur import ImgurImage
+from imgur.checksum import Checksum
+from imgur.checksum import ChecksumManifest
+from imgur.checksum import ChecksumException
+from imgur.checksum import verify
+from imgur.downloader import Downloader
+from imgur.store import ObjectStore
+from imgur.ratelimit import RateLimiter
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+BODY = b'jedEzFL' * 1000
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def server():
+    with StubServer() as server:
+        server.script('/jedEzFL.jpg', [(200, {'ETag': '"abc"'}, BODY)])
+        server.script('/lciC5G8.png', [(200, {}, b'lciC5G8')])
+        yield server
+
+@pytest.fixture
+def images(server):
+    return deque([
+        ImgurImage(server.url('/jedEzFL.jpg'), 'jedEzFL', '.jpg', 1, 1, 'album'),
+        ImgurImage(server.url('/lciC5G8.png'), 'lciC5G8', '.png', 2, 1, 'album'),
+    ])
+
+def download(images, tmpdir, checksums=('sha256', 'blake2b')):
+    return Downloader(
+        images, str(tmpdir), rate_limiter=RateLimiter(rate=1000, burst=10),
+        checksums=checksums
+    )
+
+
+def test_incremental_checksum():
+    """
+    Test if digests of chunks are the digests of the whole stream.
+    """
+    checksum = Checksum(['sha256', 'blake2b'])
+    for start in range(0, len(BODY), 999):
+        checksum.update(BODY[start:start + 999])
+    assert checksum.size == len(BODY)
+    assert checksum.hexdigests() == {
+        'sha256': sha256(BODY), 'blake2b': hashlib.blake2b(BODY).hexdigest()
+    }
+
+def test_unknown_algorithm():
+    """
+    Test if an unknown digest algorithm is rejected.
+    """
+    with pytest.raises(ChecksumException):
+        Checksum(['nohash'])
+
+def test_update_from_file(tmpdir):
+    """
+    Test if the beginning of a file is hashed, e.g. of a resumed download.
+    """
+    path = tmpdir.join('a.jpg.part')
+    path.write_binary(BODY)
+    checksum = Checksum()
+    checksum.update_from_file(str(path), 100)
+    assert checksum.hexdigests()['sha256'] == sha256(BODY[:100])
+
+def test_checksums_are_recorded(images, tmpdir):
+    """
+    Test if the album directory gets a manifest with the imgur hash, size,
+    digests and ETag of every file.
+    """
+    images = list(images)
+    download(deque(images), tmpdir).download()
+    manifest = ChecksumManifest(str(tmpdir.join('album')))
+    manifest.load()
+    entry = manifest.get('1-jedEzFL.jpg')
+    assert (entry['hash'], entry['size'], entry['sha256'], entry['etag']) == (
+        'jedEzFL', len(BODY), sha256(BODY), '"abc"'
+    )
+    assert manifest.get('2-lciC5G8.png')['sha256'] == sha256(b'lciC5G8')
+    assert images[0]['checksum'] == sha256(BODY)
+
+def test_async_checksums_are_recorded(images, tmpdir):
+    """
+    Test if the coroutine downloader records checksums too.
+    """
+    asyncio.run(download(images, tmpdir, ('sha256',)).adownload())
+    manifest = ChecksumManifest(str(tmpdir.join('album')))
+    manifest.load()
+    assert manifest.get('1-jedEzFL.jpg')['sha256'] == sha256(BODY)
+
+def test_verify(images, tmpdir):
+    """
+    Test if verification finds intact, corrupt and missing files.
+    """
+    images.append(
+        ImgurImage(images[0].url, 'jedEzFL', '.jpg', 3, 1, 'other')
+    )
+    download(images, tmpdir).download()
+    assert verify(str(tmpdir), workers=2).verified == 3
+
+    tmpdir.join('album', '1-jedEzFL.jpg').write_binary(BODY[:-1] + b'!')
+    tmpdir.join('other', '3-jedEzFL.jpg').remove()
+    report = verify(str(tmpdir), workers=2)
+    assert (report.verified, report.corrupt, report.missing) == (
+        1, ['album/1-jedEzFL.jpg'], ['other/3-jedEzFL.jpg']
+    )
+    assert report.is_valid() == False
+    assert 'Corrupt: album/1-jedEzFL.jpg' in report.format_summary()
+
+def test_linked_images_are_recorded(server, tmpdir):
+    """
+    Test if an image linked from the object store gets its checksum entry, from
+    the digest of the object.
+    """
+    store = ObjectStore(str(tmpdir.join('store')))
+    for album in ['first', 'second']:
+        images = deque([
+            ImgurImage(server.url('/jedEzFL.jpg'), 'jedEzFL', '.jpg', 1, 1, album)
+        ])
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000),
+            store=store, checksums=('sha256', 'blake2b')
+        ).download()
+    assert server.hits('/jedEzFL.jpg') == 1
+    manifest = ChecksumManifest(str(tmpdir.join('second')))
+    manifest.load()
+    entry = manifest.get('1-jedEzFL.jpg')
+    assert (entry['hash'], entry['size'], entry['sha256']) == (
+        'jedEzFL', len(BODY), sha256(BODY)
+    )
+    assert verify(str(tmpdir.join('second'))).verified == 1
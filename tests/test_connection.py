@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+
+
+import socket
+import pytest
+from threading import Thread
+from urllib.error import HTTPError
+from urllib.error import URLError
+from imgur.connection import ConnectionPool
+from imgur.connection import ConnectionPoolException
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+@pytest.fixture
+def server():
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, {}, b'a' * 1000)])
+        server.script('/b.jpg', [(200, {}, b'b' * 1000)])
+        server.script('/moved', [(302, {'Location': '/b.jpg'}, b'')])
+        server.script('/missing', [(404, {}, b'not found')])
+        yield server
+
+def test_invalid_configuration():
+    """
+    Test if the pool raises exception for invalid size.
+    """
+    with pytest.raises(ConnectionPoolException):
+        ConnectionPool(size=0)
+
+def test_connection_is_reused(server):
+    """
+    Test if consecutive requests to the same host use one connection.
+    """
+    pool = ConnectionPool()
+    for path in ['/a.jpg', '/b.jpg', '/a.jpg']:
+        with pool.request(server.url(path)) as response:
+            assert len(response.read()) == 1000
+    assert len(server.connections) == 1
+    pool.close()
+
+def test_idle_connection_expires(server):
+    """
+    Test if connections idle for longer than idle timeout are not reused.
+    """
+    pool = ConnectionPool(idle_timeout=0)
+    for path in ['/a.jpg', '/b.jpg']:
+        with pool.request(server.url(path)) as response:
+            response.read()
+    assert len(server.connections) == 2
+
+def test_unread_response_is_not_reused(server):
+    """
+    Test if the connection is dropped when the body was not read completely.
+    """
+    pool = ConnectionPool()
+    with pool.request(server.url('/a.jpg')) as response:
+        response.read(10)
+    with pool.request(server.url('/a.jpg')) as response:
+        response.read()
+    assert len(server.connections) == 2
+
+def test_redirect_is_followed(server):
+    """
+    Test if the pool follows redirects.
+    """
+    pool = ConnectionPool()
+    with pool.request(server.url('/moved')) as response:
+        assert response.read() == b'b' * 1000
+        assert response.geturl() == server.url('/b.jpg')
+
+def test_http_error(server):
+    """
+    Test if 4xx status code raises HTTPError, like urlopen does.
+    """
+    pool = ConnectionPool()
+    with pytest.raises(HTTPError) as error:
+        pool.request(server.url('/missing'))
+    assert error.value.code == 404
+
+def test_url_error():
+    """
+    Test if unsupported url raises URLError.
+    """
+    with pytest.raises(URLError):
+        ConnectionPool().request('ftp://imgur.com/a.jpg')
+
+def test_routes(server):
+    """
+    Test if the requests for a routed host are sent to the given server.
+    """
+    pool = ConnectionPool(routes={'i.imgur.com': server.url('')})
+    with pool.request('https://i.imgur.com/a.jpg') as response:
+        assert response.read() == b'a' * 1000
+
+def test_ipv6_address():
+    """
+    Test if a host which resolves to an IPv6 address is connected to.
+    """
+    try:
+        listener = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        listener.bind(('::1', 0))
+    except OSError:
+        pytest.skip('IPv6 is not available.')
+    listener.listen(1)
+    def respond():
+        connection, _ = listener.accept()
+        with connection:
+            connection.recv(4096)
+            connection.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+    thread = Thread(target=respond, daemon=True)
+    thread.start()
+    try:
+        url = 'http://[::1]:{}/a.jpg'.format(listener.getsockname()[1])
+        with ConnectionPool().request(url) as response:
+            assert response.read() == b'ok'
+    finally:
+        thread.join(5)
+        listener.close()
@@ -1,4 +1,337 @@
 #!/usr/bin/python3
 
 
+import os
+import asyncio
 import pytest
+from threading import Thread
+from collections import deque
+from imgur.downloader import Downloader
+from imgur.downloader import DownloaderException
+from imgur.downloader import IncompleteDownloadException
+from imgur.downloader import DIR_FD_FUNCTIONS
+from imgur.ratelimit import RateLimiter
+from imgur.retry import RetryPolicy
+from imgur.writer import StreamWriter
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class RecordingDownloader(Downloader):
+    """
+    Downloader that writes the url into the file instead of fetching it.
+    """
+
+    def write_file_to_filesystem(self, url, filename, headers=None):
+        with self.open_file(filename, 'w') as f:
+            f.write(url)
+
+
+@pytest.fixture
+def images():
+    return deque([
+        {'url' : 'https://i.imgur.com/jedEzFL.jpg', 'filename' : '1-jedEzFL.jpg',},
+        {'url' : 'https://i.imgur.com/lciC5G8.jpg', 'filename' : '2-lciC5G8.jpg',},
+        {'url' : 'https://i.imgur.com/6O1hqeY.jpg', 'filename' : '3-6O1hqeY.jpg',},
+    ])
+
+def test_invalid_destination(images):
+    """
+    Test if the class raises exception for nonexistent directory.
+    """
+    with pytest.raises(DownloaderException):
+        Downloader(images, '/nonexistent/directory/for/imgur')
+
+def test_invalid_number_of_workers(images, tmpdir):
+    """
+    Test if the class raises exception for invalid number of workers.
+    """
+    with pytest.raises(DownloaderException):
+        Downloader(images, str(tmpdir), workers=0)
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_download_keeps_filenames(images, tmpdir, workers):
+    """
+    Test if all images are written under their numerated filenames, regardless
+    of the number of workers.
+    """
+    downloader = RecordingDownloader(
+        images, str(tmpdir), workers=workers, rate_limiter=RateLimiter(rate=1000)
+    )
+    downloader.download()
+    assert sorted(f.basename for f in tmpdir.listdir()) == [
+        '1-jedEzFL.jpg', '2-lciC5G8.jpg', '3-6O1hqeY.jpg',
+    ]
+    assert tmpdir.join('2-lciC5G8.jpg').read() == 'https://i.imgur.com/lciC5G8.jpg'
+    assert downloader.currently_at == 3
+
+class DeniedDownloader(RecordingDownloader):
+    """
+    Downloader which is not allowed to write the second image.
+    """
+
+    def make_parent_directory(self, filename):
+        if filename.startswith('2-'):
+            raise PermissionError('Permission denied: {}'.format(filename))
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_unexpected_error_is_raised(images, tmpdir, workers):
+    """
+    Test if an error which is not a failed download is raised, regardless of
+    the number of workers.
+    """
+    downloader = DeniedDownloader(
+        images, str(tmpdir), workers=workers, rate_limiter=RateLimiter(rate=1000)
+    )
+    with pytest.raises(PermissionError):
+        downloader.download()
+
+def test_async_unexpected_error_is_raised(images, tmpdir):
+    """
+    Test if the coroutine downloader raises an unexpected error, after the other
+    downloads are finished.
+    """
+    class AsyncDeniedDownloader(DeniedDownloader):
+        async def afetch_image(self, session, image, headers):
+            await asyncio.sleep(0.01)
+            self.write_file_to_filesystem(image['url'], image['filename'])
+    downloader = AsyncDeniedDownloader(
+        images, str(tmpdir), workers=3, rate_limiter=RateLimiter(rate=1000)
+    )
+    with pytest.raises(PermissionError):
+        asyncio.run(downloader.adownload(session=object()))
+    assert sorted(f.basename for f in tmpdir.listdir()) == [
+        '1-jedEzFL.jpg', '3-6O1hqeY.jpg',
+    ]
+
+def ranged(content):
+    """
+    Return a stub response which supports Range requests for the content.
+    """
+    def respond(handler):
+        requested = handler.headers.get('Range')
+        if not requested:
+            return 200, {}, content
+        start = int(requested[len('bytes='):-1])
+        if start >= len(content):
+            return 416, {'Content-Range': 'bytes */{}'.format(len(content))}, b''
+        content_range = 'bytes {}-{}/{}'.format(start, len(content) - 1, len(content))
+        return 206, {'Content-Range': content_range}, content[start:]
+    return respond
+
+@pytest.mark.parametrize('resume', [False, True])
+def test_short_body_is_incomplete(tmpdir, resume):
+    """
+    Test if a body shorter than its Content-Length fails the download, and is
+    never renamed into place.
+    """
+    short = (200, {'Content-Length': '100', 'Connection': 'close'}, b'image')
+    with StubServer() as server:
+        server.script('/a.jpg', [short])
+        images = deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        summary = Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), resume=resume,
+            retry_policy=RetryPolicy(attempts=1), checksums=('sha256',)
+        ).download()
+    assert summary['failed'] == 1
+    assert not tmpdir.join('1-a.jpg').exists()
+    assert not tmpdir.join('.crawlgur-checksums.json').exists()
+
+def test_resume_partial_download(tmpdir):
+    """
+    Test if the partial file is continued with a Range request and renamed.
+    """
+    content = bytes(range(256)) * 8
+    tmpdir.join('1-a.jpg.part').write_binary(content[:1000])
+    with StubServer() as server:
+        server.script('/a.jpg', [ranged(content)])
+        images = deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), resume=True
+        ).download()
+        assert server.headers('/a.jpg')[0]['Range'] == 'bytes=1000-'
+    assert tmpdir.join('1-a.jpg').read_binary() == content
+    assert not tmpdir.join('1-a.jpg.part').exists()
+
+def test_resume_unexpected_range(tmpdir):
+    """
+    Test if a partial response which does not continue the partial file is not
+    written, and the whole file is fetched again.
+    """
+    content = bytes(range(256)) * 8
+    tmpdir.join('1-a.jpg.part').write_binary(content[:1000])
+    fragment = (206, {'Content-Range': 'bytes 500-2047/2048'}, content[500:])
+    with StubServer() as server:
+        server.script('/a.jpg', [fragment, ranged(content)])
+        images = deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), resume=True,
+            retry_policy=RetryPolicy(attempts=2, backoff=0)
+        ).download()
+        assert 'Range' not in server.headers('/a.jpg')[1]
+    assert tmpdir.join('1-a.jpg').read_binary() == content
+
+def test_resume_without_range_support(tmpdir):
+    """
+    Test if the partial file is overwritten when the server ignores Range.
+    """
+    tmpdir.join('1-a.jpg.part').write_binary(b'garbage')
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, {}, b'image')])
+        images = deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), resume=True
+        ).download()
+    assert tmpdir.join('1-a.jpg').read_binary() == b'image'
+
+def test_resume_complete_partial_download(tmpdir):
+    """
+    Test if the partial file which is already complete is only renamed.
+    """
+    tmpdir.join('1-a.jpg.part').write_binary(b'image')
+    with StubServer() as server:
+        server.script('/a.jpg', [ranged(b'image')])
+        images = deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), resume=True
+        ).download()
+    assert tmpdir.join('1-a.jpg').read_binary() == b'image'
+
+def test_resume_skips_finished_files(tmpdir):
+    """
+    Test if the files which were already downloaded are not requested again.
+    """
+    tmpdir.join('1-a.jpg').write_binary(b'image')
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, {}, b'other')])
+        images = deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), resume=True
+        ).download()
+        assert server.hits('/a.jpg') == 0
+    assert tmpdir.join('1-a.jpg').read_binary() == b'image'
+
+def test_sync_uses_conditional_requests(tmpdir):
+    """
+    Test if the sync mode records validators, skips files from the manifest,
+    and sends conditional requests for files which are not in the manifest.
+    """
+    etag = {'ETag': '"abc"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, etag, b'image'), (304, {}, b'')])
+        images = lambda: deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        limiter = RateLimiter(rate=1000)
+
+        Downloader(images(), str(tmpdir), rate_limiter=limiter, sync=True).download()
+        Downloader(images(), str(tmpdir), rate_limiter=limiter, sync=True).download()
+        assert server.hits('/a.jpg') == 1
+
+        tmpdir.join('.crawlgur-manifest.json').remove()
+        Downloader(images(), str(tmpdir), rate_limiter=limiter, sync=True).download()
+        assert server.hits('/a.jpg') == 2
+        assert 'If-Modified-Since' in server.headers('/a.jpg')[1]
+    assert tmpdir.join('1-a.jpg').read_binary() == b'image'
+
+
+def test_sync_not_modified_is_skipped(tmpdir):
+    """
+    Test if a file confirmed by 304 Not Modified is counted as skipped.
+    """
+    tmpdir.join('1-a.jpg').write_binary(b'image')
+    with StubServer() as server:
+        server.script('/a.jpg', [(304, {'ETag': '"abc"'}, b'')])
+        images = deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        summary = Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), sync=True
+        ).download()
+        assert 'If-Modified-Since' in server.headers('/a.jpg')[0]
+    assert summary == {'downloaded': 0, 'skipped': 1, 'failed': 0}
+
+def test_sync_refetches_damaged_file(tmpdir):
+    """
+    Test if a file whose size does not match the manifest is requested without
+    conditions, and replaced.
+    """
+    etag = {'ETag': '"abc"'}
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, etag, b'image'), (200, etag, b'image')])
+        images = lambda: deque([{'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'}])
+        limiter = RateLimiter(rate=1000)
+        Downloader(images(), str(tmpdir), rate_limiter=limiter, sync=True).download()
+        tmpdir.join('1-a.jpg').write_binary(b'ima')
+        summary = Downloader(images(), str(tmpdir), rate_limiter=limiter, sync=True).download()
+        assert 'If-None-Match' not in server.headers('/a.jpg')[1]
+    assert summary['downloaded'] == 1
+    assert tmpdir.join('1-a.jpg').read_binary() == b'image'
+
+def test_download_keeps_current_directory(images, tmpdir):
+    """
+    Test if downloaders of different directories run at the same time, without
+    changing the current directory of the process.
+    """
+    cwd = os.getcwd()
+    directories = [tmpdir.mkdir('first'), tmpdir.mkdir('second')]
+    threads = [Thread(target=RecordingDownloader(
+        deque(images), str(directory), workers=2, rate_limiter=RateLimiter(rate=1000)
+    ).download) for directory in directories]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert os.getcwd() == cwd
+    for directory in directories:
+        assert len(directory.listdir()) == 3
+
+def test_failed_download_leaves_no_file(tmpdir):
+    """
+    Test if the partial file of a failed download is removed, and the file
+    itself is never created.
+    """
+    class BrokenWriter(StreamWriter):
+        def copy(self, response, f, length=None, progress=None, checksum=None):
+            super().copy(response, f, length, progress, checksum)
+            raise IncompleteDownloadException('Connection closed.')
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, {}, b'image')])
+        images = deque([{'url' : server.url('/a.jpg'), 'filename' : 'album/1-a.jpg'}])
+        summary = Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000),
+            retry_policy=RetryPolicy(attempts=1), writer=BrokenWriter()
+        ).download()
+    assert summary['failed'] == 1
+    assert tmpdir.join('album').listdir() == []
+
+def test_directories_are_synced_once(tmpdir, monkeypatch):
+    """
+    Test if every directory which got new files is flushed once, at the end of
+    the run.
+    """
+    images = deque([{
+        'url' : 'https://i.imgur.com/{}.jpg'.format(index),
+        'filename' : os.path.join(album, '{}.jpg'.format(index)),
+    } for album in ('a', 'b') for index in range(3)])
+    class RenamingDownloader(RecordingDownloader):
+        def write_file_to_filesystem(self, url, filename, headers=None):
+            super().write_file_to_filesystem(url, filename + '.part', headers)
+            self.replace_file(filename + '.part', filename)
+    synced = []
+    fsync = os.fsync
+    def recording_fsync(descriptor):
+        synced.append(os.fstat(descriptor).st_ino)
+        fsync(descriptor)
+    monkeypatch.setattr(os, 'fsync', recording_fsync)
+    RenamingDownloader(
+        images, str(tmpdir), workers=2, rate_limiter=RateLimiter(rate=1000)
+    ).download()
+    if DIR_FD_FUNCTIONS <= os.supports_dir_fd:
+        assert sorted(synced) == sorted(
+            os.stat(str(tmpdir.join(name))).st_ino for name in ('', 'a', 'b')
+        )
@@ -5,6 +5,10 @@ import pytest
 from collections import deque
 from imgur.imgur import Imgur
 from imgur.imgur import ImgurException
+from imgur.imgur import ImgurUrl
+from imgur.imgur import ImgurImage
+from imgur.imgur import classify_url
+from imgur.imgur import classify_urls
 
 
 __author__ = 'petarGitNik'
@@ -284,3 +288,86 @@ def test_sanitize_gifv(single_image_i):
     result = 'http://i.imgur.com/jedEzFL.gif'
     assert single_image_i.sanitize_gifv(url_1) == result
     assert single_image_i.sanitize_gifv(url_2) == result
+
+def test_get_hash(single_image_i, single_image_without_extension, album_grid,
+                  album_gallery):
+    """
+    Test if the hash of an image or an album is extracted from the url.
+    """
+    assert single_image_i.get_hash() == 'jedEzFL'
+    assert single_image_without_extension.get_hash() == 'jedEzFL'
+    assert album_grid.get_hash() == 'vTTHZ'
+    assert album_gallery.get_hash() == 'vTTHZ'
+
+def test_stream_images(single_image_i):
+    """
+    Test if the images are yielded numerated, and removed from the deque.
+    """
+    images = list(single_image_i.stream_images())
+    assert images == [{'url' : 'http://i.imgur.com/jedEzFL.jpg', 'filename' : '1-jedEzFL.jpg'}]
+    assert single_image_i.number_of_images() == 0
+
+def test_classify_url():
+    """
+    Test if the links are parsed into records.
+    """
+    assert classify_url('http://imgur.com/a/vTTHZ?grid') == ImgurUrl('album', 'vTTHZ', None, True, False)
+    assert classify_url('http://imgur.com/gallery/vTTHZ').kind == 'album'
+    assert classify_url('http://i.imgur.com/jedEzFL.jpg') == ImgurUrl('image', 'jedEzFL', '.jpg', False, False)
+    assert classify_url('http://i.imgur.com/jedEzFL.gifv').gifv == True
+    assert classify_url('https://www.reddit.com/imgur.com') == None
+
+def test_classify_urls():
+    """
+    Test if many links are classified at once, in order.
+    """
+    records = list(classify_urls(['http://imgur.com/jedEzFL', 'https://www.reddit.com']))
+    assert records == [ImgurUrl('image', 'jedEzFL', None, False, False), None]
+
+def test_longest_extension_is_found(single_image_i):
+    """
+    Test if .apng is not mistaken for .png.
+    """
+    assert single_image_i.contains_extension('http://i.imgur.com/jedEzFL.apng') == '.apng'
+    assert single_image_i.get_image_filename('http://i.imgur.com/jedEzFL.apng?1') == 'jedEzFL.apng'
+
+def test_image_record():
+    """
+    Test if the image record derives its filename, and can be used as a
+    dictionary.
+    """
+    image = ImgurImage('https://i.imgur.com/jedEzFL.jpg', 'jedEzFL', '.jpg')
+    assert image['filename'] == 'jedEzFL.jpg'
+    image.numerate(7, 3)
+    assert image['filename'] == '007-jedEzFL.jpg'
+    image.directory = 'vTTHZ'
+    assert image.filename == 'vTTHZ/007-jedEzFL.jpg'
+    assert image.get('url') == 'https://i.imgur.com/jedEzFL.jpg'
+    assert image.get('missing', 1) == 1
+    with pytest.raises(KeyError):
+        image['missing']
+    image['filename'] = 'other.jpg'
+    assert image == {'url' : 'https://i.imgur.com/jedEzFL.jpg', 'filename' : 'other.jpg'}
+
+def test_image_record_has_no_dict(single_image_i):
+    """
+    Test if the packed images are compact records.
+    """
+    single_image_i.prepare_images()
+    image = single_image_i.images[0]
+    assert isinstance(image, ImgurImage)
+    assert not hasattr(image, '__dict__')
+
+def test_image_record_derives_url():
+    """
+    Test if the image record stores the url only when it can not be derived
+    from the hash and the extension, and if the extensions are shared.
+    """
+    image = ImgurImage('https://i.imgur.com/jedEzFL.jpg', 'jedEzFL', '.jpg')
+    assert image.explicit_url == None
+    assert image.url == 'https://i.imgur.com/jedEzFL.jpg'
+    image = ImgurImage('https://i.imgur.com/jedEzFL.jpg?1', 'jedEzFL', '.jpg')
+    assert image.explicit_url == 'https://i.imgur.com/jedEzFL.jpg?1'
+    assert image['url'] == 'https://i.imgur.com/jedEzFL.jpg?1'
+    other = ImgurImage('https://i.imgur.com/lciC5G8.jpg', 'lciC5G8', ''.join(['.', 'jpg']))
+    assert other.extension is image.extension
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+
+
+import os
+import pytest
+from imgur.journal import Journal
+from imgur.journal import JournalException
+from imgur.batch import Batch
+from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from imgur.connection import ConnectionPool
+from benchmarks.fakeimgur import FakeImgur
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+IMAGES = [
+    {'url': 'https://i.imgur.com/jedEzFL.jpg', 'filename': 'album/1-jedEzFL.jpg'},
+    {'url': 'https://i.imgur.com/lciC5G8.jpg', 'filename': 'album/2-lciC5G8.jpg'},
+]
+
+
+@pytest.fixture
+def journal(tmpdir):
+    return Journal(str(tmpdir.join('journal.sqlite')))
+
+def test_broken_journal(tmpdir):
+    """
+    Test if the journal raises exception if the file is not a database.
+    """
+    tmpdir.join('journal.sqlite').write('not a database' * 100)
+    with pytest.raises(JournalException):
+        Journal(str(tmpdir.join('journal.sqlite')))
+
+def test_record_album(journal):
+    """
+    Test if recorded images are pending, in the album order.
+    """
+    assert journal.album_count('album') == None
+    journal.record_album('https://imgur.com/a/album', 'album', IMAGES)
+    assert journal.album_count('album') == 2
+    assert [row['filename'] for row in journal.unfinished_images('album')] == [
+        'album/1-jedEzFL.jpg', 'album/2-lciC5G8.jpg'
+    ]
+    assert journal.states() == {'pending': 2}
+
+def test_states_and_attempts(journal):
+    """
+    Test if attempts are counted, and if done images are not unfinished.
+    """
+    journal.record_album('https://imgur.com/a/album', 'album', IMAGES)
+    journal.start('album/1-jedEzFL.jpg')
+    journal.finish('album/1-jedEzFL.jpg', 'failed')
+    journal.start('album/1-jedEzFL.jpg')
+    journal.finish('album/1-jedEzFL.jpg', 'downloaded')
+    journal.start('album/2-lciC5G8.jpg')
+    assert journal.get('album/1-jedEzFL.jpg') == {'state': 'done', 'attempts': 2}
+    assert journal.states() == {'done': 1, 'active': 1}
+    assert [row['filename'] for row in journal.unfinished_images('album')] == [
+        'album/2-lciC5G8.jpg'
+    ]
+
+def test_recording_again_keeps_state(journal):
+    """
+    Test if an album resolved again does not reset the state of its images.
+    """
+    journal.record_album('https://imgur.com/a/album', 'album', IMAGES)
+    journal.finish('album/1-jedEzFL.jpg', 'skipped')
+    journal.record_album('https://imgur.com/a/album', 'album', IMAGES)
+    assert journal.get('album/1-jedEzFL.jpg')['state'] == 'done'
+
+def test_interrupted_batch_resumes(tmpdir):
+    """
+    Test if a repeated batch neither resolves albums again nor downloads the
+    images which were done before the interruption.
+    """
+    destination = tmpdir.mkdir('download')
+    path = str(destination.join('.crawlgur-journal.sqlite'))
+    urls = ['https://imgur.com/a/first', 'https://imgur.com/a/second']
+
+    with FakeImgur({'first': 3, 'second': 2}, image_size=100) as server:
+        pool = ConnectionPool(routes=server.routes())
+        limiter = RateLimiter(rate=1000, burst=100)
+
+        batch = Batch(urls, pool, journal=Journal(path))
+        images = batch.stream_images()
+        partial = [next(images) for _ in range(2)]
+        Downloader(partial, str(destination), rate_limiter=limiter, pool=pool,
+                   journal=batch.journal).download()
+        requests = server.requests
+
+        batch = Batch(urls, pool, journal=Journal(path))
+        summary = Downloader(batch.stream_images(), str(destination),
+                             rate_limiter=limiter, pool=pool,
+                             journal=batch.journal).download()
+        assert summary == {'downloaded': 3, 'skipped': 0, 'failed': 0}
+        # One album page was not fetched before, and three images were left.
+        assert server.requests - requests == 1 + 3
+    assert batch.finished == 2
+    assert batch.journal.states() == {'done': 5}
+    assert sorted(os.listdir(str(destination.join('first')))) == [
+        '1-firsti0.jpg', '2-firsti1.jpg', '3-firsti2.jpg'
+    ]
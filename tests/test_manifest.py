@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+
+
+import pytest
+from imgur.manifest import Manifest
+from imgur.manifest import ManifestException
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+URL = 'https://i.imgur.com/jedEzFL.jpg'
+
+
+@pytest.fixture
+def manifest(tmpdir):
+    tmpdir.join('1-jedEzFL.jpg').write_binary(b'image')
+    return Manifest(str(tmpdir))
+
+def test_save_and_load(manifest, tmpdir):
+    """
+    Test if the recorded entries survive saving and loading.
+    """
+    manifest.record('1-jedEzFL.jpg', URL, {'ETag': '"abc"'})
+    manifest.save()
+    loaded = Manifest(str(tmpdir))
+    loaded.load()
+    assert loaded.get('1-jedEzFL.jpg') == {
+        'url': URL, 'size': 5, 'etag': '"abc"', 'last_modified': None,
+    }
+
+def test_broken_manifest(tmpdir):
+    """
+    Test if the manifest raises exception if the file is not valid JSON.
+    """
+    tmpdir.join('.crawlgur-manifest.json').write('{')
+    with pytest.raises(ManifestException):
+        Manifest(str(tmpdir)).load()
+
+def test_is_current(manifest, tmpdir):
+    """
+    Test if the file is current only if its size matches the manifest.
+    """
+    assert manifest.is_current('1-jedEzFL.jpg') == False
+    manifest.record('1-jedEzFL.jpg', URL)
+    assert manifest.is_current('1-jedEzFL.jpg') == True
+    tmpdir.join('1-jedEzFL.jpg').write_binary(b'imag')
+    assert manifest.is_current('1-jedEzFL.jpg') == False
+
+def test_conditional_headers(manifest):
+    """
+    Test if the validators from the manifest are used for conditional requests.
+    """
+    assert manifest.conditional_headers('2-missing.jpg') == {}
+    assert 'If-Modified-Since' in manifest.conditional_headers('1-jedEzFL.jpg')
+    manifest.record('1-jedEzFL.jpg', URL, {'ETag': '"abc"'})
+    assert manifest.conditional_headers('1-jedEzFL.jpg')['If-None-Match'] == '"abc"'
+
+def test_record_keeps_validators(manifest):
+    """
+    Test if the validators are kept when the new response does not have them.
+    """
+    manifest.record('1-jedEzFL.jpg', URL, {'ETag': '"abc"'})
+    manifest.record('1-jedEzFL.jpg', URL, {})
+    assert manifest.get('1-jedEzFL.jpg')['etag'] == '"abc"'
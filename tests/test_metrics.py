@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+
+
+import io
+import json
+import pytest
+from collections import deque
+from urllib.request import urlopen
+from imgur.imgur import Imgur
+from imgur.metrics import Metrics
+from imgur.metrics import JsonLinesExporter
+from imgur.metrics import PrometheusExporter
+from imgur.metrics import record
+from imgur.metrics import annotate
+from imgur.retry import RetryPolicy
+from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from imgur.connection import ConnectionPool
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+PAGE = b'<script>{"hash":"jedEzFL","ext":".jpg"},{"hash":"lciC5G8","ext":".png"}</script>'
+
+
+@pytest.fixture
+def traces():
+    return []
+
+@pytest.fixture
+def metrics(traces):
+    return Metrics([traces.append])
+
+def test_trace_is_emitted(metrics, traces):
+    """
+    Test if recorded and annotated values end up in the emitted trace.
+    """
+    with metrics.trace('image', url='a'):
+        record('bytes', 10)
+        record('bytes', 5)
+        annotate('status', 200)
+    record('bytes', 1)
+    assert len(traces) == 1
+    assert traces[0]['bytes'] == 15
+    assert traces[0]['status'] == 200
+    assert traces[0]['url'] == 'a'
+    assert traces[0]['duration'] >= 0
+
+def test_trace_without_hooks():
+    """
+    Test if nothing is traced when there are no hooks.
+    """
+    with Metrics().trace('image') as trace:
+        record('bytes', 10)
+    assert trace is None
+
+def test_download_is_traced(metrics, traces, tmpdir):
+    """
+    Test if image traces contain the status, the size, the retries and the
+    timings of the request phases.
+    """
+    with StubServer() as server:
+        server.script('/a.jpg', [(503, {}, b''), (200, {}, b'a' * 1000)])
+        images = deque([{'url': server.url('/a.jpg'), 'filename': 'a.jpg'}])
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000, burst=10),
+            retry_policy=RetryPolicy(backoff=0), metrics=metrics
+        ).download()
+    trace = traces[0]
+    assert (trace['status'], trace['outcome'], trace['bytes'], trace['retries']) == (
+        200, 'downloaded', 1000, 1
+    )
+    for phase in ['dns', 'connect', 'ttfb', 'transfer']:
+        assert trace[phase] >= 0
+
+def test_album_is_traced(metrics, traces):
+    """
+    Test if resolution of an album is traced with the number of images.
+    """
+    with StubServer() as server:
+        server.script('/a/album?grid', [(200, {}, PAGE)])
+        pool = ConnectionPool(routes={'imgur.com': server.url('')})
+        Imgur('https://imgur.com/a/album', pool, metrics=metrics).prepare_images()
+    assert (traces[0]['kind'], traces[0]['images'], traces[0]['status']) == (
+        'album', 2, 200
+    )
+
+def test_json_lines_exporter(metrics):
+    """
+    Test if every trace is written as a line of JSON.
+    """
+    stream = io.StringIO()
+    metrics.add_hook(JsonLinesExporter(stream))
+    for url in ['a', 'b']:
+        with metrics.trace('image', url=url):
+            pass
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)['url'] for line in lines] == ['a', 'b']
+
+def test_prometheus_exporter():
+    """
+    Test if traces are aggregated into counters and histograms.
+    """
+    exporter = PrometheusExporter(buckets=[0.1, 1])
+    exporter({'kind': 'image', 'outcome': 'downloaded', 'bytes': 100,
+              'ttfb': 0.5, 'duration': 0.6})
+    exporter({'kind': 'image', 'outcome': 'failed', 'retries': 2, 'duration': 0.05})
+    exporter({'kind': 'album', 'duration': 2})
+    lines = exporter.render().splitlines()
+    for line in [
+        'crawlgur_images_total{outcome="downloaded"} 1',
+        'crawlgur_images_total{outcome="failed"} 1',
+        'crawlgur_bytes_total 100',
+        'crawlgur_retries_total 2',
+        'crawlgur_image_phase_seconds_total{phase="ttfb"} 0.5',
+        'crawlgur_image_duration_seconds_bucket{le="0.1"} 1',
+        'crawlgur_image_duration_seconds_bucket{le="1"} 2',
+        'crawlgur_image_duration_seconds_count 2',
+        'crawlgur_albums_total{outcome="resolved"} 1',
+        'crawlgur_album_resolution_seconds_bucket{le="+Inf"} 1',
+    ]:
+        assert line in lines
+
+def test_prometheus_endpoint():
+    """
+    Test if the metrics are served over HTTP.
+    """
+    exporter = PrometheusExporter()
+    host, port = exporter.serve()
+    try:
+        with urlopen('http://{}:{}/metrics'.format(host, port)) as response:
+            body = response.read().decode('utf-8')
+    finally:
+        exporter.close()
+    assert 'crawlgur_bytes_total 0' in body
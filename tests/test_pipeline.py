@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+
+
+import pytest
+from imgur.pipeline import Pipeline
+from imgur.pipeline import PipelineException
+from imgur.ratelimit import RateLimiter
+from tests.test_downloader import RecordingDownloader
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+def images(count):
+    for index in range(1, count + 1):
+        yield {
+            'url' : 'https://i.imgur.com/{}.jpg'.format(index),
+            'filename' : '{}.jpg'.format(index),
+        }
+
+def test_invalid_size():
+    """
+    Test if the pipeline raises exception for invalid queue size.
+    """
+    with pytest.raises(PipelineException):
+        Pipeline(images(1), maxsize=0)
+
+def test_images_arrive_in_order():
+    """
+    Test if the consumer receives all images in the order of production.
+    """
+    filenames = [image['filename'] for image in Pipeline(images(50), maxsize=3)]
+    assert filenames == ['{}.jpg'.format(index) for index in range(1, 51)]
+
+def test_producer_error_is_raised():
+    """
+    Test if the exception raised by the producer reaches the consumer.
+    """
+    def broken():
+        yield from images(2)
+        raise ValueError('broken page')
+    with pytest.raises(ValueError):
+        list(Pipeline(broken()))
+
+def test_producer_waits_for_consumer():
+    """
+    Test if the producer stops when the queue is full.
+    """
+    produced = []
+    def source():
+        for image in images(10):
+            produced.append(image)
+            yield image
+    pipeline = Pipeline(source(), maxsize=2)
+    iterator = iter(pipeline)
+    next(iterator)
+    pipeline.thread.join(0.2)
+    assert len(produced) <= 4
+    assert len(list(iterator)) == 9
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_downloader_consumes_pipeline(tmpdir, workers):
+    """
+    Test if the downloader downloads all images from a pipeline.
+    """
+    downloader = RecordingDownloader(
+        Pipeline(images(20)), str(tmpdir), workers=workers,
+        rate_limiter=RateLimiter(rate=1000)
+    )
+    summary = downloader.download()
+    assert summary['downloaded'] == 20
+    assert len(tmpdir.listdir()) == 20
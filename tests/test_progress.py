@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+
+
+import io
+import asyncio
+import pytest
+from collections import deque
+from imgur.progress import Progress
+from imgur.progress import ProgressException
+from imgur.progress import format_duration
+from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def stream():
+    return io.StringIO()
+
+
+def test_invalid_progress(stream):
+    """
+    Test if an interval which is not positive is rejected.
+    """
+    with pytest.raises(ProgressException):
+        Progress(stream, interval=0)
+
+def test_format_duration():
+    """
+    Test if durations are formatted as H:MM:SS.
+    """
+    assert format_duration(3725) == '1:02:05'
+    assert format_duration(None) == '?'
+
+def test_refresh_is_bounded(stream, clock):
+    """
+    Test if the status line is redrawn at most once per interval, in place.
+    """
+    progress = Progress(stream, interval=1.0, tty=True, clock=clock)
+    progress.begin(4)
+    for _ in range(10):
+        progress.advance(100)
+    assert stream.getvalue() == ''
+    clock.now = 1.0
+    progress.advance(100)
+    progress.advance(100)
+    assert stream.getvalue().count('\r') == 1
+    assert '\n' not in stream.getvalue()
+
+def test_status_line(stream, clock):
+    """
+    Test if the status line contains rates, sizes, ETA and active transfers.
+    """
+    progress = Progress(stream, interval=1.0, tty=True, clock=clock)
+    progress.begin(4)
+    for _ in range(3):
+        progress.image_started()
+    progress.expect(2000000)
+    progress.advance(2000000)
+    progress.image_finished('downloaded')
+    clock.now = 2.0
+    progress.refresh()
+    line = stream.getvalue().split('\r')[-1].strip()
+    assert line == (
+        '[1/4]   25%  0.5 img/s  1.0 MB/s  2.0/8.0 MB  ETA 0:00:06  active 2'
+    )
+
+def test_summary_lines_without_tty(stream, clock):
+    """
+    Test if summary lines are printed every summary interval when the output is
+    not a terminal.
+    """
+    progress = Progress(stream, interval=0.1, summary_interval=10.0, tty=False,
+                        clock=clock)
+    progress.begin()
+    clock.now = 5.0
+    progress.image_finished('failed')
+    clock.now = 10.0
+    progress.image_finished('downloaded')
+    progress.close()
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith('[2/?]') == True
+    assert 'failed 1' in lines[0]
+    assert '\r' not in stream.getvalue()
+
+def test_downloader_reports_progress(stream, tmpdir):
+    """
+    Test if the downloader reports every image and every byte.
+    """
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, {}, b'a' * 1000)])
+        server.script('/b.jpg', [(200, {}, b'b' * 3000)])
+        images = deque([
+            {'url': server.url('/a.jpg'), 'filename': 'a.jpg'},
+            {'url': server.url('/b.jpg'), 'filename': 'b.jpg'},
+        ])
+        progress = Progress(stream, tty=False)
+        Downloader(
+            images, str(tmpdir), workers=2,
+            rate_limiter=RateLimiter(rate=1000, burst=10), progress=progress
+        ).download()
+    assert (progress.done, progress.started, progress.bytes_done) == (2, 2, 4000)
+    assert progress.bytes_expected == 4000
+    assert stream.getvalue().startswith('[2/2]') == True
+
+def test_async_downloader_reports_progress(stream, tmpdir):
+    """
+    Test if the coroutine downloader reports every image and every byte.
+    """
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, {}, b'a' * 1000)])
+        images = deque([{'url': server.url('/a.jpg'), 'filename': 'a.jpg'}])
+        progress = Progress(stream, tty=False)
+        asyncio.run(Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000, burst=10),
+            progress=progress
+        ).adownload())
+    assert (progress.done, progress.bytes_done, progress.bytes_expected) == (
+        1, 1000, 1000
+    )
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+
+
+import pytest
+from collections import deque
+from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from imgur.ratelimit import RateLimiterException
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class FakeClock(object):
+    """
+    Clock that only moves when somebody waits on it.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.waited = []
+
+    def __call__(self):
+        return self.now
+
+    def wait(self, seconds):
+        self.waited.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def limiter_with(clock, **kwargs):
+    return RateLimiter(clock=clock, wait=clock.wait, **kwargs)
+
+def test_invalid_configuration():
+    """
+    Test if the limiter raises exception for invalid rate or burst.
+    """
+    with pytest.raises(RateLimiterException):
+        RateLimiter(rate=0)
+    with pytest.raises(RateLimiterException):
+        RateLimiter(burst=0)
+
+def test_burst_is_not_delayed(clock):
+    """
+    Test if the requests within burst size are allowed immediately.
+    """
+    limiter = limiter_with(clock, rate=2, burst=3)
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.now == 0.0
+
+def test_requests_are_spaced_by_rate(clock):
+    """
+    Test if the requests over burst size wait for the token bucket to refill.
+    """
+    limiter = limiter_with(clock, rate=4, burst=1)
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.now == pytest.approx(1.0)
+
+def test_throttling_decreases_and_success_restores_rate(clock):
+    """
+    Test additive increase, multiplicative decrease of the rate.
+    """
+    limiter = limiter_with(clock, rate=4, increase=1)
+    assert limiter.failure(429) == True
+    assert limiter.rate == 2
+    assert limiter.failure(503) == True
+    assert limiter.rate == 1
+    assert limiter.failure(404) == False
+    assert limiter.rate == 1
+    for _ in range(10):
+        limiter.success()
+    assert limiter.rate == 4
+
+def test_retry_after_pauses_requests(clock):
+    """
+    Test if Retry-After header stops all requests for the given time.
+    """
+    limiter = limiter_with(clock, rate=100, burst=10)
+    limiter.failure(429, {'Retry-After': '5'})
+    limiter.acquire()
+    assert clock.now >= 5
+
+def test_parse_retry_after():
+    """
+    Test parsing of both forms of Retry-After header.
+    """
+    limiter = RateLimiter()
+    assert limiter.parse_retry_after('7') == 7
+    assert limiter.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert limiter.parse_retry_after('soon') == None
+    assert limiter.parse_retry_after(None) == None
+
+def test_downloader_backs_off_on_429(tmpdir):
+    """
+    Test if the downloader reports scripted 429 responses to the limiter.
+    """
+    with StubServer() as server:
+        server.script('/a.jpg', [(429, {'Retry-After': '0'}, b'')])
+        server.script('/b.jpg', [(200, {}, b'image')])
+        images = deque([
+            {'url' : server.url('/a.jpg'), 'filename' : '1-a.jpg'},
+            {'url' : server.url('/b.jpg'), 'filename' : '2-b.jpg'},
+        ])
+        limiter = RateLimiter(rate=100, burst=2, increase=0)
+        Downloader(images, str(tmpdir), rate_limiter=limiter).download()
+    assert limiter.rate == 50
+    assert tmpdir.join('2-b.jpg').read_binary() == b'image'
+    assert not tmpdir.join('1-a.jpg').exists()
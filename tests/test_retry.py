@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+
+
+import json
+import pytest
+from collections import deque
+from urllib.error import HTTPError
+from urllib.error import URLError
+from imgur.imgur import Imgur
+from imgur.batch import Batch
+from imgur.retry import RetryPolicy
+from imgur.retry import FailureReport
+from imgur.retry import RetryPolicyException
+from imgur.downloader import Downloader
+from imgur.downloader import IncompleteDownloadException
+from imgur.ratelimit import RateLimiter
+from imgur.connection import ConnectionPool
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+PAGE = b'<script>{"hash":"jedEzFL","ext":".jpg"}</script>'
+
+
+def http_error(code):
+    return HTTPError('https://i.imgur.com/a.jpg', code, 'Error', {}, None)
+
+@pytest.fixture
+def waits():
+    return []
+
+@pytest.fixture
+def policy(waits):
+    return RetryPolicy(attempts=3, backoff=1, random=lambda: 1.0, wait=waits.append)
+
+def test_invalid_configuration():
+    """
+    Test if the policy raises exception for invalid number of attempts.
+    """
+    with pytest.raises(RetryPolicyException):
+        RetryPolicy(attempts=0)
+
+def test_is_retryable(policy):
+    """
+    Test if transient errors are retried, and fatal ones are not.
+    """
+    assert policy.is_retryable(http_error(503)) == True
+    assert policy.is_retryable(http_error(429)) == True
+    assert policy.is_retryable(http_error(404)) == False
+    assert policy.is_retryable(URLError('timed out')) == True
+    assert policy.is_retryable(ConnectionResetError()) == True
+    assert policy.is_retryable(IncompleteDownloadException()) == True
+    assert policy.is_retryable(ValueError()) == False
+
+def test_exponential_backoff(policy):
+    """
+    Test if the delay doubles with every attempt, up to the maximum.
+    """
+    policy.max_backoff = 5
+    assert [policy.delay(attempt) for attempt in range(1, 5)] == [1, 2, 4, 5]
+
+def test_jitter():
+    """
+    Test if the delay is a random part of the backoff.
+    """
+    policy = RetryPolicy(backoff=2, random=lambda: 0.25)
+    assert policy.delay(2) == 1.0
+
+def test_attempts_and_budget():
+    """
+    Test if retries stop after the last attempt, and when the budget is spent.
+    """
+    policy = RetryPolicy(attempts=3, budget=2)
+    error = http_error(500)
+    assert policy.should_retry(error, 1) == True
+    assert policy.should_retry(error, 3) == False
+    assert policy.should_retry(error, 2) == True
+    assert policy.should_retry(error, 1) == False
+    assert policy.retries == 2
+
+def test_transient_error_is_retried(policy, waits, tmpdir):
+    """
+    Test if the downloader repeats requests which failed with 503.
+    """
+    with StubServer() as server:
+        server.script('/a.jpg', [(503, {}, b''), (503, {}, b''), (200, {}, b'image')])
+        images = deque([{'url': server.url('/a.jpg'), 'filename': 'a.jpg'}])
+        summary = Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000, burst=10),
+            retry_policy=policy
+        ).download()
+        assert server.hits('/a.jpg') == 3
+    assert summary['downloaded'] == 1
+    assert waits == [1, 2]
+    assert tmpdir.join('a.jpg').read_binary() == b'image'
+
+def test_failures_are_reported(policy, tmpdir):
+    """
+    Test if fatal errors are not retried, and if images which failed are in
+    the failure report.
+    """
+    with StubServer() as server:
+        server.script('/a.jpg', [(404, {}, b'')])
+        server.script('/b.jpg', [(500, {}, b'')])
+        images = deque([
+            {'url': server.url('/a.jpg'), 'filename': 'a.jpg'},
+            {'url': server.url('/b.jpg'), 'filename': 'b.jpg'},
+        ])
+        report = FailureReport()
+        summary = Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000, burst=10),
+            retry_policy=policy, failures=report
+        ).download()
+        assert server.hits('/a.jpg') == 1
+        assert server.hits('/b.jpg') == 3
+    assert summary['failed'] == 2
+    report.write(str(tmpdir.join('failures.json')))
+    written = json.loads(tmpdir.join('failures.json').read())
+    assert [(image['filename'], image['status'], image['attempts'], image['retryable'])
+            for image in written['images']] == [
+        ('a.jpg', 404, 1, False), ('b.jpg', 500, 3, True)
+    ]
+
+def test_album_page_is_retried(policy):
+    """
+    Test if album pages are requested again, without duplicate images.
+    """
+    with StubServer() as server:
+        server.script('/a/album?grid', [(502, {}, b''), (200, {}, PAGE)])
+        pool = ConnectionPool(routes={'imgur.com': server.url('')})
+        imgur = Imgur('https://imgur.com/a/album', pool, retry_policy=policy)
+        imgur.prepare_images()
+    assert imgur.error is None
+    assert [image['filename'] for image in imgur.images] == ['jedEzFL.jpg']
+
+def test_failed_albums_are_collected(policy):
+    """
+    Test if albums which could not be loaded are listed in the summary of the
+    batch.
+    """
+    with StubServer() as server:
+        server.script('/a/album?grid', [(404, {}, b'')])
+        pool = ConnectionPool(routes={'imgur.com': server.url('')})
+        batch = Batch(['https://imgur.com/a/album'], pool, retry_policy=policy)
+        batch.prepare_images()
+    assert batch.albums == []
+    assert [url for url, _ in batch.failed] == ['https://imgur.com/a/album']
+    assert 'Could not load: https://imgur.com/a/album' in batch.format_summary(
+        {'downloaded': 0, 'skipped': 0, 'failed': 0}
+    )
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+
+
+import pytest
+from imgur.scanner import PageScanner
+from imgur.scanner import MAX_OBJECT_SIZE
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+PAGE = (b'<script>item: {"hash":"vTTHZ","album_images":{"images":['
+        b'{"hash":"jedEzFL","title":"a {quoted} \\"title\\"","ext":".jpg"},'
+        b'{"hash":"lciC5G8","ext":".png"},'
+        b'{"hash":"jedEzFL","ext":".jpg"}]}};</script>')
+RESULT = [('jedEzFL', '.jpg'), ('lciC5G8', '.png')]
+
+
+def scan(page, chunk_size):
+    scanner = PageScanner()
+    found = []
+    for start in range(0, len(page), chunk_size):
+        found.extend(scanner.feed(page[start:start + chunk_size]))
+    return found
+
+def test_whole_page():
+    """
+    Test if the images are found in order, without duplicates, even with braces
+    inside the strings.
+    """
+    assert scan(PAGE, len(PAGE)) == RESULT
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 10, 64])
+def test_chunk_boundaries(chunk_size):
+    """
+    Test if the images split between chunks are found.
+    """
+    assert scan(PAGE, chunk_size) == RESULT
+
+def test_images_are_reported_early():
+    """
+    Test if the image is reported as soon as its object is complete.
+    """
+    scanner = PageScanner()
+    assert scanner.feed(PAGE[:120]) == [('jedEzFL', '.jpg')]
+
+def test_buffer_is_bounded():
+    """
+    Test if the scanner does not keep the data which cannot contain images.
+    """
+    scanner = PageScanner()
+    scanner.feed(b'x' * 100000)
+    assert len(scanner.buffer) < 10
+    scanner.feed(b'{"hash":"jedEzFL"' + b'x' * (MAX_OBJECT_SIZE + 1))
+    assert scanner.buffer == b''
+
+def test_page_without_album_json():
+    """
+    Test if the image objects are found when there is no album JSON.
+    """
+    assert scan(b'{"hash":"jedEzFL","title":"","ext":".jpg","animated":false}', 64) == [
+        ('jedEzFL', '.jpg')
+    ]
+
+def test_pathological_page():
+    """
+    Test if a page with many image objects without extension is handled.
+    """
+    assert scan(b'{"hash":"jedEzFL","title":"x"},' * 50000, 64 * 1024) == []
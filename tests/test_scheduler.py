@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+
+import os
+import asyncio
+import pytest
+from threading import Thread
+from imgur.scheduler import Scheduler
+from imgur.scheduler import SchedulerException
+from imgur.ratelimit import RateLimiter
+from tests.test_downloader import RecordingDownloader
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+def album(name, count, host='i.imgur.com'):
+    return [{
+        'url': 'https://{}/{}{}.jpg'.format(host, name, index),
+        'filename': os.path.join(name, '{}.jpg'.format(index)),
+    } for index in range(1, count + 1)]
+
+def filled(scheduler):
+    """
+    Let the scheduler take all images from the source before the first image is
+    handed out, so that the order does not depend on timing.
+    """
+    scheduler.thread = Thread(target=scheduler.produce)
+    scheduler.thread.start()
+    scheduler.thread.join()
+    return scheduler
+
+def albums_of(images):
+    return ''.join(os.path.dirname(image['filename']) for image in images)
+
+
+def test_invalid_scheduler():
+    """
+    Test if invalid limits and weights are rejected.
+    """
+    with pytest.raises(SchedulerException):
+        Scheduler([], host_limit=0)
+    with pytest.raises(SchedulerException):
+        Scheduler([], weights={'a': 0})
+
+def test_round_robin():
+    """
+    Test if albums of the same weight take turns.
+    """
+    scheduler = filled(Scheduler(album('a', 4) + album('b', 2) + album('c', 1)))
+    assert albums_of(scheduler) == 'abcabaa'
+
+def test_priority():
+    """
+    Test if albums of higher priority are served first.
+    """
+    scheduler = filled(Scheduler(
+        album('a', 2) + album('b', 2) + album('c', 2), priorities={'c': 1}
+    ))
+    assert albums_of(scheduler) == 'ccabab'
+
+def test_weights():
+    """
+    Test if albums share the images in proportion to their weights.
+    """
+    scheduler = filled(Scheduler(
+        album('a', 6) + album('b', 3), weights={'a': 2}
+    ))
+    assert albums_of(scheduler) == 'abaabaaba'
+
+def test_host_limit():
+    """
+    Test if an album on a busy host waits, while another host is served.
+    """
+    scheduler = filled(Scheduler(
+        album('a', 2, 'one.example') + album('b', 2, 'two.example'), host_limit=1
+    ))
+    iterator = iter(scheduler)
+    first, second = next(iterator), next(iterator)
+    assert albums_of([first, second]) == 'ab'
+    scheduler.task_done(second)
+    assert albums_of([next(iterator)]) == 'b'
+    scheduler.task_done(first)
+    assert albums_of([next(iterator)]) == 'a'
+
+def test_producer_error_is_raised():
+    """
+    Test if the exception raised by the producer reaches the consumer.
+    """
+    def broken():
+        yield from album('a', 2)
+        raise ValueError('broken page')
+    with pytest.raises(ValueError):
+        list(Scheduler(broken()))
+
+def test_small_albums_are_not_starved(tmpdir):
+    """
+    Test if small albums listed after a large one are downloaded before the
+    large one is finished.
+    """
+    for name in 'abc':
+        tmpdir.mkdir(name)
+    finished = []
+    class OrderedDownloader(RecordingDownloader):
+        def count(self, outcome, image=None):
+            finished.append(os.path.dirname(image['filename']))
+            super().count(outcome, image)
+    scheduler = Scheduler(album('a', 40) + album('b', 2) + album('c', 2), host_limit=2)
+    OrderedDownloader(
+        scheduler, str(tmpdir), workers=2, rate_limiter=RateLimiter(rate=10000, burst=10)
+    ).download()
+    assert len(finished) == 44
+    assert max(finished.index('b'), finished.index('c')) < len(finished) - 30
+    assert scheduler.active == {}
+
+def test_host_limit_is_rejected_by_adownload(tmpdir):
+    """
+    Test if a scheduler with a host limit cannot be used from adownload.
+    """
+    downloader = RecordingDownloader(
+        Scheduler(album('a', 2), host_limit=1), str(tmpdir)
+    )
+    with pytest.raises(SchedulerException):
+        asyncio.run(downloader.adownload(session=object()))
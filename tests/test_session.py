@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+
+
+import os
+import time
+import pytest
+import asyncio
+from threading import Event
+from urllib.error import HTTPError
+from urllib.error import URLError
+from imgur.imgur import Imgur
+from imgur.session import AsyncSession
+from imgur.session import AsyncSessionException
+from imgur.downloader import Downloader
+from imgur.pipeline import Pipeline
+from imgur.ratelimit import RateLimiter
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+PAGE = b''.join([
+    b'<script>window.runSlots = {item: {"hash":"abcde","album_images":{"images":[',
+    b'{"hash":"one1111","ext":".jpg"},{"hash":"two2222","ext":".png"}',
+    b']}}};</script>',
+])
+
+
+@pytest.fixture
+def server():
+    with StubServer() as server:
+        server.script('/a.jpg', [(200, {}, b'a' * 1000)])
+        server.script('/missing', [(404, {}, b'not found')])
+        server.script('/chunked', [(200, {'Transfer-Encoding': 'chunked'},
+                                    b'3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n')])
+        server.script('/bad-chunk', [(200, {'Transfer-Encoding': 'chunked'},
+                                      b'zz\r\nabc\r\n0\r\n\r\n')])
+        server.script('/long-header', [(200, {'X-Long': 'x' * 70000}, b'a')])
+        server.script('/a/abcde?grid', [(200, {}, PAGE)])
+        server.script('/one1111.jpg', [(200, {}, b'1' * 500)])
+        server.script('/two2222.png', [(200, {}, b'2' * 700)])
+        yield server
+
+def routes(server):
+    base = server.url('')
+    return {host: base for host in ['imgur.com', 'i.imgur.com']}
+
+def test_invalid_configuration():
+    """
+    Test if the session raises exception for invalid limit.
+    """
+    with pytest.raises(AsyncSessionException):
+        AsyncSession(limit=0)
+
+def test_connection_is_reused(server):
+    """
+    Test if consecutive requests to the same host use one connection.
+    """
+    async def fetch():
+        async with AsyncSession() as session:
+            for _ in range(3):
+                async with await session.request(server.url('/a.jpg')) as response:
+                    assert len(await response.read()) == 1000
+    asyncio.run(fetch())
+    assert len(server.connections) == 1
+
+def test_chunked_body(server):
+    """
+    Test if chunked responses are decoded.
+    """
+    async def fetch():
+        async with AsyncSession() as session:
+            async with await session.request(server.url('/chunked')) as response:
+                return await response.read()
+    assert asyncio.run(fetch()) == b'abcde'
+
+@pytest.mark.parametrize('path', ['/bad-chunk', '/long-header'])
+def test_malformed_response(server, path):
+    """
+    Test if an invalid chunk size, or a header line over the limit, raises
+    URLError.
+    """
+    async def fetch():
+        async with AsyncSession() as session:
+            async with await session.request(server.url(path)) as response:
+                return await response.read()
+    with pytest.raises(URLError):
+        asyncio.run(fetch())
+
+def test_error_status_raises(server):
+    """
+    Test if 4xx responses raise HTTPError.
+    """
+    async def fetch():
+        async with AsyncSession() as session:
+            await session.request(server.url('/missing'))
+    with pytest.raises(HTTPError) as error:
+        asyncio.run(fetch())
+    assert error.value.code == 404
+
+def test_aprepare_images(server):
+    """
+    Test if album images are found through the session.
+    """
+    imgur = Imgur('https://imgur.com/a/abcde')
+    async def prepare():
+        async with AsyncSession(routes=routes(server)) as session:
+            await imgur.aprepare_images(session)
+    asyncio.run(prepare())
+    assert [image['url'] for image in imgur.images] == [
+        'https://i.imgur.com/one1111.jpg', 'https://i.imgur.com/two2222.png'
+    ]
+
+def test_adownload(server, tmpdir):
+    """
+    Test if images are downloaded concurrently without changing the current
+    directory.
+    """
+    cwd = os.getcwd()
+    imgur = Imgur('https://imgur.com/a/abcde')
+    async def download():
+        async with AsyncSession(routes=routes(server)) as session:
+            await imgur.aprepare_images(session)
+            imgur.numerate_images()
+            downloader = Downloader(imgur.images, str(tmpdir), workers=2)
+            return await downloader.adownload(session)
+    summary = asyncio.run(download())
+    assert summary['downloaded'] == 2
+    assert os.getcwd() == cwd
+    assert sorted(os.listdir(str(tmpdir))) == ['1-one1111.jpg', '2-two2222.png']
+    assert os.path.getsize(str(tmpdir.join('2-two2222.png'))) == 700
+
+def test_adownload_counts_failures(server, tmpdir):
+    """
+    Test if a failed image does not stop the others.
+    """
+    images = [
+        {'url': server.url('/missing'), 'filename': 'missing.jpg'},
+        {'url': server.url('/a.jpg'), 'filename': 'a.jpg'},
+    ]
+    summary = asyncio.run(Downloader(images, str(tmpdir), workers=2).adownload())
+    assert summary == {'downloaded': 1, 'skipped': 0, 'failed': 1}
+    assert os.listdir(str(tmpdir)) == ['a.jpg']
+
+def test_cancelled_download_removes_partial_file(server, tmpdir):
+    """
+    Test if cancelling adownload cancels the downloads in progress, and leaves
+    no partial files behind.
+    """
+    server.script('/slow.jpg', [(200, {'Content-Length': '1000'}, b's' * 10)])
+    images = [{'url': server.url('/slow.jpg'), 'filename': 'slow.jpg'}]
+    async def download():
+        session = AsyncSession(timeout=5)
+        task = asyncio.ensure_future(Downloader(images, str(tmpdir)).adownload(session))
+        while not os.listdir(str(tmpdir)):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        session.close()
+    asyncio.run(download())
+    assert os.listdir(str(tmpdir)) == []
+
+def test_adownload_does_not_block_on_pipeline(server, tmpdir):
+    """
+    Test if the downloads go on while the pipeline waits for its next image.
+    """
+    downloaded = Event()
+    waited = []
+    def source():
+        yield {'url': server.url('/a.jpg'), 'filename': 'a.jpg'}
+        waited.append(downloaded.wait(5))
+        yield {'url': server.url('/one1111.jpg'), 'filename': 'one.jpg'}
+    class SignallingDownloader(Downloader):
+        def count(self, outcome, image=None):
+            super().count(outcome, image)
+            downloaded.set()
+    summary = asyncio.run(
+        SignallingDownloader(Pipeline(source()), str(tmpdir), workers=2).adownload()
+    )
+    assert waited == [True]
+    assert summary['downloaded'] == 2
+
+def test_aacquire_waits_without_blocking():
+    """
+    Test if aacquire waits for a token with asyncio.sleep.
+    """
+    limiter = RateLimiter(rate=20, burst=1)
+    async def acquire():
+        start = time.monotonic()
+        await limiter.aacquire()
+        await limiter.aacquire()
+        return time.monotonic() - start
+    assert asyncio.run(acquire()) >= 0.04
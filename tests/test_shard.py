@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+
+
+import pytest
+from imgur.shard import Shard
+from imgur.shard import ShardMerge
+from imgur.shard import ShardException
+from imgur.batch import Batch
+from imgur.pipeline import Pipeline
+from imgur.manifest import Manifest
+from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from imgur.connection import ConnectionPool
+from benchmarks.fakeimgur import FakeImgur
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+URLS = ['https://imgur.com/a/album{}'.format(index) for index in range(20)] + [
+    'https://imgur.com/gallery/album3',
+    'https://www.reddit.com',
+]
+
+def test_parse():
+    """
+    Test if shards are parsed from the i/N notation.
+    """
+    shard = Shard.parse('2/8')
+    assert (shard.index, shard.count) == (2, 8)
+
+@pytest.mark.parametrize('value', ['2', '8/8', '-1/4', 'a/b', '1/0'])
+def test_parse_invalid(value):
+    """
+    Test if invalid shards raise exception.
+    """
+    with pytest.raises(ShardException):
+        Shard.parse(value)
+
+def test_shards_partition_links():
+    """
+    Test if every link belongs to exactly one shard, and if the links of the
+    same album belong to the same shard.
+    """
+    shards = [Shard(index, 4).select(URLS) for index in range(4)]
+    assert sorted(sum(shards, [])) == sorted(URLS)
+    album3 = [index for index, urls in enumerate(shards)
+              if 'https://imgur.com/a/album3' in urls]
+    assert 'https://imgur.com/gallery/album3' in shards[album3[0]]
+
+def test_assignment_is_deterministic():
+    """
+    Test if separately created shards agree on the assignment.
+    """
+    assert Shard(1, 3).select(URLS) == Shard.parse('1/3').select(URLS)
+
+def test_merge_reports(tmpdir):
+    """
+    Test if summaries, albums and invalid links of all shards are combined, and
+    if missing reports are listed.
+    """
+    batch = Batch([])
+    batch.albums.append(('https://imgur.com/a/album0', 'album0', 2))
+    batch.invalid.append('https://www.reddit.com')
+    Shard(0, 3).write_report(str(tmpdir), batch, {'downloaded': 2, 'skipped': 0, 'failed': 0})
+    batch = Batch([])
+    batch.albums.append(('https://imgur.com/a/album1', 'album1', 0))
+    Shard(2, 3).write_report(str(tmpdir), batch, {'downloaded': 1, 'skipped': 3, 'failed': 1})
+
+    merge = ShardMerge(str(tmpdir), 3)
+    assert merge.merge() == {'downloaded': 3, 'skipped': 3, 'failed': 1}
+    assert merge.format_summary().split('\n') == [
+        'Albums: 2, empty: 1, invalid links: 1.',
+        'Images: 3 downloaded, 3 skipped, 1 failed.',
+        'No images found: https://imgur.com/a/album1',
+        'Invalid link: https://www.reddit.com',
+        'Missing report of shard 1/3.',
+    ]
+
+def test_broken_report(tmpdir):
+    """
+    Test if unreadable report raises exception.
+    """
+    tmpdir.join(Shard(0, 1).report_filename()).write('{')
+    with pytest.raises(ShardException):
+        ShardMerge(str(tmpdir), 1).merge()
+
+def test_merge_manifests(tmpdir):
+    """
+    Test if manifests of the shards are merged into the manifest of the
+    directory.
+    """
+    for index, filename in enumerate(['a.jpg', 'b.jpg']):
+        shard = Shard(index, 2)
+        tmpdir.join(filename).write('image')
+        manifest = Manifest(str(tmpdir), shard.manifest_filename())
+        manifest.record(filename, 'https://i.imgur.com/' + filename)
+        manifest.save()
+        shard.write_report(str(tmpdir), Batch([]), {'downloaded': 1, 'skipped': 0, 'failed': 0})
+    ShardMerge(str(tmpdir), 2).merge()
+    manifest = Manifest(str(tmpdir))
+    manifest.load()
+    assert sorted(manifest.entries) == ['a.jpg', 'b.jpg']
+
+def test_shards_do_not_download_twice(tmpdir):
+    """
+    Test if shards together download every image of the batch exactly once.
+    """
+    albums = {'album{}'.format(index): 3 for index in range(6)}
+    urls = ['https://imgur.com/a/{}'.format(album) for album in albums]
+    urls += urls[:2]
+    with FakeImgur(albums, image_size=100) as server:
+        for index in range(3):
+            shard = Shard(index, 3)
+            pool = ConnectionPool(routes=server.routes())
+            batch = Batch(shard.select(urls), pool)
+            downloader = Downloader(
+                Pipeline(batch.stream_images()), str(tmpdir), workers=2,
+                rate_limiter=RateLimiter(rate=1000, burst=100), pool=pool
+            )
+            shard.write_report(str(tmpdir), batch, downloader.download())
+        merge = ShardMerge(str(tmpdir), 3)
+        assert merge.merge() == {'downloaded': 18, 'skipped': 0, 'failed': 0}
+        assert server.requests == 6 + 18
+    assert len(merge.batch.albums) == 6
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+
+
+import os
+import hashlib
+import pytest
+from collections import deque
+from imgur.store import ObjectStore
+from imgur.store import ObjectStoreException
+from imgur.downloader import Downloader
+from imgur.downloader import IncompleteDownloadException
+from imgur.ratelimit import RateLimiter
+from imgur.retry import RetryPolicy
+from imgur.writer import StreamWriter
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+@pytest.fixture
+def store(tmpdir):
+    return ObjectStore(str(tmpdir.join('store')))
+
+def test_broken_index(tmpdir):
+    """
+    Test if the store raises exception if the index is not valid JSON.
+    """
+    tmpdir.join('store', 'index.json').write('{', ensure=True)
+    with pytest.raises(ObjectStoreException):
+        ObjectStore(str(tmpdir.join('store')))
+
+def test_identical_content_is_stored_once(store, tmpdir):
+    """
+    Test if files with the same content are stored as a single object.
+    """
+    for key in ['jedEzFL.jpg', 'lciC5G8.jpg']:
+        path = store.temporary_path()
+        with open(path, 'wb') as f:
+            f.write(b'image')
+        store.add(key, path)
+    assert store.lookup('jedEzFL.jpg') == store.lookup('lciC5G8.jpg')
+    assert store.lookup('6O1hqeY.jpg') == None
+    assert len(tmpdir.join('store', 'objects').listdir()) == 1
+    assert tmpdir.join('store', 'tmp').listdir() == []
+
+def test_index_survives_saving(store, tmpdir):
+    """
+    Test if the index is read again by a new store.
+    """
+    path = store.temporary_path()
+    store.add('jedEzFL.jpg', path)
+    store.save()
+    assert ObjectStore(str(tmpdir.join('store'))).lookup('jedEzFL.jpg') is not None
+
+def test_saving_keeps_entries_of_other_processes(tmpdir):
+    """
+    Test if two stores sharing a directory do not overwrite each other's index.
+    """
+    first = ObjectStore(str(tmpdir.join('store')))
+    second = ObjectStore(str(tmpdir.join('store')))
+    first.add('jedEzFL.jpg', first.temporary_path())
+    second.add('lciC5G8.jpg', second.temporary_path())
+    first.save()
+    second.save()
+    store = ObjectStore(str(tmpdir.join('store')))
+    assert store.lookup('jedEzFL.jpg') is not None
+    assert store.lookup('lciC5G8.jpg') is not None
+
+def test_albums_are_linked_to_store(store, tmpdir):
+    """
+    Test if the image shared by two albums is downloaded once, and linked into
+    both album directories.
+    """
+    first = tmpdir.mkdir('first')
+    second = tmpdir.mkdir('second')
+    with StubServer() as server:
+        server.script('/jedEzFL.jpg', [(200, {}, b'image')])
+        for directory in [first, second]:
+            images = deque([
+                {'url' : server.url('/jedEzFL.jpg'), 'filename' : '1-jedEzFL.jpg'}
+            ])
+            Downloader(
+                images, str(directory), rate_limiter=RateLimiter(rate=1000),
+                store=store
+            ).download()
+        assert server.hits('/jedEzFL.jpg') == 1
+    assert first.join('1-jedEzFL.jpg').read_binary() == b'image'
+    assert os.path.samefile(str(first.join('1-jedEzFL.jpg')),
+                            str(second.join('1-jedEzFL.jpg')))
+
+def test_streamed_digest_is_used(store, tmpdir, monkeypatch):
+    """
+    Test if the object is named after the digest computed while the body was
+    written, without reading the file again.
+    """
+    def read_again(path):
+        raise AssertionError('The file was read again.')
+    monkeypatch.setattr(store, 'file_digest', read_again)
+    with StubServer() as server:
+        server.script('/jedEzFL.jpg', [(200, {}, b'image')])
+        images = deque([{'url' : server.url('/jedEzFL.jpg'), 'filename' : '1-jedEzFL.jpg'}])
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), store=store
+        ).download()
+    assert os.path.basename(store.lookup('jedEzFL.jpg')) == ''.join([
+        hashlib.sha256(b'image').hexdigest(), '.jpg'
+    ])
+
+def test_failed_resumed_download_leaves_no_temporary_files(store, tmpdir):
+    """
+    Test if failed attempts in resume mode do not leave partial files in the
+    temporary directory of the store.
+    """
+    class BrokenWriter(StreamWriter):
+        def copy(self, response, f, length=None, progress=None, checksum=None):
+            super().copy(response, f, length, progress, checksum)
+            raise IncompleteDownloadException('Connection closed.')
+    with StubServer() as server:
+        server.script('/jedEzFL.jpg', [(200, {}, b'image')] * 2)
+        images = deque([{'url' : server.url('/jedEzFL.jpg'), 'filename' : '1-jedEzFL.jpg'}])
+        summary = Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000), store=store,
+            resume=True, writer=BrokenWriter(),
+            retry_policy=RetryPolicy(attempts=2, backoff=0)
+        ).download()
+    assert summary['failed'] == 1
+    assert tmpdir.join('store', 'tmp').listdir() == []
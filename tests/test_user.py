@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+
+
+import os
+import pytest
+from urllib.error import HTTPError
+from imgur.user import ImgurUser
+from imgur.user import ImgurUserException
+from imgur.user import user_name
+from imgur.batch import Batch
+from imgur.pipeline import Pipeline
+from imgur.retry import RetryPolicy
+from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from imgur.connection import ConnectionPool
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+ALBUM = b'<script>{"hash":"jedEzFL","ext":".jpg"},{"hash":"lciC5G8","ext":".png"}</script>'
+
+
+def listing(*hashes):
+    """
+    Return a page of the profile, with a link and a cover thumbnail per album.
+    """
+    return ''.join(
+        '<a href="https://imgur.com/gallery/{0}"><img src="//i.imgur.com/{0}b.jpg"></a>'.format(hash)
+        for hash in hashes
+    ).encode('utf-8')
+
+
+@pytest.fixture
+def server():
+    with StubServer() as server:
+        yield server
+
+@pytest.fixture
+def pool(server):
+    return ConnectionPool(routes={
+        'someone.imgur.com': server.url(''),
+        'imgur.com': server.url(''),
+        'i.imgur.com': server.url(''),
+    })
+
+
+def test_user_name():
+    """
+    Test if the name of the user is found in both forms of profile links, and
+    if other imgur links are not taken for profiles.
+    """
+    assert user_name('https://someone.imgur.com/') == 'someone'
+    assert user_name('https://imgur.com/user/someone') == 'someone'
+    assert user_name('https://i.imgur.com/jedEzFL.jpg') is None
+    assert user_name('https://imgur.com/a/vTTHZ') is None
+    with pytest.raises(ImgurUserException):
+        ImgurUser('https://imgur.com/a/vTTHZ')
+
+def test_extract_links():
+    """
+    Test if albums and images are taken from links, and thumbnails are ignored.
+    """
+    user = ImgurUser('https://someone.imgur.com')
+    html = (
+        '<a href="https://imgur.com/gallery/vTTHZ"><img src="//i.imgur.com/abcb.jpg"></a>'
+        '<a href="//i.imgur.com/jedEzFL.jpg">x</a><a href="/upload">x</a>'
+        '<a href="https://imgur.com/a/vTTHZ">again</a>'
+    )
+    assert user.extract_links(html) == [
+        'https://imgur.com/a/vTTHZ', 'https://i.imgur.com/jedEzFL.jpg'
+    ]
+
+def test_discover_all_pages(server, pool):
+    """
+    Test if links from all pages are collected in order, and if at most fanout
+    pages are requested past the end of the listing.
+    """
+    for page in range(1, 8):
+        server.script('/page/{}'.format(page), [
+            (200, {}, listing('a{}x'.format(page), 'b{}x'.format(page)))
+        ])
+    user = ImgurUser('https://someone.imgur.com', pool, fanout=3)
+    urls = user.discover()
+    assert urls == [
+        'https://imgur.com/a/{}{}x'.format(prefix, page)
+        for page in range(1, 8) for prefix in 'ab'
+    ]
+    assert user.pages == 7
+    missing = sum(server.hits('/page/{}'.format(page)) for page in range(8, 20))
+    assert 1 <= missing <= 3
+
+def test_listing_ends_with_repeated_page(server, pool):
+    """
+    Test if a page without new links ends the listing, e.g. when the server
+    repeats the last page for every page after it.
+    """
+    server.script('/page/1', [(200, {}, listing('one'))])
+    for page in range(2, 20):
+        server.script('/page/{}'.format(page), [(200, {}, listing('two'))])
+    user = ImgurUser('https://someone.imgur.com', pool, fanout=4)
+    assert user.discover() == ['https://imgur.com/a/one', 'https://imgur.com/a/two']
+    assert user.pages == 2
+
+def test_failed_page_is_retried(server, pool):
+    """
+    Test if a page which failed with a transient error is requested again, and
+    if the error is raised when the retries are exhausted.
+    """
+    server.script('/page/1', [(503, {}, b''), (200, {}, listing('one'))])
+    server.script('/page/2', [(500, {}, b'')])
+    user = ImgurUser(
+        'https://someone.imgur.com', pool, fanout=2,
+        retry_policy=RetryPolicy(attempts=2, backoff=0)
+    )
+    with pytest.raises(HTTPError):
+        user.discover()
+    assert user.error.code == 500
+    assert user.pages == 1
+
+def test_failed_page_past_the_end_is_ignored(server, pool):
+    """
+    Test if the error of a page fetched ahead, past the last page, does not stop
+    the listing.
+    """
+    server.script('/page/1', [(200, {}, listing('one'))])
+    server.script('/page/3', [(500, {}, b'')])
+    user = ImgurUser('https://someone.imgur.com', pool, fanout=3)
+    assert user.discover() == ['https://imgur.com/a/one']
+    assert user.error == None
+
+def test_download_user(server, pool, tmpdir):
+    """
+    Test if the albums of a user are downloaded through a batch.
+    """
+    server.script('/page/1', [(200, {}, listing('first', 'second'))])
+    for album in ['first', 'second']:
+        server.script('/a/{}?grid'.format(album), [(200, {}, ALBUM)])
+    server.script('/jedEzFL.jpg', [(200, {}, b'j')])
+    server.script('/lciC5G8.png', [(200, {}, b'l')])
+    batch = Batch(ImgurUser('https://someone.imgur.com', pool).discover(), pool)
+    summary = Downloader(
+        Pipeline(batch.stream_images()), str(tmpdir),
+        rate_limiter=RateLimiter(rate=1000, burst=10), pool=pool
+    ).download()
+    assert summary['downloaded'] == 4
+    assert os.path.exists(str(tmpdir.join('second', '2-lciC5G8.png'))) == True
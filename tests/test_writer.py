@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+
+
+import io
+import os
+import pytest
+from collections import deque
+from imgur.writer import StreamWriter
+from imgur.writer import StreamWriterException
+from imgur.downloader import Downloader
+from imgur.ratelimit import RateLimiter
+from tests.stubserver import StubServer
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__license__ = 'MIT'
+__version__ = 'v0.2.0'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Production'
+
+
+class CountingWriter(StreamWriter):
+    """
+    StreamWriter which counts syncs.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.syncs = 0
+
+    def sync(self, f):
+        self.syncs += 1
+        super().sync(f)
+
+
+@pytest.fixture
+def body():
+    return bytes(range(256)) * 40
+
+
+def test_invalid_writer():
+    """
+    Test if a chunk size which is not positive is rejected.
+    """
+    with pytest.raises(StreamWriterException):
+        StreamWriter(chunk_size=0)
+
+def test_copy_with_readinto(body, tmpdir):
+    """
+    Test if the body is copied through the reusable buffer, and the file is
+    allocated to its exact size.
+    """
+    writer = StreamWriter(chunk_size=1000)
+    path = str(tmpdir.join('a.jpg'))
+    with open(path, 'wb') as f:
+        assert writer.copy(io.BufferedReader(io.BytesIO(body)), f, len(body)) == len(body)
+    with open(path, 'rb') as f:
+        assert f.read() == body
+    assert writer.buffer() is writer.buffer()
+
+def test_short_body_is_truncated(body, tmpdir):
+    """
+    Test if the space allocated for a body which was cut short is released.
+    """
+    path = str(tmpdir.join('a.jpg'))
+    with open(path, 'wb') as f:
+        StreamWriter(chunk_size=1000).copy(io.BytesIO(body), f, len(body) * 2)
+    assert os.path.getsize(path) == len(body)
+
+def test_append_is_not_allocated(body, tmpdir):
+    """
+    Test if a resumed file, opened for appending, keeps its data in order.
+    """
+    path = str(tmpdir.join('a.jpg.part'))
+    with open(path, 'wb') as f:
+        f.write(body[:1000])
+    with open(path, 'ab') as f:
+        StreamWriter(chunk_size=512).copy(io.BytesIO(body[1000:]), f, len(body) - 1000)
+    with open(path, 'rb') as f:
+        assert f.read() == body
+
+def test_fsync_batching(body, tmpdir):
+    """
+    Test if the file is synced after every fsync_every bytes, and at the end.
+    """
+    writer = CountingWriter(chunk_size=1000, fsync_every=4000)
+    with open(str(tmpdir.join('a.jpg')), 'wb') as f:
+        writer.copy(io.BytesIO(body), f, len(body))
+    assert writer.syncs == 3
+
+def test_downloader_uses_writer(body, tmpdir):
+    """
+    Test if the downloader writes the files with the given writer.
+    """
+    with StubServer() as server:
+        server.script('/a.gif', [(200, {}, body)])
+        images = deque([{'url': server.url('/a.gif'), 'filename': 'a.gif'}])
+        writer = CountingWriter(chunk_size=1024, fsync_every=1024 * 1024)
+        Downloader(
+            images, str(tmpdir), rate_limiter=RateLimiter(rate=1000, burst=10),
+            writer=writer
+        ).download()
+    assert tmpdir.join('a.gif').read_binary() == body
+    assert writer.syncs == 1